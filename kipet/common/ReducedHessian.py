@@ -3,13 +3,14 @@ Reduced Hessian Generation
 
 This module creates the reduced Hessian for use in various KIPET modules
 """
+import collections
+import hashlib
 import os
 from pathlib import Path
 import time
 
 import numpy as np
 import pandas as pd
-from pyomo.contrib.pynumero.interfaces.pyomo_nlp import PyomoNLP
 from pyomo.environ import (
     Constraint,
     Param,
@@ -19,11 +20,12 @@ from pyomo.environ import (
     )
 from scipy.sparse import coo_matrix, triu
 from scipy.sparse import csr_matrix, csc_matrix
-from scipy.sparse.linalg import spsolve
+from scipy.sparse.linalg import splu
     
 from kipet.common.parameter_handling import (
     set_scaled_parameter_bounds,
     )
+from kipet.common.warm_start import update_warm_start_in_place
  
 DEBUG = True
 
@@ -45,7 +47,9 @@ class ReducedHessian(object):
                  set_up_constraints = True,
                  use_duals = True,
                  global_constraint_name = 'fix_params_to_global',
-                 file_number = None
+                 file_number = None,
+                 warm_start = False,
+                 use_lu_cache = True,
                  ):
         
         self.model_object =  model_object
@@ -64,8 +68,18 @@ class ReducedHessian(object):
         self.set_up_constraints = set_up_constraints
         self.use_duals = use_duals
         self.file_number = file_number
+        # Restart repeated solves from the multipliers of the last solve
+        self.warm_start = warm_start
+        # Reuse the LU factorizations in lu_factor_cache
+        self.use_lu_cache = use_lu_cache
         
         self.verbose = DEBUG
+        
+        # Time spent in each part of the last calculate_reduced_hessian call
+        self.timings = {}
+        # Name to position maps of the last KKT system (reused if the
+        # variables and constraints are the same)
+        self._kkt_positions = None
 
 
     def get_tmp_file(self):
@@ -135,17 +149,19 @@ class ReducedHessian(object):
                     }
             
         """
-        self.get_file_info()
-        
         if self.kkt_method == 'pynumero':
-        
+            
+            # The duals are initialized from the model's dual suffix and the
+            # NL file is handled internally, so nothing is read from disk
+            from pyomo.contrib.pynumero.interfaces.pyomo_nlp import PyomoNLP
+            
             nlp = PyomoNLP(self.model_object)
             varList = nlp.get_pyomo_variables()
             conList = nlp.get_pyomo_constraints()
             duals = nlp.get_duals()
             
-            J = nlp.extract_submatrix_jacobian(pyomo_variables=varList, pyomo_constraints=conList)
-            H = nlp.extract_submatrix_hessian_lag(pyomo_variables_rows=varList, pyomo_variables_cols=varList)
+            J = nlp.evaluate_jacobian()
+            H = nlp.evaluate_hessian_lag()
             J = csc_matrix(J)
             
             var_index_names = [v.name for v in varList]
@@ -153,6 +169,8 @@ class ReducedHessian(object):
             
         elif self.kkt_method == 'k_aug':
         
+            self.get_file_info()
+            
             kaug = SolverFactory('k_aug')
             
             kaug.options["deb_kkt"] = ""  
@@ -260,39 +278,19 @@ class ReducedHessian(object):
         return None
     
     def calculate_duals(self):
-        """Get duals"""
-    
-        # For testing - very slow and should not be used!
-        if self.kkt_method == 'pynumero':
+        """Get duals
         
-            nlp = PyomoNLP(self.model_object)
-            varList = nlp.get_pyomo_variables()
-            conList = nlp.get_pyomo_constraints()
-            duals = nlp.get_duals()
-            
-            J = nlp.extract_submatrix_jacobian(pyomo_variables=varList, pyomo_constraints=conList)
-            H = nlp.extract_submatrix_hessian_lag(pyomo_variables_rows=varList, pyomo_variables_cols=varList)
-            J = csc_matrix(J)
-            
-            var_index_names = [v.name for v in varList]
-            con_index_names = [v.name for v in conList]                       
-            
-            dummy_constraints = [f'{self.global_constraint_name}[{k}]' for k in self.parameter_set]
-            jac_row_ind = [con_index_names.index(d) for d in dummy_constraints] 
-            duals_imp = [duals[i] for i in jac_row_ind]
+        The duals of the global constraints are taken from the dual suffix
+        loaded into the model after the solve. This is the same for all KKT
+        methods and does not require any solver files.
         
-            self.duals = dict(zip(self.parameter_set, duals_imp))
-            if self.verbose:
-                print(f'The pynumero results are:')
-                print(self.duals)
-            
-        else:
-                         
-            self.duals = {key: self.model_object.dual[getattr(self.model_object, self.global_constraint_name)[key]] for key, val in getattr(self.model_object, self.global_param_name).items()}
-        
-            if self.verbose:
-                print('The duals are:')
-                print(self.duals)
+        """
+        global_constraint = getattr(self.model_object, self.global_constraint_name)
+        self.duals = {key: self.model_object.dual[global_constraint[key]] for key in getattr(self.model_object, self.global_param_name).keys()}
+    
+        if self.verbose:
+            print('The duals are:')
+            print(self.duals)
         
         self.delete_sol_files()
         
@@ -347,17 +345,35 @@ class ReducedHessian(object):
                 else:
                     v.fix()
         
+        # Repeated solves of the same model restart from the last multipliers
+        warm_start_options = {}
+        if self.warm_start and update_warm_start_in_place(self.model_object, warm_start_options):
+            for key, val in warm_start_options.items():
+                ipopt.options[key] = val
             
-        ipopt.solve(self.model_object, 
-                    symbolic_solver_labels=True, 
-                    keepfiles=True, 
-                    tee=True,
-                    logfile=tmpfile_i,
-                    )
-        #print(self.model_object.P.display())
+        if self.kkt_method == 'pynumero':
+            
+            # The KKT data is extracted from the model in memory
+            if not hasattr(self.model_object, 'dual'):
+                self.model_object.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+            
+            ipopt.solve(self.model_object, 
+                        symbolic_solver_labels=True, 
+                        tee=True,
+                        )
         
-        # Create the file object so that it can be deleted
-        self.get_file_info()
+        else:
+        
+            ipopt.solve(self.model_object, 
+                        symbolic_solver_labels=True, 
+                        keepfiles=True, 
+                        tee=True,
+                        logfile=tmpfile_i,
+                        )
+            #print(self.model_object.P.display())
+            
+            # Create the file object so that it can be deleted
+            self.get_file_info()
         
         return None
 
@@ -373,24 +389,32 @@ class ReducedHessian(object):
             reduced_hessian (numpy array): reduced hessian of the model
         
         """
+        self.timings = {'solve': 0.0}
         if optimize:
+            start = time.perf_counter()
             self.optimize_model(d)
+            self.timings['solve'] = time.perf_counter() - start
         
+        start = time.perf_counter()
         self.get_kkt_info()
+        self.timings['kkt'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
         H = self.kkt_data['H']
         J = self.kkt_data['J']
         var_ind = self.kkt_data['var_ind']
         con_ind_new = self.kkt_data['con_ind']
         duals = self.kkt_data['duals']
     
-        col_ind = [var_ind.index(f'{self.variable_name}[{v}]') for v in self.parameter_set]
+        var_pos, con_pos = self._get_kkt_positions(var_ind, con_ind_new)
+        col_ind = [var_pos[f'{self.variable_name}[{v}]'] for v in self.parameter_set]
         m, n = J.shape  
      
         if self.param_con_method == 'global':
             
             dummy_constraints = [f'{self.global_constraint_name}[{k}]' for k in self.parameter_set]
             #print(dummy_constraints)
-            jac_row_ind = [con_ind_new.index(d) for d in dummy_constraints] 
+            jac_row_ind = [con_pos[d] for d in dummy_constraints] 
             #duals_imp = [duals[i] for i in jac_row_ind]
             
             #print(J.shape, len(duals_imp))
@@ -417,18 +441,51 @@ class ReducedHessian(object):
         else:
             None
         
-        r_hess, Z_mat = self._reduced_hessian_matrix(J_f, J_l, H, col_ind)
+        r_hess, Z_mat = self._reduced_hessian_matrix(J_f, J_l, H, col_ind, return_Z=return_Z, use_lu_cache=self.use_lu_cache)
+        self.timings['linear_algebra'] = time.perf_counter() - start
        
         if not return_Z:
             return r_hess.todense()
         else:
             return r_hess.todense(), Z_mat
 
+    def _get_kkt_positions(self, var_ind, con_ind):
+        """Returns the name to position maps of the variables and constraints
+        in the KKT system, reusing the last maps if the names are unchanged
+        
+        Args:
+            var_ind (list): variable names in KKT order
+            
+            con_ind (list): constraint names in KKT order
+            
+        Returns:
+            var_pos, con_pos (tuple): the name to position dicts
+        
+        """
+        if self._kkt_positions is not None:
+            last_var_ind, last_con_ind, var_pos, con_pos = self._kkt_positions
+            if last_var_ind == var_ind and last_con_ind == con_ind:
+                return var_pos, con_pos
+        
+        var_pos = {name: i for i, name in enumerate(var_ind)}
+        con_pos = {name: i for i, name in enumerate(con_ind)}
+        self._kkt_positions = (list(var_ind), list(con_ind), var_pos, con_pos)
+        
+        return var_pos, con_pos
+
     @staticmethod
-    def _reduced_hessian_matrix(F, L, H, col_ind):
+    def _reduced_hessian_matrix(F, L, H, col_ind, return_Z=False, use_lu_cache=True):
         """This calculates the reduced hessian by calculating the null-space based
         on the constraints
         
+        The null-space basis Z has the identity in the parameter rows and
+        X = -L^-1 F in the other rows. X is solved with a (cached) sparse LU
+        factorization of L and Z^T H Z is formed from the blocks of H:
+            
+            X^T H_xx X + X^T H_xp + H_px X + H_pp
+            
+        so Z itself is only built if it is returned.
+        
         Args:
             F (csr_matrix): Rows of the Jacobian related to fixed parameters
             
@@ -437,31 +494,40 @@ class ReducedHessian(object):
             H (csr_matrix): The sparse Hessian
             
             col_ind (list): indicies of columns with fixed parameters
+            
+            return_Z (bool): return Z as a sparse matrix (None otherwise)
+            
+            use_lu_cache (bool): factorize L with lu_factor_cache
         
         Returns:
             reduced_hessian (csr_matrix): sparse version of the reduced Hessian
             
+            Z_mat (csr_matrix): the null-space basis
+            
         """
         n = H.shape[0]
-        n_free = n - F.shape[0]
+        n_free = len(col_ind)
         
-        X = spsolve(L.tocsc(), -F.tocsc())
+        col_mask = np.ones(n, dtype=bool)
+        col_mask[col_ind] = False
         
-        col_ind_left = list(set(range(n)).difference(set(col_ind)))
-        col_ind_left.sort()
+        lu = lu_factor_cache.factorize(L) if use_lu_cache else PermutedLU(csc_matrix(L))
+        X = lu.solve(-F.toarray().reshape(-1, n_free))
         
-        Z = np.zeros([n, n_free])
-        Z[col_ind, :] = np.eye(n_free)
+        H = H.tocsr()
+        H_x = H[col_mask]
+        H_p = H[col_ind]
+        H_px_X = H_p[:, col_mask] @ X
         
-        if isinstance(X, csc_matrix):
-            Z[col_ind_left, :] = X.todense()
-        else:
-            Z[col_ind_left, :] = X.reshape(-1, 1)
-            
-        Z_mat = coo_matrix(np.mat(Z)).tocsr()
-        Z_mat_T = coo_matrix(np.mat(Z).T).tocsr()
-        Hess = H.tocsr()
-        reduced_hessian = Z_mat_T * Hess * Z_mat
+        reduced_hessian = X.T @ (H_x[:, col_mask] @ X) + (H_x[:, col_ind].T @ X).T + H_px_X + H_p[:, col_ind].toarray()
+        reduced_hessian = csr_matrix(reduced_hessian)
+        
+        Z_mat = None
+        if return_Z:
+            Z = np.zeros((n, n_free))
+            Z[col_ind, :] = np.eye(n_free)
+            Z[col_mask, :] = X
+            Z_mat = csr_matrix(Z)
         
         return reduced_hessian, Z_mat
 
@@ -538,6 +604,135 @@ def read_duals(sol_file):
             
     return duals
 
+class SparseLUCache():
+    
+    """Sparse LU factorizations reused between reduced Hessian calculations
+    
+    The NSD and estimability loops factor the constraint Jacobian of the same
+    model many times. If the sparsity pattern was seen before, the column
+    ordering found for it is reused (the ordering step is skipped) and if the
+    values are also the same, the factorization itself is returned.
+    
+    Args:
+        max_size (int): the number of sparsity patterns kept (0 keeps
+            nothing, e.g. lu_factor_cache.max_size = 0 turns the shared
+            cache off)
+    
+    """
+    def __init__(self, max_size=8):
+        
+        self.max_size = max_size
+        self.hits = 0
+        self.pattern_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        
+    def __len__(self):
+        return len(self._entries)
+        
+    @staticmethod
+    def _keys(A):
+        
+        pattern = hashlib.sha1(np.asarray(A.shape).tobytes())
+        pattern.update(A.indptr.tobytes())
+        pattern.update(A.indices.tobytes())
+        values = hashlib.sha1(A.data.tobytes())
+        return pattern.hexdigest(), values.hexdigest()
+        
+    def factorize(self, A):
+        """Returns the LU factorization of A
+        
+        Args:
+            A (sparse matrix): the square matrix
+            
+        Returns:
+            lu (PermutedLU): the factorization (with a solve method)
+        
+        """
+        A = csc_matrix(A)
+        A.sort_indices()
+        
+        if self.max_size <= 0:
+            self.misses += 1
+            return PermutedLU(A)
+        
+        pattern_key, values_key = self._keys(A)
+        entry = self._entries.get(pattern_key)
+        
+        if entry is not None and entry['values'] == values_key:
+            self.hits += 1
+            lu = entry['lu']
+        elif entry is not None:
+            self.pattern_hits += 1
+            lu = PermutedLU(A, entry['lu'].col_order)
+        else:
+            self.misses += 1
+            lu = PermutedLU(A)
+            
+        self._entries[pattern_key] = {'values': values_key, 'lu': lu}
+        self._entries.move_to_end(pattern_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            
+        return lu
+    
+    def clear(self):
+        """Removes the factorizations and resets the counters"""
+        
+        self._entries.clear()
+        self.hits = 0
+        self.pattern_hits = 0
+        self.misses = 0
+        
+        return None
+    
+    def stats(self):
+        """Returns the cache statistics"""
+        
+        return {'hits': self.hits,
+                'pattern_hits': self.pattern_hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                }
+    
+
+class PermutedLU():
+    
+    """SuperLU factorization of A with a given column ordering
+    
+    Args:
+        A (csc_matrix): the square matrix
+        
+        col_order (np.ndarray): the column ordering. If None, it is found by
+            SuperLU (COLAMD) and kept for later factorizations
+    
+    """
+    def __init__(self, A, col_order=None):
+        
+        self._permuted = col_order is not None
+        if self._permuted:
+            self._lu = splu(A[:, col_order], permc_spec='NATURAL')
+            self.col_order = col_order
+        else:
+            self._lu = splu(A)
+            self.col_order = np.argsort(self._lu.perm_c)
+        
+    def solve(self, b):
+        """Solves A x = b"""
+        
+        y = self._lu.solve(np.asarray(b, dtype=float))
+        if not self._permuted:
+            return y
+        
+        x = np.empty_like(y)
+        x[self.col_order] = y
+        return x
+    
+
+# Shared by all ReducedHessian objects (NSD creates one for each scenario)
+lu_factor_cache = SparseLUCache()
+    
+
 def delete_from_csr(mat, row_indices=[], col_indices=[]):
     """
     Remove the rows (denoted by ``row_indices``) and columns (denoted by 
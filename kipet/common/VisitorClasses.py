@@ -53,6 +53,34 @@ class ReplacementVisitor(EXPR.ExpressionReplacementVisitor):
 
         return False, None
     
+class SubstitutionVisitor(EXPR.ExpressionReplacementVisitor):
+    
+    """Replaces several leaves in a single pass using a map of id(leaf) to
+    the replacement"""
+    
+    def __init__(self, substitution_map=None):
+        super(SubstitutionVisitor, self).__init__()
+        self._substitution_map = substitution_map if substitution_map is not None else {}
+
+    def change_substitution_map(self, substitution_map):
+        self._substitution_map = substitution_map
+
+    def visiting_potential_leaf(self, node):
+        
+        if node.__class__ is _PyomoUnit:
+            return True, node
+        
+        if node.__class__ in native_numeric_types:
+            return True, node
+
+        if node.__class__ is NumericConstant:
+            return True, node
+
+        if node.is_variable_type() or node.is_parameter_type():
+            return True, self._substitution_map.get(id(node), node)
+
+        return False, None
+    
 class ScalingVisitor(EXPR.ExpressionReplacementVisitor):
 
     def __init__(self, scale):
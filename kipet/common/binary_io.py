@@ -0,0 +1,259 @@
+"""
+Binary (NPZ) storage for data and results
+
+Each variable is stored as its own arrays in an uncompressed NPZ archive
+together with a JSON metadata header. The archive is read lazily by numpy, so
+single variables can be loaded from large result files without reading the
+rest. Values are stored at full precision (no text conversion).
+
+    write_npz('results.npz', {'C': C, 'S': S, 'P': P}, metadata={'name': 'r1'})
+    with BinaryStore('results.npz') as store:
+        S = store['S']
+"""
+# Standard library imports
+import json
+from pathlib import Path
+
+# Third party imports
+import numpy as np
+import pandas as pd
+
+META_KEY = '__meta__'
+
+
+def _encode_labels(labels):
+    """Returns the labels of an index as an array (numeric labels) or a JSON
+    compatible list (tuples are stored as lists and flagged)
+
+    """
+    labels = pd.Index(labels)
+    if labels.nlevels == 1 and (pd.api.types.is_numeric_dtype(labels.dtype) or pd.api.types.is_bool_dtype(labels.dtype)):
+        return 'array', labels.to_numpy()
+
+    encoded = []
+    for label in labels:
+        if isinstance(label, tuple):
+            encoded.append({'tuple': [_to_json(l) for l in label]})
+        else:
+            encoded.append(_to_json(label))
+
+    return 'json', encoded
+
+
+def _decode_labels(kind, labels):
+    """Inverse of _encode_labels"""
+
+    if kind == 'array':
+        return pd.Index(labels)
+
+    decoded = [tuple(l['tuple']) if isinstance(l, dict) else l for l in labels]
+    if any(isinstance(l, tuple) for l in decoded):
+        return pd.Index(decoded, tupleize_cols=False)
+
+    return pd.Index(decoded, dtype=object if decoded else None)
+
+
+def _to_json(value):
+    """Converts numpy scalars into Python types"""
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+_scalar_types = (int, float, bool, str, np.generic)
+
+
+def _numeric_dict(var):
+    """True if all values of a dict are numbers"""
+
+    return len(var) > 0 and all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in var.values())
+
+
+def storable(var):
+    """Returns True if var can be stored with write_npz"""
+
+    if isinstance(var, (pd.DataFrame, pd.Series, np.ndarray)):
+        return var.dtype != object if hasattr(var, 'dtype') else all(dtype != object for dtype in var.dtypes)
+    if isinstance(var, dict):
+        return _numeric_dict(var)
+    if isinstance(var, (list, tuple)):
+        return all(isinstance(v, _scalar_types) for v in var)
+
+    return isinstance(var, _scalar_types + (Path,))
+
+
+def write_npz(filename, variables, metadata=None):
+    """Writes DataFrames, Series, arrays and scalars to an NPZ archive
+
+    Args:
+        filename (str): the file name (.npz is added if missing)
+
+        variables (dict): the variables to store by name
+
+        metadata (dict): JSON compatible information about the object
+
+    Returns:
+        filename (Path): the file written
+
+    """
+    filename = Path(filename)
+    if filename.suffix != '.npz':
+        filename = filename.with_suffix('.npz')
+
+    arrays = {}
+    header = {'metadata': metadata or {}, 'variables': {}}
+
+    for name, var in variables.items():
+        if var is None:
+            continue
+
+        if isinstance(var, pd.DataFrame):
+            info = {'type': 'frame'}
+            arrays[f'{name}.values'] = var.to_numpy()
+            for axis, labels in [('index', var.index), ('columns', var.columns)]:
+                kind, encoded = _encode_labels(labels)
+                info[axis] = kind
+                if kind == 'array':
+                    arrays[f'{name}.{axis}'] = encoded
+                else:
+                    info[f'{axis}_labels'] = encoded
+
+        elif isinstance(var, pd.Series):
+            info = {'type': 'series', 'name': _to_json(var.name)}
+            arrays[f'{name}.values'] = var.to_numpy()
+            kind, encoded = _encode_labels(var.index)
+            info['index'] = kind
+            if kind == 'array':
+                arrays[f'{name}.index'] = encoded
+            else:
+                info['index_labels'] = encoded
+
+        elif isinstance(var, dict) and _numeric_dict(var):
+            info = {'type': 'dict'}
+            arrays[f'{name}.values'] = np.array(list(var.values()), dtype=float)
+            kind, encoded = _encode_labels(pd.Index(list(var.keys()), tupleize_cols=False))
+            info['index'] = kind
+            if kind == 'array':
+                arrays[f'{name}.index'] = encoded
+            else:
+                info['index_labels'] = encoded
+
+        elif isinstance(var, np.ndarray):
+            info = {'type': 'array'}
+            arrays[f'{name}.values'] = var
+
+        elif isinstance(var, (list, tuple)) and all(isinstance(v, _scalar_types) for v in var):
+            info = {'type': 'list', 'value': [_to_json(v) for v in var]}
+
+        elif isinstance(var, _scalar_types):
+            info = {'type': 'scalar', 'value': _to_json(var)}
+
+        elif isinstance(var, Path):
+            info = {'type': 'scalar', 'value': str(var)}
+
+        else:
+            raise TypeError(f'{name} of type {type(var).__name__} cannot be stored in the binary format')
+
+        if f'{name}.values' in arrays and arrays[f'{name}.values'].dtype == object:
+            raise TypeError(f'{name} has object values and cannot be stored in the binary format')
+
+        header['variables'][name] = info
+
+    arrays[META_KEY] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+    np.savez(filename, **arrays)
+
+    return filename
+
+
+class BinaryStore():
+
+    """Lazy reader for NPZ archives made by write_npz
+
+    Only the header is read when the store is opened; each variable is read
+    from the archive when it is requested.
+
+    Args:
+        filename (str): the NPZ file
+
+    """
+    def __init__(self, filename):
+
+        self.filename = Path(filename)
+        self._archive = np.load(self.filename, allow_pickle=False)
+        header = json.loads(self._archive[META_KEY].tobytes().decode())
+        self.metadata = header['metadata']
+        self.variables = header['variables']
+
+    def __repr__(self):
+        return f'BinaryStore({self.filename.name}: {", ".join(self.variables)})'
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def __iter__(self):
+        return iter(self.variables)
+
+    def __getitem__(self, name):
+        return self.load(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def names(self):
+        return list(self.variables)
+
+    def _labels(self, name, info, axis):
+
+        if info[axis] == 'array':
+            return _decode_labels('array', self._archive[f'{name}.{axis}'])
+        return _decode_labels('json', info[f'{axis}_labels'])
+
+    def load(self, name):
+        """Reads a single variable from the archive
+
+        Args:
+            name (str): the variable name
+
+        Returns:
+            The DataFrame, Series, array or scalar stored under name
+
+        """
+        if name not in self.variables:
+            raise KeyError(f'{name} is not stored in {self.filename}')
+
+        info = self.variables[name]
+
+        if info['type'] == 'scalar':
+            return info['value']
+
+        if info['type'] == 'list':
+            return list(info['value'])
+
+        values = self._archive[f'{name}.values']
+
+        if info['type'] == 'frame':
+            return pd.DataFrame(data=values,
+                                index=self._labels(name, info, 'index'),
+                                columns=self._labels(name, info, 'columns'),
+                                copy=False)
+
+        if info['type'] == 'series':
+            return pd.Series(data=values, index=self._labels(name, info, 'index'), name=info['name'])
+
+        if info['type'] == 'dict':
+            return dict(zip(self._labels(name, info, 'index'), values.tolist()))
+
+        return values
+
+    def close(self):
+        """Closes the archive"""
+
+        self._archive.close()
+
+        return None
@@ -6,11 +6,12 @@ Component expression handling and units model development
 # Third party imports
 from pyomo.core.base.PyomoModel import ConcreteModel
 from pyomo.core.base.var import Var
+from pyomo.core.expr.visitor import identify_variables
 from pyomo.environ import units as u
 
 # KIPET library imports
 from kipet.post_model_build.pyomo_model_tools import get_index_sets
-from kipet.common.VisitorClasses import ReplacementVisitor
+from kipet.common.VisitorClasses import ReplacementVisitor, SubstitutionVisitor
 from kipet.post_model_build.replacement import _update_expression
 from kipet.top_level.variable_names import VariableNames
 
@@ -118,6 +119,59 @@ class Comp():
         return list(self.var_dict.keys())
     
     
+class ExpressionTemplate():
+    
+    """Expression written with the placeholder variables of a Comp dict that
+    can be instantiated at any time point
+    
+    The expression is analyzed once to find which placeholders it uses. Each
+    instance is then made with a single substitution pass over the expression
+    instead of one pass for every placeholder.
+    
+    Args:
+        expr (expression): expression using the placeholder variables
+        
+        c_mod (dict): component name to [model variable name, placeholder]
+    
+    """
+    def __init__(self, expr, c_mod):
+        
+        self.expr = expr
+        self.visitor = SubstitutionVisitor()
+        
+        placeholders = {}
+        for name, obj_list in c_mod.items():
+            model_var, placeholder = obj_list[0], obj_list[1]
+            time_indexed = not isinstance(placeholder.index(), int)
+            placeholders[id(placeholder)] = (model_var, name, time_indexed)
+        
+        self.leaves = []
+        for leaf in identify_variables(expr, include_fixed=True):
+            if id(leaf) in placeholders:
+                self.leaves.append((id(leaf),) + placeholders[id(leaf)])
+        
+    def substitution_map(self, model, t):
+        """Returns the map of placeholder ids to the model variables at t"""
+        
+        sub_map = {}
+        for leaf_id, model_var, name, time_indexed in self.leaves:
+            if time_indexed:
+                sub_map[leaf_id] = getattr(model, model_var)[t, name]
+            else:
+                sub_map[leaf_id] = getattr(model, model_var)[name]
+                
+        return sub_map
+        
+    def instantiate(self, model, t):
+        """Returns the expression using the variables of model at time t"""
+        
+        if len(self.leaves) == 0:
+            return self.expr
+        
+        self.visitor.change_substitution_map(self.substitution_map(model, t))
+        return self.visitor.dfs_postorder_stack(self.expr)
+    
+    
 # class Comp_Check():
     
 #     var = VariableNames()
@@ -3,30 +3,109 @@ Diagnostic Tools used in Kipet
 """
 import numpy as np
 import pandas as pd
-import scipy
+import scipy.linalg
 
+svd_methods = ['economy', 'randomized', 'streaming']
 
-def rank(A, eps=1e-10):
+
+def truncated_svd(A, k=None, method='economy', compute_uv=True, oversampling=10, n_iter=4, chunk_size=1000, seed=None):
+    """ Computes the k largest singular values (and vectors) of a matrix
+    without forming the full orthogonal factors
+    
+        Args:
+            A (array-like): the matrix (times x wavelengths for spectral data)
+            
+            k (int): the number of singular values to keep (all if None)
+            
+            method (str): 'economy' (LAPACK thin SVD), 'randomized' (range
+                finder with power iterations, requires k) or 'streaming' (QR
+                factorizations of chunks of rows combined into one R (at most n x n),
+                whose SVD is taken)
+            
+            compute_uv (bool): return the singular vectors as well
+            
+            oversampling (int): extra random vectors for the randomized method
+            
+            n_iter (int): power iterations for the randomized method
+            
+            chunk_size (int): rows per chunk for the streaming method
+            
+            seed (int): random seed for the randomized method
+
+        Returns:
+            U, s, Vh (tuple): the k leading singular vectors and values
+            (only s if compute_uv is False)
+
+    """
+    A = np.asarray(A, dtype=float)
+    m, n = A.shape
+    k = min(m, n) if k is None else min(int(k), m, n)
+    
+    if method not in svd_methods:
+        raise ValueError(f'method must be one of {svd_methods}')
+    
+    if method == 'randomized' and k + oversampling >= min(m, n):
+        method = 'economy'
+    
+    if method == 'economy':
+        if not compute_uv:
+            return np.linalg.svd(A, compute_uv=False)[:k]
+        U, s, Vh = np.linalg.svd(A, full_matrices=False)
+        return U[:, :k], s[:k], Vh[:k]
+    
+    if method == 'randomized':
+        rng = np.random.default_rng(seed)
+        Q, _ = np.linalg.qr(A @ rng.standard_normal((n, k + oversampling)))
+        for i in range(n_iter):
+            Z, _ = np.linalg.qr(A.T @ Q)
+            Q, _ = np.linalg.qr(A @ Z)
+        if not compute_uv:
+            return np.linalg.svd(Q.T @ A, compute_uv=False)[:k]
+        U_B, s, Vh = np.linalg.svd(Q.T @ A, full_matrices=False)
+        return (Q @ U_B)[:, :k], s[:k], Vh[:k]
+    
+    # TSQR: the R of each chunk is stacked onto the R of the rows before it
+    R = np.zeros((0, n))
+    for start in range(0, m, chunk_size):
+        R = np.linalg.qr(np.vstack([R, A[start:start + chunk_size]]), mode='r')
+    
+    if not compute_uv:
+        return np.linalg.svd(R, compute_uv=False)[:k]
+    
+    _, s, Vh = np.linalg.svd(R, full_matrices=False)
+    s = s[:k]
+    V = Vh[:k].T
+    scale = np.divide(1, s, out=np.zeros_like(s), where=s > 0)
+    U = np.empty((m, k))
+    for start in range(0, m, chunk_size):
+        U[start:start + chunk_size] = (A[start:start + chunk_size] @ V)*scale
+    
+    return U, s, V.T
+
+
+def rank(A, eps=1e-10, method='economy', k=None, **kwargs):
     """ obtains the rank of a matrix based on SVD
     
         Args:
             eps (optional, float): the value of the singular values that corresponds to 0 
                             when smaller than eps. Default = 1e-10
+                            
+            method (str): the SVD method (see truncated_svd)
+            
+            k (int): only the k largest singular values are computed; the
+                rank is then at most k
+                
+            kwargs: passed to truncated_svd
 
         Returns:
             rank (int): The rank of the matrix
 
     """
-    print(type(A))  
-    if isinstance(A, np.matrix):
-        u, s, vh = np.linalg.svd(A)
-        return len([x for x in s if abs(x) > eps]) 
-    elif isinstance(A, pd.core.frame.DataFrame): 
-        A = np.array(A)
-        U, s, V = np.linalg.svd(A, full_matrices=True)
-        return len([x for x in s if abs(x) > eps]) 
-    else:
+    if not isinstance(A, (np.ndarray, pd.DataFrame)):
         raise RuntimeError("Must provide A as either numpy matrix or pandas dataframe")
+    
+    s = truncated_svd(np.atleast_2d(A), k=k, method=method, compute_uv=False, **kwargs)
+    return int((np.abs(s) > eps).sum())
 
 def nullspace(A, atol=1e-13, rtol=0):
     """ obtains the nullspace of a matrix based on SVD. Taken from the SciPy cookbook
@@ -49,13 +128,14 @@ def nullspace(A, atol=1e-13, rtol=0):
 
     """
     A = np.atleast_2d(A)
-    u, s, vh = scipy.linalg.svd(A)
+    # The full Vh is only needed when A has fewer rows than columns
+    u, s, vh = scipy.linalg.svd(A, full_matrices=A.shape[0] < A.shape[1])
     tol = max(atol, rtol * s[0])
     nnz = (s >= tol).sum()
     ns = vh[nnz:].conj().T
     return ns
        
-def basic_pca(dataFrame,n=None,with_plots=False):
+def basic_pca(dataFrame, n=None, with_plots=False, method='economy', **kwargs):
     """ Runs basic component analysis based on SVD
     
         Args:
@@ -65,38 +145,35 @@ def basic_pca(dataFrame,n=None,with_plots=False):
             to plot
             
             with_plots (boolean): argument for files with plots due to testing
+            
+            method (str): the SVD method (see truncated_svd), 'randomized'
+                requires n
+            
+            kwargs: passed to truncated_svd
 
         Returns:
-            None
+            U, s, V (tuple): the n leading singular vectors and values
 
     """
             
     times = np.array(dataFrame.index)
     lambdas = np.array(dataFrame.columns)
     D = np.array(dataFrame)
-    #print("D shape: ", D.shape)
-    U, s, V = np.linalg.svd(D, full_matrices=True)
-    #print("U shape: ", U.shape)
-    #print("s shape: ", s.shape)
-    #print("V shape: ", V.shape)
-    #print("sigma/singular values", s)
+    
     if n == None:
         print("WARNING: since no number of components is specified, all components are printed")
         print("It is advised to select the number of components for n")
-        n_shape = s.shape
-        n = n_shape[0]
+        if method == 'randomized':
+            raise ValueError('The randomized SVD requires the number of components n')
         
-    u_shape = U.shape
-    #print("u_shape[0]",u_shape[0])
-    n_l_vector = n if u_shape[0]>=n else u_shape[0]
-    n_singular = n if len(s)>=n else len(s)
-    idxs = range(n_singular)
-    vals = [s[i] for i in idxs]
-    v_shape = V.shape
-    n_r_vector = n if v_shape[0]>=n else v_shape[0]
+    U, s, V = truncated_svd(D, k=n, method=method, **kwargs)
+    idxs = range(len(s))
+    vals = list(s)
     
     if with_plots:
-        for i in range(n_l_vector):
+        import matplotlib.pyplot as plt
+        
+        for i in range(U.shape[1]):
             plt.plot(times,U[:,i])
         plt.xlabel("time")
         plt.ylabel("Components U[:,i]")
@@ -107,13 +184,15 @@ def basic_pca(dataFrame,n=None,with_plots=False):
         plt.ylabel("singular values")
         plt.show()
         
-        for i in range(n_r_vector):
+        for i in range(V.shape[0]):
             plt.plot(lambdas,V[i,:])
         plt.xlabel("wavelength")
         plt.ylabel("Components V[i,:]")
         plt.show()
+        
+    return U, s, V
 
-def perform_data_analysis(dataFrame, pseudo_equiv_matrix, rank_data):  
+def perform_data_analysis(dataFrame, pseudo_equiv_matrix, rank_data=None, eps=1e-10, method='economy', k=None):  
     """ Runs the analysis by Chen, et al, 2018, based upon the pseudo-equivalency
     matrix. User provides the data and the pseudo-equivalency matrix and the analysis
     provides suggested number of absorbing components as well as whether there are
@@ -125,9 +204,14 @@ def perform_data_analysis(dataFrame, pseudo_equiv_matrix, rank_data):
             pseudo_equiv_matrix (list of lists): list containing the rows of the pseudo-equivalency
                                 matrix.
             
-            rank_data (int): rank of the data matrix, as determined from SVD (number of coloured species)
+            rank_data (int): rank of the data matrix, as determined from SVD (number of coloured species).
+                                Computed from the data if None
                 
-            with_plots (boolean): argument for files with plots due to testing
+            eps (float): singular values below eps are zero when computing rank_data
+            
+            method (str): the SVD method used for rank_data (see truncated_svd)
+            
+            k (int): the number of singular values computed for rank_data
 
         Returns:
             None
@@ -158,6 +242,9 @@ def perform_data_analysis(dataFrame, pseudo_equiv_matrix, rank_data):
         print("Choose the following number of absorbing species:", ncr)
     else:
         ncr = num_components
+    if rank_data is None:
+        rank_data = rank(dataFrame, eps=eps, method=method, k=k)
+        print("Rank of the data matrix is ", rank_data)
     ncms = rank_data
     
     if ncr == ncms:
@@ -166,4 +253,57 @@ def perform_data_analysis(dataFrame, pseudo_equiv_matrix, rank_data):
         print("Solve with unwanted contributions")
     else:
         print("There may be uncounted for species in the model, or multiple sources of unknown contributions")
-    
\ No newline at end of file
+    
+def lack_of_fit_maps(D, C, S):
+    """ Computes the lack of fit of the model D = C*S^T for spectral data
+    
+        Args:
+            D (np.ndarray): spectral data (times x wavelengths)
+            
+            C (np.ndarray): absorbing concentrations (times x components)
+            
+            S (np.ndarray): absorbances (wavelengths x components)
+            
+        Returns:
+            lof (float): percentage lack of fit over all data
+            
+            residuals (np.ndarray): D - C*S^T (times x wavelengths)
+            
+            lof_wavelength (np.ndarray): percentage lack of fit per wavelength
+            
+            lof_time (np.ndarray): percentage lack of fit per time
+
+    """
+    residuals = D - C @ S.T
+    e_sq = residuals**2
+    d_sq = D**2
+    
+    lof = np.sqrt(e_sq.sum()/d_sq.sum())*100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lof_wavelength = np.sqrt(e_sq.sum(axis=0)/d_sq.sum(axis=0))*100
+        lof_time = np.sqrt(e_sq.sum(axis=1)/d_sq.sum(axis=1))*100
+    
+    return lof, residuals, lof_wavelength, lof_time
+
+def wavelength_correlation_matrix(D, C):
+    """ Computes the correlation between each wavelength of the spectral data
+    and each concentration profile over time
+    
+        Args:
+            D (np.ndarray): spectral data (times x wavelengths)
+            
+            C (np.ndarray): concentrations (times x components)
+            
+        Returns:
+            correlations (np.ndarray): correlations (wavelengths x components)
+
+    """
+    nt = D.shape[0]
+    D_centered = D - D.mean(axis=0)
+    C_centered = C - C.mean(axis=0)
+    
+    cov_d_c = D_centered.T @ C_centered/(nt - 1)
+    s_d = np.sqrt((D_centered**2).sum(axis=0)/(nt - 1))
+    s_c = np.sqrt((C_centered**2).sum(axis=0)/(nt - 1))
+    
+    return cov_d_c/np.outer(s_d, s_c)
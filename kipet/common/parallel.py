@@ -0,0 +1,135 @@
+"""
+Parallel execution helpers
+
+This module provides a small process pool wrapper used to solve independent
+KIPET sub-problems (NSD scenarios, individual experiments, etc.) concurrently.
+
+Each worker process runs inside its own temporary directory so that the files
+written by ipopt, k_aug and the ReducedHessian log files cannot collide
+between workers.
+"""
+# Standard library imports
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Third party imports
+from pyomo.common.tempfiles import TempfileManager
+
+# State handed to each worker process when the pool is started
+_worker_state = {}
+
+
+def get_worker_state():
+    """Returns the dict of objects shared with the current worker process
+
+    Returns:
+        _worker_state (dict): the shared objects passed to the WorkerPool
+
+    """
+    return _worker_state
+
+
+def resolve_workers(workers, n_tasks=None):
+    """Converts the user input for the number of workers into an integer
+
+    Args:
+        workers (int): number of processes (None uses all available CPUs)
+
+        n_tasks (int): optional number of tasks, the pool is never larger
+
+    Returns:
+        workers (int): the number of worker processes to use
+
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    workers = max(int(workers), 1)
+
+    if n_tasks is not None:
+        workers = min(workers, max(n_tasks, 1))
+
+    return workers
+
+
+def _get_context():
+    """Fork is preferred since the shared Pyomo models are then inherited by
+    the workers and do not need to be pickled
+
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+
+    return multiprocessing.get_context()
+
+
+def _initialize_worker(base_dir, shared):
+    """Moves the worker into its own working directory and stores the shared
+    objects
+
+    """
+    work_dir = os.path.join(base_dir, f'worker_{os.getpid()}')
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)
+    TempfileManager.tempdir = work_dir
+
+    _worker_state.clear()
+    _worker_state.update(shared)
+
+    return None
+
+
+class WorkerPool():
+
+    """Process pool with isolated temporary file namespaces per worker
+
+    Args:
+        workers (int): number of worker processes
+
+        shared (dict): objects made available to the workers through
+            get_worker_state
+
+    """
+    def __init__(self, workers, shared=None):
+
+        self.workers = resolve_workers(workers)
+        self.shared = shared if shared is not None else {}
+        self._base_dir = tempfile.mkdtemp(prefix='kipet_pool_')
+        self._pool = _get_context().Pool(processes=self.workers,
+                                         initializer=_initialize_worker,
+                                         initargs=(self._base_dir, self.shared),
+                                         )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def map(self, func, tasks):
+        """Evaluates func for each task - the order of the results matches the
+        order of the tasks
+
+        Args:
+            func (function): module level function taking a single task
+
+            tasks (list): list of task arguments
+
+        Returns:
+            results (list): list of results in the order of tasks
+
+        """
+        return self._pool.map(func, tasks, chunksize=1)
+
+    def close(self):
+        """Stops the workers and removes their temporary directories"""
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            shutil.rmtree(self._base_dir, ignore_errors=True)
+
+        return None
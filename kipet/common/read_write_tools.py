@@ -11,6 +11,7 @@ import sys
 import numpy as np
 import pandas as pd
 
+from kipet.common.binary_io import BinaryStore, write_npz
 #from kipet.top_level.settings import USER_DEFINED_SETTINGS
 
 DEFAULT_DIR = Path.cwd()
@@ -39,11 +40,17 @@ DEFAULT_DIR = Path.cwd()
 #         # It uses the absolute path provided
 #         return Path(filename)
 
-def read_file(filename, directory=DEFAULT_DIR):       
+def read_file(filename, directory=DEFAULT_DIR, dtype=None, chunk_size=None):       
     """ Reads data from a csv or txt file and converts it to a DataFrame
     
         Args:
             filename (str): name of input file (abs path)
+            
+            dtype (str or np.dtype): storage type of the values (e.g.
+                np.float32 for large spectral files). Default is float64.
+            
+            chunk_size (int): number of lines parsed at once. If None the
+                whole file is parsed in one pass.
           
         Returns:
             DataFrame
@@ -51,22 +58,20 @@ def read_file(filename, directory=DEFAULT_DIR):
     """
     
     filename = Path(filename)
-    data_dict = {}
     
     if filename.suffix == '.txt':
-        with open(filename, 'r') as f:
-            for line in f:
-                if line not in ['','\n','\t','\t\n']:
-                    l = line.split()
-                    if is_float_re(l[1]):
-                        l[1] = float(l[1])
-                    data_dict[float(l[0]), l[1]] = float(l[2])
-        
-        df_data = dict_to_df(data_dict)
-        df_data.sort_index(ascending=True, inplace=True)
+        df_data = read_triplet_file(filename, dtype=dtype, chunk_size=chunk_size)
 
     elif filename.suffix == '.csv':
-        df_data = pd.read_csv(filename, index_col=0)   
+        df_data = _read_csv(filename, chunk_size=chunk_size)
+        if dtype is not None:
+            df_data = df_data.astype(dtype, copy=False)
+
+    elif filename.suffix == '.npz':
+        with BinaryStore(filename) as store:
+            df_data = store.load('data')
+        if dtype is not None:
+            df_data = df_data.astype(dtype, copy=False)
 
     else:
         raise ValueError(f'The file extension {filename.suffix} is currently not supported')
@@ -75,6 +80,95 @@ def read_file(filename, directory=DEFAULT_DIR):
     return df_data
     
 
+def read_triplet_file(filename, dtype=None, chunk_size=None):
+    """Reads a txt file with one "index column value" triplet per line and
+    pivots it into a DataFrame (index x columns)
+    
+    The file is parsed into three columns by the pandas C parser (in chunks
+    if chunk_size is given) and pivoted once, rather than building a
+    dictionary line by line. Column labels that are numbers are stored as
+    floats, the others (component names) as strings. If a triplet is repeated
+    the last value is kept.
+    
+        Args:
+            filename (str): name of input file
+            
+            dtype (str or np.dtype): storage type of the values
+            
+            chunk_size (int): number of lines parsed at once
+            
+        Returns:
+            DataFrame (sorted by index and columns)
+    
+    """
+    dtype = np.dtype(float if dtype is None else dtype)
+    reader = pd.read_csv(filename,
+                         sep=r'\s+',
+                         header=None,
+                         names=['index', 'column', 'value'],
+                         usecols=[0, 1, 2],
+                         dtype={'index': float, 'column': str, 'value': float},
+                         float_precision='round_trip',
+                         chunksize=chunk_size,
+                         )
+    chunks = [reader] if chunk_size is None else reader
+    
+    index = []
+    columns = []
+    values = []
+    for chunk in chunks:
+        index.append(chunk['index'].to_numpy())
+        columns.append(chunk['column'].to_numpy())
+        values.append(chunk['value'].to_numpy(dtype=dtype))
+    
+    columns = np.concatenate(columns) if columns else np.array([], dtype=object)
+    labels = pd.to_numeric(pd.Series(columns, dtype=object), errors='coerce')
+    if labels.notna().all():
+        columns = labels.to_numpy(dtype=float)
+    else:
+        columns = np.where(labels.notna(), labels.astype(object), columns)
+    
+    triplets = pd.DataFrame({'index': np.concatenate(index) if index else np.array([], dtype=float),
+                             'column': columns,
+                             'value': np.concatenate(values) if values else np.array([], dtype=dtype),
+                             })
+    triplets.drop_duplicates(subset=['index', 'column'], keep='last', inplace=True)
+    df_data = triplets.pivot(index='index', columns='column', values='value')
+    df_data.index.name = None
+    df_data.columns.name = None
+    df_data.sort_index(ascending=True, inplace=True)
+    
+    return df_data
+
+
+def _read_csv(filename, chunk_size=None, **kwargs):
+    """Reads a csv file with the first column as the index, optionally in
+    chunks of rows"""
+    
+    if chunk_size is None:
+        return pd.read_csv(filename, index_col=0, **kwargs)
+    
+    return pd.concat(pd.read_csv(filename, index_col=0, chunksize=chunk_size, **kwargs))
+
+
+def timestamps_to_seconds(timestamps):
+    """Converts "hh:mm:ss" timestamps to seconds in one pass
+    
+        Args:
+            timestamps (array-like): the timestamps (str)
+            
+        Returns:
+            seconds (np.ndarray): the times in seconds
+    
+    """
+    parts = pd.Index(timestamps).astype(str).str.split(':', expand=True)
+    if parts.nlevels != 3:
+        raise ValueError('Instrument timestamps must have the format hh:mm:ss')
+    
+    h, m, s = (parts.get_level_values(i).astype(float).to_numpy() for i in range(3))
+    return (h*60 + m)*60 + s
+
+    
 def write_file(filename, dataframe, filetype='csv'):
     """ Write data to file.
     
@@ -83,7 +177,7 @@ def write_file(filename, dataframe, filetype='csv'):
           
             dataframe (DataFrame): pandas DataFrame
         
-            filetype (str): choice of output (csv, txt)
+            filetype (str): choice of output (csv, txt, npz)
         
         Returns:
             None
@@ -92,7 +186,7 @@ def write_file(filename, dataframe, filetype='csv'):
     # How can you write a general settings file/class/object?
     print(f'Here is the filename: {filename}')
     
-    if filetype not in ['csv', 'txt']:
+    if filetype not in ['csv', 'txt', 'npz']:
         print('Savings as CSV - invalid file extension given')
         filetype = 'csv'
     
@@ -104,7 +198,7 @@ def write_file(filename, dataframe, filetype='csv'):
         filename = filename.with_suffix(suffix)
     else:
         suffix = filename.suffix
-        if suffix not in ['.txt', '.csv']:
+        if suffix not in ['.txt', '.csv', '.npz']:
             print('Savings as CSV - invalid file extension given')
             filename = Path(filename.stem).with_suffix('.csv')
     
@@ -112,17 +206,19 @@ def write_file(filename, dataframe, filetype='csv'):
     if filename.suffix == '.csv':
         dataframe.to_csv(filename)
 
-    elif filename.suffix == '.txt':    
+    elif filename.suffix == '.txt':
+        # One "index column value" line per entry, missing values are skipped
+        stacked = dataframe.stack(dropna=True)
         with open(filename, 'w') as f:
-            for i in dataframe.index:
-                for j in dataframe.columns:
-                    if not np.isnan(dataframe[j][i]):
-                        f.write("{0} {1} {2}\n".format(i,j,dataframe[j][i]))
+            f.writelines(f"{i} {j} {v}\n" for (i, j), v in zip(stacked.index, stacked.to_numpy()))
+    
+    elif filename.suffix == '.npz':
+        write_npz(filename, {'data': dataframe})
                         
     print(f'Data saved     : {filename}')
     return None
 
-def read_spectral_data_from_csv(filename, instrument = False, negatives_to_zero = False):
+def read_spectral_data_from_csv(filename, instrument = False, negatives_to_zero = False, dtype=None, chunk_size=None):
     """ Reads csv with spectral data
     
         Args:
@@ -130,23 +226,23 @@ def read_spectral_data_from_csv(filename, instrument = False, negatives_to_zero
             instrument (bool): if data is direct from instrument
             negatives_to_zero (bool): if data contains negatives and baseline shift is not
                                         done then this forces negative values to zero.
+            dtype (str or np.dtype): storage type of the values (e.g. np.float32)
+            chunk_size (int): number of rows parsed at once (all if None)
 
         Returns:
             DataFrame
 
     """
-    data = pd.read_csv(filename, index_col=0)
+    data = _read_csv(filename, chunk_size=chunk_size)
     if instrument:
-        #this means we probably have a date/timestamp on the columns
-        data = pd.read_csv(filename,index_col=0, parse_dates = True)
+        #this means we probably have a timestamp (hh:mm:ss) on the columns
         data = data.T
-        for n in data.index:
-            h,m,s = n.split(':')
-            sec = (float(h)*60+float(m))*60+float(s)
-            data.rename(index={n:sec}, inplace=True)
-        data.index = [float(n) for n in data.index]
+        data.index = timestamps_to_seconds(data.index)
     else:
-        data.columns = [float(n) for n in data.columns]
+        data.columns = data.columns.astype(float)
+
+    if dtype is not None:
+        data = data.astype(dtype, copy=False)
 
     #If we have negative values then this makes them equal to zero
     if negatives_to_zero:
@@ -0,0 +1,193 @@
+"""
+Structured B and Vd operators for the spectral parameter covariance
+
+The covariance of the parameters in the spectral problem is
+
+    V_theta = (H B) Vd (H B)^T
+
+where H holds the parameter rows of the reduced Hessian, B is the derivative
+of the objective with respect to the data and Vd is the covariance of the
+data. For an experiment with nt times, nw wavelengths and nc components the
+dense B has (nc*(nt + nw) + nparams) x nt*nw entries and Vd is block diagonal
+with nt identical nw x nw blocks
+
+    V0 = S diag(sigma_k) S^T + sigma_device I
+
+Both are fully described by C, S and the variances, so the products needed
+here are formed from reshaped arrays and never from the dense matrices.
+"""
+import numpy as np
+import scipy.sparse
+
+
+class SpectralBlock():
+
+    """The data of one spectral experiment used in the covariance
+
+    Args:
+        C (np.ndarray): concentrations (times x components)
+
+        S (np.ndarray): absorbances (wavelengths x components)
+
+        component_variances (np.ndarray): variance of each component
+
+        device_variance (float): the measurement variance
+
+        c_offset (int): column of the first C entry in the reduced Hessian
+
+        s_offset (int): column of the first S entry in the reduced Hessian
+
+        d_offset (int): position of the first data point of this experiment
+
+    """
+    def __init__(self, C, S, component_variances, device_variance, c_offset, s_offset, d_offset=0):
+
+        self.C = np.asarray(C, dtype=float)
+        self.S = np.asarray(S, dtype=float)
+        self.component_variances = np.asarray(component_variances, dtype=float)
+        self.device_variance = float(device_variance)
+        self.c_offset = c_offset
+        self.s_offset = s_offset
+        self.d_offset = d_offset
+
+    @property
+    def nt(self):
+        return self.C.shape[0]
+
+    @property
+    def nw(self):
+        return self.S.shape[0]
+
+    @property
+    def nc(self):
+        return self.C.shape[1]
+
+    @property
+    def nd(self):
+        return self.nt*self.nw
+
+    def HB(self, H, times=slice(None)):
+        """Returns H @ B restricted to this experiment as (times, nw, nparams)
+
+        Column i*nw + j of B holds -2*S[j, k]/sigma_device in the row of
+        C[i, k] and -2*C[i, k]/sigma_device in the row of S[j, k].
+
+        Args:
+            H (np.ndarray): parameter rows of the reduced Hessian
+
+            times (slice): the time points to compute
+
+        Returns:
+            HB (np.ndarray): the product arranged by time and wavelength
+
+        """
+        nparams = H.shape[0]
+        H_C = H[:, self.c_offset:self.c_offset + self.nt*self.nc].reshape(nparams, self.nt, self.nc)[:, times, :]
+        H_S = H[:, self.s_offset:self.s_offset + self.nw*self.nc].reshape(nparams, self.nw, self.nc)
+
+        HB = np.einsum('jk,pik->ijp', self.S, H_C)
+        HB += np.einsum('ik,pjk->ijp', self.C[times], H_S)
+        HB *= -2/self.device_variance
+
+        return HB
+
+    def Vd_block(self):
+        """Returns the nw x nw covariance block shared by all times"""
+
+        V0 = (self.S*self.component_variances) @ self.S.T
+        V0[np.diag_indices_from(V0)] += self.device_variance
+        return V0
+
+    def covariance(self, H, chunk_size=None):
+        """Adds up (H B) Vd (H B)^T for this experiment
+
+        Each time block contributes M^T V0 M = (S^T M)^T diag(sigma) (S^T M)
+        + sigma_device M^T M, with M = (H B) for that time, so the nw x nw
+        block is not needed either.
+
+        Args:
+            H (np.ndarray): parameter rows of the reduced Hessian
+
+            chunk_size (int): number of times handled at once (all if None)
+
+        Returns:
+            V_theta (np.ndarray): the covariance contribution (nparams x nparams)
+
+        """
+        nparams = H.shape[0]
+        V_theta = np.zeros((nparams, nparams))
+        chunk_size = self.nt if chunk_size is None else max(int(chunk_size), 1)
+
+        for start in range(0, self.nt, chunk_size):
+            M = self.HB(H, slice(start, start + chunk_size))
+            Q = np.einsum('jk,ijp->ikp', self.S, M)
+            V_theta += np.einsum('ikp,k,ikq->pq', Q, self.component_variances, Q)
+            M = M.reshape(-1, nparams)
+            V_theta += self.device_variance*(M.T @ M)
+
+        return V_theta
+
+
+class SpectralCovariance():
+
+    """Structured B and Vd for one or more spectral experiments
+
+    The experiments are independent, so Vd is block diagonal over the
+    experiments as well as over the times of each experiment.
+
+    Args:
+        blocks (list): SpectralBlock objects, one per experiment
+
+        ntheta (int): number of columns in the reduced Hessian
+
+    """
+    def __init__(self, blocks, ntheta):
+
+        self.blocks = list(blocks)
+        self.ntheta = ntheta
+
+    @property
+    def nd(self):
+        return sum(block.nd for block in self.blocks)
+
+    def covariance(self, H, chunk_size=None):
+        """Returns V_theta = (H B) Vd (H B)^T
+
+        Args:
+            H (np.ndarray): parameter rows of the reduced Hessian
+
+            chunk_size (int): number of times handled at once (all if None)
+
+        Returns:
+            V_theta (np.ndarray): the parameter covariance
+
+        """
+        H = np.asarray(H, dtype=float)
+        return sum(block.covariance(H, chunk_size) for block in self.blocks)
+
+    def B_matrix(self):
+        """Returns B as a sparse matrix (ntheta x nd)"""
+
+        rows = []
+        cols = []
+        data = []
+
+        for block in self.blocks:
+            nt, nw, nc = block.nt, block.nw, block.nc
+            i, j, k = np.meshgrid(np.arange(nt), np.arange(nw), np.arange(nc), indexing='ij')
+            col = block.d_offset + i*nw + j
+            scale = -2/block.device_variance
+
+            rows.extend([(block.c_offset + i*nc + k).ravel(), (block.s_offset + j*nc + k).ravel()])
+            cols.extend([col.ravel(), col.ravel()])
+            data.extend([scale*block.S[j, k].ravel(), scale*block.C[i, k].ravel()])
+
+        B_matrix = scipy.sparse.coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                           shape=(self.ntheta, self.nd))
+        return B_matrix.tocsr()
+
+    def Vd_matrix(self):
+        """Returns Vd as a sparse block diagonal matrix (nd x nd)"""
+
+        blocks = [scipy.sparse.kron(scipy.sparse.identity(block.nt), block.Vd_block()) for block in self.blocks]
+        return scipy.sparse.block_diag(blocks, format='csr')
@@ -0,0 +1,236 @@
+"""
+Warm starts between related solves
+
+A WarmStartStore captures the primal values, the IPOPT bound multipliers
+(ipopt_zL_out/ipopt_zU_out) and the duals of a solved model. Everything is
+keyed by component name and index, so the store can be replayed into a
+different model of the same problem (a wavelength subset, a model with some
+parameters fixed, the next NSD inner problem, etc.). When multipliers are
+replayed the IPOPT warm start options are set as well.
+"""
+# Standard library imports
+import copy
+
+# Third party imports
+from pyomo.environ import (
+    Constraint,
+    Suffix,
+    Var,
+    )
+
+
+def _component_key(component_data):
+    """Returns the (name, index) key of a component data object"""
+
+    return (component_data.parent_component().local_name, component_data.index())
+
+
+def _find_component_data(model, key):
+    """Returns the component data for a (name, index) key (None if missing)"""
+
+    name, index = key
+    component = model.find_component(name)
+    if component is None or index not in component:
+        return None
+
+    return component[index]
+
+
+def add_warm_start_suffixes(model):
+    """Adds the suffixes needed to import and export the multipliers and
+    duals, if they are not already declared
+
+    Args:
+        model (ConcreteModel): the model
+
+    Returns:
+        None
+
+    """
+    suffixes = {'ipopt_zL_out': Suffix.IMPORT,
+                'ipopt_zU_out': Suffix.IMPORT,
+                'ipopt_zL_in': Suffix.EXPORT,
+                'ipopt_zU_in': Suffix.EXPORT,
+                'dual': Suffix.IMPORT_EXPORT,
+                }
+    for name, direction in suffixes.items():
+        if not hasattr(model, name):
+            model.add_component(name, Suffix(direction=direction))
+
+    return None
+
+
+def set_warm_start_options(solver_opts, options=None):
+    """Adds the IPOPT warm start options to solver_opts without overwriting
+    options set by the user
+
+    Args:
+        solver_opts (dict): the solver options
+
+        options (dict): the warm start options (WarmStartStore.ipopt_options
+            if None)
+
+    Returns:
+        None
+
+    """
+    if options is None:
+        options = WarmStartStore.ipopt_options
+
+    for key, val in options.items():
+        solver_opts.setdefault(key, val)
+
+    return None
+
+
+def update_warm_start_in_place(model, solver_opts=None):
+    """Prepares a model that is solved again (e.g. the NSD scenarios) by
+    passing the multipliers of the last solve back to IPOPT
+
+    Args:
+        model (ConcreteModel): the model, with the warm start suffixes
+
+        solver_opts (dict): solver options updated with the warm start options
+
+    Returns:
+        updated (bool): True if multipliers from a previous solve were found
+
+    """
+    if not all(hasattr(model, name) for name in ['ipopt_zL_out', 'ipopt_zU_out', 'ipopt_zL_in', 'ipopt_zU_in']):
+        return False
+
+    if len(model.ipopt_zL_out) == 0 and len(model.ipopt_zU_out) == 0:
+        return False
+
+    model.ipopt_zL_in.update(model.ipopt_zL_out)
+    model.ipopt_zU_in.update(model.ipopt_zU_out)
+
+    if solver_opts is not None:
+        set_warm_start_options(solver_opts)
+
+    return True
+
+
+class WarmStartStore():
+
+    """Primal values, bound multipliers, and duals of a solve
+
+    Usage:
+        store = WarmStartStore()
+        store.apply(model, solver_opts)    # before a solve (no-op if empty)
+        ... solve ...
+        store.capture(model)               # after the solve
+
+    """
+    ipopt_options = {'warm_start_init_point': 'yes',
+                     'warm_start_bound_push': 1e-6,
+                     'warm_start_slack_bound_push': 1e-6,
+                     'warm_start_mult_bound_push': 1e-6,
+                     }
+
+    def __init__(self):
+
+        self.primals = {}
+        self.zL = {}
+        self.zU = {}
+        self.duals = {}
+        self.captures = 0
+        self.applications = 0
+
+    def __len__(self):
+        return len(self.primals)
+
+    def __repr__(self):
+        return f'WarmStartStore(primals={len(self.primals)}, zL={len(self.zL)}, zU={len(self.zU)}, duals={len(self.duals)})'
+
+    @property
+    def has_multipliers(self):
+        """True if bound multipliers or duals were captured"""
+
+        return len(self.zL) + len(self.zU) + len(self.duals) > 0
+
+    @classmethod
+    def from_model(cls, model):
+        """Creates a store from the current state of a model"""
+
+        return cls().capture(model)
+
+    def copy(self):
+        """Returns an independent copy of the store"""
+
+        return copy.deepcopy(self)
+
+    def capture(self, model):
+        """Stores the variable values and, if the suffixes are present, the
+        bound multipliers and duals of the model
+
+        Args:
+            model (ConcreteModel): the solved model
+
+        Returns:
+            self (WarmStartStore): the updated store
+
+        """
+        self.primals = {}
+        for var in model.component_objects(Var):
+            name = var.local_name
+            for index, var_data in var.items():
+                if var_data.value is not None:
+                    self.primals[name, index] = var_data.value
+
+        for attr, suffix_name in [('zL', 'ipopt_zL_out'), ('zU', 'ipopt_zU_out'), ('duals', 'dual')]:
+            suffix = getattr(model, suffix_name, None)
+            values = {}
+            if suffix is not None:
+                for component_data, val in suffix.items():
+                    if val is not None:
+                        values[_component_key(component_data)] = val
+            setattr(self, attr, values)
+
+        self.captures += 1
+
+        return self
+
+    def apply(self, model, solver_opts=None):
+        """Replays the store into a model. Fixed variables keep their values
+        and components missing from the model are skipped.
+
+        Args:
+            model (ConcreteModel): the model to warm start
+
+            solver_opts (dict): IPOPT options, updated with the warm start
+                options if multipliers are available
+
+        Returns:
+            None
+
+        """
+        add_warm_start_suffixes(model)
+
+        if len(self.primals) == 0:
+            return None
+
+        for var in model.component_objects(Var):
+            name = var.local_name
+            for index, var_data in var.items():
+                if not var_data.fixed and (name, index) in self.primals:
+                    var_data.value = self.primals[name, index]
+
+        for suffix_name, values in [('ipopt_zL_in', self.zL), ('ipopt_zU_in', self.zU)]:
+            suffix = getattr(model, suffix_name)
+            for key, val in values.items():
+                var_data = _find_component_data(model, key)
+                if var_data is not None and not var_data.fixed:
+                    suffix[var_data] = val
+
+        for key, val in self.duals.items():
+            con_data = _find_component_data(model, key)
+            if con_data is not None and isinstance(con_data.parent_component(), Constraint):
+                model.dual[con_data] = val
+
+        if solver_opts is not None and self.has_multipliers:
+            set_warm_start_options(solver_opts)
+
+        self.applications += 1
+
+        return None
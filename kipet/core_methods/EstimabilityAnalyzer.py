@@ -5,6 +5,7 @@ from __future__ import division
 from pyomo.environ import *
 from pyomo.dae import *
 from kipet.core_methods.ParameterEstimator import *
+from kipet.common.warm_start import WarmStartStore
 from pyomo import *
 from scipy.optimize import least_squares
 import matplotlib.pyplot as plt
@@ -485,7 +486,7 @@ class EstimabilityAnalyzer(ParameterEstimator):
         print(self.param_ranks)
         return self.ordered_params
 
-    def run_analyzer(self, method = None, parameter_rankings = None, meas_scaling = None, variances = None):
+    def run_analyzer(self, method = None, parameter_rankings = None, meas_scaling = None, variances = None, model_mode = 'lazy'):
         """This function performs the estimability analysis. The user selects the method to be used. 
         The default will be selected based on the type of data selected. For now, only the method of 
         Wu, McLean, Harris, and McAuley (2011) using the means squared error is used. Other estimability 
@@ -509,6 +510,9 @@ class EstimabilityAnalyzer(ParameterEstimator):
         variances: dict
             variances are required, as needed by the parameter estimator.
         
+        model_mode: string
+            how the simplified models are held in memory, 'lazy' or 'reuse' (see wu_estimability)
+        
         returns: list
             list of parameters that should remain in the parameter estimation, while all other 
             parameters should be fixed.
@@ -560,12 +564,12 @@ class EstimabilityAnalyzer(ParameterEstimator):
                 raise RuntimeError('The sigmas must be type dict')
         
         if method == "Wu":
-            estimable_params = self.wu_estimability(parameter_rankings, meas_scaling, variances)
+            estimable_params = self.wu_estimability(parameter_rankings, meas_scaling, variances, model_mode)
             return estimable_params
         else:
             raise RuntimeError("the estimability method must be 'Wu' as this is the only supported method as of now")
 
-    def wu_estimability(self, parameter_rankings = None, meas_scaling = None, sigmas = None):
+    def wu_estimability(self, parameter_rankings = None, meas_scaling = None, sigmas = None, model_mode = 'lazy'):
         """This function performs the estimability analysis of Wu, McLean, Harris, and McAuley (2011) 
         using the means squared error. 
 
@@ -581,72 +585,81 @@ class EstimabilityAnalyzer(ParameterEstimator):
         sigmas: dict
             dictionary containing all the variances as required by the parameter estimator
         
+        model_mode: string
+            'lazy' clones the full model for each simplified model and frees it after the solve,
+            'reuse' solves all simplified models on a single clone by releasing the bounds of the
+            next ranked parameter between the solves (warm started from the previous solution)
+        
         Returns:
         -----------
             list of parameters that should remain in the parameter estimation, while all other parameters should be fixed.
         """
         
+        if model_mode not in ['lazy', 'reuse']:
+            raise ValueError("model_mode must be 'lazy' or 'reuse'")
+        
         J = dict()
         params_estimated = list()
-        cloned_full_model = dict()
-        cloned_pestim = dict()
-        results = dict()
+        previous_results = None
+        # Values, multipliers and duals are passed from each solve to the next
+        warm_start = WarmStartStore()
         # For now, instead of using Levenberg-Marquardt least squares, we will use Kipet to perform the estimation
-        # of every model. Here we generate each of the simplified models.
-        # first we clone the main model so that we work with the full model at every iteration
-        count = 1
-        for p in parameter_rankings:
-            cloned_full_model[count] = self.cloned_before_k_aug.clone()
-            count += 1
+        # of every model. Only one simplified model is held in memory at a time: it is either cloned from
+        # the full model when needed (lazy) or the same clone is re-bounded between the solves (reuse)
+        if model_mode == 'reuse':
+            simplified_model = self.cloned_before_k_aug.clone()
+            original_bounds = {v: (k.lb, k.ub) for v, k in six.iteritems(simplified_model.P)}
+            for v, k in six.iteritems(simplified_model.P):
+                k.setlb(value(k))
+                k.setub(value(k))
+            pestim = ParameterEstimator(simplified_model)
+        
         count = 1
         # Then we go create each simplified model, fixing remaining variables
         for p in parameter_rankings:
             params_estimated.append(p)            
             #print("performing parameter estimation for: ", params_estimated)
-            for v,k in six.iteritems(cloned_full_model[count].P):
-                if v in params_estimated:
-                    continue
-                else:
-                    #print("fixing the parameters for:",v,k)
-                    #fix parameters not in simplified model
-                    ub = value(cloned_full_model[count].P[v])
-                    lb = ub
-                    cloned_full_model[count].P[v].setlb(lb)
-                    cloned_full_model[count].P[v].setub(ub)
+            if model_mode == 'reuse':
+                # The newly ranked parameter is released, the others stay fixed at their initial values
+                simplified_model.P[p].setlb(original_bounds[p][0])
+                simplified_model.P[p].setub(original_bounds[p][1])
+            else:
+                simplified_model = self.cloned_before_k_aug.clone()
+                for v,k in six.iteritems(simplified_model.P):
+                    if v in params_estimated:
+                        continue
+                    else:
+                        #print("fixing the parameters for:",v,k)
+                        #fix parameters not in simplified model
+                        ub = value(simplified_model.P[v])
+                        lb = ub
+                        simplified_model.P[v].setlb(lb)
+                        simplified_model.P[v].setub(ub)
+                pestim = ParameterEstimator(simplified_model)
             # We then solve the Parameter estimaion problem for the SM
             options = dict()            
-            cloned_pestim[count] = ParameterEstimator(cloned_full_model[count])
-            if count>=2:
-                if hasattr(results[count-1], 'Y'):
-                    cloned_pestim[count].initialize_from_trajectory('Y', results[count - 1].Y)
-                    cloned_pestim[count].scale_variables_from_trajectory('Y', results[count - 1].Y)
-                if hasattr(results[count-1], 'X'):
-                    cloned_pestim[count].initialize_from_trajectory('X', results[count - 1].X)
-                    cloned_pestim[count].scale_variables_from_trajectory('X', results[count - 1].X)
-                if hasattr(results[count-1], 'C'):
-                    cloned_pestim[count].initialize_from_trajectory('C', results[count - 1].C)
-                    cloned_pestim[count].scale_variables_from_trajectory('C', results[count - 1].C)
-                # if hasattr(results[count-1], 'S'):
-                #     cloned_pestim[count].initialize_from_trajectory('S', results[count-1].S)
-                #     cloned_pestim[count].scale_variables_from_trajectory('S', results[count-1].S)
-                cloned_pestim[count].initialize_from_trajectory('Z', results[count-1].Z)
-                cloned_pestim[count].scale_variables_from_trajectory('Z', results[count - 1].Z)
-                cloned_pestim[count].initialize_from_trajectory('dZdt', results[count - 1].dZdt)
-                cloned_pestim[count].scale_variables_from_trajectory('dZdt', results[count - 1].dZdt)
-
-            results[count] = cloned_pestim[count].run_opt('ipopt',
-                                        tee=True,#False,
-                                        solver_opts = options,
-                                        variances=sigmas, symbolic_solver_labels=True
-                                        )
+            if previous_results is not None:
+                # The reused model already holds the previous solution
+                self._warm_start_from_results(pestim, previous_results, initialize=(model_mode == 'lazy'))
+
+            results = pestim.run_opt('ipopt',
+                                     tee=True,#False,
+                                     solver_opts = options,
+                                     variances=sigmas, symbolic_solver_labels=True,
+                                     warm_start=warm_start,
+                                     )
 
             # print('TC',TerminationCondition.optimal)
             # print('selfterm',self.termination_condition)
 
-            for v,k in six.iteritems(results[count].P):
+            for v,k in six.iteritems(results.P):
                 print(v,k)
             # Then compute the scaled residuals to obtain the Jk in the Wu et al paper   
-            J [count] = self._compute_scaled_residuals(results[count], meas_scaling)
+            J [count] = self._compute_scaled_residuals(results, meas_scaling)
+            previous_results = results
+            if model_mode == 'lazy':
+                # Free the simplified model before the next one is cloned
+                del pestim, simplified_model
             count += 1            
         #print(J)
         count = count - 1
@@ -707,6 +720,19 @@ class EstimabilityAnalyzer(ParameterEstimator):
             count += 1
         return estimable_params
     
+    @staticmethod
+    def _warm_start_from_results(pestim, results, initialize=True):
+        """Initializes and scales the profiles of a simplified model from the results of the
+        previous simplified model. This function is not meant to be used directly by users.
+        """
+        for var in ['Y', 'X', 'C', 'Z', 'dZdt']:
+            if var in ['Z', 'dZdt'] or hasattr(results, var):
+                if initialize:
+                    pestim.initialize_from_trajectory(var, getattr(results, var))
+                pestim.scale_variables_from_trajectory(var, getattr(results, var))
+        
+        return None
+    
     def _compute_scaled_residuals(self, model, meas_scaling = None):
         """
         Computes the square of residuals between the optimal solution (Z) and the concentration data (C)
@@ -6,6 +6,7 @@ in Chen and Biegler (AIChE 2020).
 # Standard library imports
 import copy
 from string import Template
+import time
 
 # Third party imports
 import numpy as np
@@ -40,6 +41,7 @@ from kipet.post_model_build.scaling import (
     scale_parameters,
     update_expression,
     )
+from kipet.post_model_build.pyomo_model_tools import ModelState
 from kipet.common.ReducedHessian import ReducedHessian
 
 __author__ = 'Kevin McBride'  #: April 2020
@@ -83,12 +85,18 @@ class EstimationPotential():
                 
             simulate_start (bool): Option to simulate using the model to 
                 warm start the optimization
+                
+        in_place (bool): Defaults to False, option to calculate the reduced
+            hessians on the model itself. The parameter bounds and constraints
+            are applied for the calculation and undone afterwards, so the
+            model is not copied for each calculation.
         
     """
 
     def __init__(self, model, simulation_data=None, options=None,
                  method='k_aug', solver_opts={}, scaled=True,
-                 use_bounds=False, use_duals=False, calc_method='fixed'):
+                 use_bounds=False, use_duals=False, calc_method='fixed',
+                 in_place=False):
         
         # Options handling
         self.options = {} if options is None else options.copy()
@@ -112,6 +120,11 @@ class EstimationPotential():
         self.use_bounds = use_bounds
         self.use_duals = use_duals
         self.rh_method = calc_method
+        self.in_place = in_place
+        
+        # Per reduced Hessian timing (copy/restore, solve, KKT, linear algebra)
+        self.timing_stats = []
+        self._reduced_hessian = None
         
         # Copy the model
         self.model = copy.deepcopy(model)
@@ -475,8 +488,7 @@ class EstimationPotential():
         #                                       to_load=['Dhat_bar'])
      
         # elif self._concentration_given:
-        results.load_from_pyomo_model(self.model,
-                                          to_load=['Z', 'dZdt', 'X', 'U', 'dXdt', 'Cm', 'Y'])
+        results.load_from_pyomo_model(self.model)
         # else:
         #     raise RuntimeError(
         #         'Must either provide concentration data or spectra in order to solve the parameter estimation problem')
@@ -580,20 +592,58 @@ class EstimationPotential():
             reduced_hessian (np.ndarray): The resulting reduced hessian matrix.
             
         """
-        rh_model = copy.deepcopy(self.model)
-        
-        rh = ReducedHessian(rh_model,
-                            parameter_set=Se,
-                            rho=self.rho,
-                            scaled=self.scaled,
-                            param_con_method=self.rh_method,
-                            kkt_method=self.method,
-                            set_param_bounds = True,
-                            )
+        start = time.perf_counter()
+        if self.in_place:
+            # The bounds and constraints are applied to self.model and undone
+            # after the calculation instead of copying the model
+            model_state = ModelState(self.model)
+            rh_model = self.model
+        else:
+            rh_model = copy.deepcopy(self.model)
+        copy_time = time.perf_counter() - start
         
-        reduced_hessian = rh.calculate_reduced_hessian(optimize=True)
+        if self.in_place and self._reduced_hessian is not None:
+            # Keeps the KKT positions of the last calculation
+            rh = self._reduced_hessian
+            rh.parameter_set = list(Se)
+        else:
+            rh = ReducedHessian(rh_model,
+                                parameter_set=list(Se),
+                                rho=self.rho,
+                                scaled=self.scaled,
+                                param_con_method=self.rh_method,
+                                kkt_method=self.method,
+                                set_param_bounds = True,
+                                )
+            if self.in_place:
+                self._reduced_hessian = rh
+        
+        try:
+            reduced_hessian = rh.calculate_reduced_hessian(optimize=True)
+        finally:
+            restore_time = 0
+            if self.in_place:
+                start = time.perf_counter()
+                model_state.restore()
+                restore_time = time.perf_counter() - start
+        
+        self.timing_stats.append({'iteration': len(self.timing_stats),
+                                  'parameters': len(Se),
+                                  'copy': copy_time + restore_time,
+                                  **rh.timings,
+                                  })
         
         return reduced_hessian
+    
+    def get_timing_stats(self):
+        """Returns the time spent in each reduced Hessian calculation
+        
+        Returns:
+            stats (DataFrame): copy (or snapshot and restore), solve, KKT
+                extraction, and linear algebra times [s]
+        
+        """
+        return pd.DataFrame(self.timing_stats, columns=['iteration', 'parameters', 'copy', 'solve', 'kkt', 'linear_algebra'])
           
 def rhps_method(model, options=None, **kwargs):
     """Reduces a single model using the reduced hessian parameter selection
@@ -623,6 +673,7 @@ def rhps_method(model, options=None, **kwargs):
     use_bounds = kwargs.get('use_bounds', False)
     use_duals = kwargs.get('use_duals', False)
     calc_method = kwargs.get('calc_method', 'fixed')
+    in_place = kwargs.get('in_place', False)
     
     options = kwargs#options if options is not None else dict()
     orig_bounds = {k: v.bounds for k, v in model.P.items()}
@@ -634,7 +685,8 @@ def rhps_method(model, options=None, **kwargs):
                                     scaled=scaled,
                                     use_bounds=use_bounds,
                                     use_duals=use_duals,
-                                    calc_method=calc_method)
+                                    calc_method=calc_method,
+                                    in_place=in_place)
     results, reduced_model = est_param.estimate()
     
     if replace:
@@ -85,7 +85,7 @@ class FESimulator(PyomoSimulator):
                     
         return None
      
-    def call_fe_factory(self, inputs_sub=None, dosing_points=None):    
+    def call_fe_factory(self, inputs_sub=None, dosing_points=None, persistent=False):    
         """This function applies all the inputs necessary for fe_factory to
         work, using Kipet syntax. Requires external inputs/dosing points to be
         specified with the following arguments.
@@ -95,6 +95,8 @@ class FESimulator(PyomoSimulator):
             
             dosing_points (dict): dictionary of the dosing points
             
+            persistent (bool): use the persistent ipopt interface in fe_factory
+            
         Returns:
             None
         
@@ -106,7 +108,8 @@ class FESimulator(PyomoSimulator):
                              init_con="init_conditions_c",
                              param_name=self.param_name,
                              param_values=self.param_dict,
-                             inputs_sub=self.inputs_sub)
+                             inputs_sub=self.inputs_sub,
+                             persistent=persistent)
     
         init.load_initial_conditions(init_cond=self.ics_)
 
@@ -114,5 +117,8 @@ class FESimulator(PyomoSimulator):
             init.load_discrete_jump(dosing_points)
             
         init.run()
+        
+        # Keep the factory for the per element statistics
+        self.fe_factory = init
 
         return None
\ No newline at end of file
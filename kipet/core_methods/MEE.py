@@ -4,7 +4,6 @@
 import copy
 import math
 import os
-import scipy.stats as st
 
 # Third party imports
 import numpy as np
@@ -12,12 +11,12 @@ import pandas as pd
 from pyomo import *
 from pyomo.dae import *
 from pyomo.environ import *
-from scipy.sparse import coo_matrix
 
 # KIPET library imports
 from kipet.common.parameter_handling import initialize_parameters
 from kipet.common.objectives import conc_objective, comp_objective, absorption_objective
 from kipet.common.read_hessian import split_sipopt_string
+from kipet.common.spectral_covariance import SpectralBlock, SpectralCovariance
 from kipet.mixins.PEMixins import PEMixins
 from kipet.core_methods.fe_factory import *
 from kipet.core_methods.FESimulator import *
@@ -26,6 +25,7 @@ from kipet.core_methods.ParameterEstimator import *
 from kipet.core_methods.PyomoSimulator import *
 from kipet.core_methods.VarianceEstimator import *
 
+from kipet.post_model_build.pyomo_model_tools import VarArrayBridge
 from kipet.top_level.variable_names import VariableNames
 
 __author__ = 'Michael Short, Kevin McBride'  #: February 2019 - October 2020
@@ -212,6 +212,47 @@ class MultipleExperimentsEstimator(PEMixins, object):
         
         return None
         
+    def _spectral_covariance(self, variances):
+        """Collects C, S and the variances of each experiment into the
+        structured B and Vd operators used for the covariance of the
+        parameters
+
+            This method is not intended to be used by users directly
+
+        Args:
+            variances (dict): variances of each experiment
+
+        Returns:
+            SpectralCovariance: the structured operators
+        """
+        profiles = {}
+        
+        for exp in self.experiments:
+            model_obj = self.model.experiment[exp]
+            components = self._sublist_components[exp]
+            C = VarArrayBridge(model_obj.C, model_obj.meas_times, components).get_values()
+            S = VarArrayBridge(model_obj.S, model_obj.meas_lambdas, components).get_values()
+            profiles[exp] = (C, S)
+            
+        s_offset = sum(C.size for C, S in profiles.values())
+        c_offset = 0
+        d_offset = 0
+        blocks = []
+        
+        for exp in self.experiments:
+            C, S = profiles[exp]
+            v_array = np.array([variances[exp][c] for c in self._sublist_components[exp]], dtype=float)
+            block = SpectralBlock(C, S, v_array, variances[exp]['device'],
+                                  c_offset=c_offset,
+                                  s_offset=s_offset,
+                                  d_offset=d_offset)
+            blocks.append(block)
+            c_offset += C.size
+            s_offset += S.size
+            d_offset += block.nd
+            
+        return SpectralCovariance(blocks, s_offset + self._n_params)
+
     def _compute_B_matrix(self, variances, **kwds):
         """Builds B matrix for calculation of covariances
 
@@ -221,63 +262,9 @@ class MultipleExperimentsEstimator(PEMixins, object):
             variances (dict): variances
 
         Returns:
-            None
+            B_matrix (scipy.sparse.csr_matrix): the B matrix
         """
-        nt = self._n_meas_times
-        nw = self._n_meas_lambdas
-        nc = self._n_actual
-        nparams = self._n_params
-
-        npn = np.r_[self.n_mark[0], np.diff(list(self.n_mark.values()))]
-        npt = np.r_[self.t_mark[0], np.diff(list(self.t_mark.values()))]
-        npl = np.r_[self.l_mark[0], np.diff(list(self.l_mark.values()))]
-        npp = np.r_[self.p_mark[0], np.diff(list(self.p_mark.values()))]
-        exp_lookup = {i: exp for i, exp in enumerate(self.experiments)}
-        ntheta = sum(npn*(npt + npl) + npp)
-        
-        exp_count = 0
-        timeshift = 0 
-        waveshift = 0
-        
-        rows = []
-        cols = []
-        data = []
-        
-        meas_times = {exp : {indx: time for indx, time in enumerate(self.model.experiment[exp].meas_times)} for exp in self.experiments}
-        meas_lambdas = {exp : {indx: wave for indx, wave in enumerate(self.model.experiment[exp].meas_lambdas)} for exp in self.experiments}
-        
-        for i in range(nt):
-            for j in range(nw):
-            
-                nc = npn[exp_count]
-                if i == self.t_mark[exp_count] and j == self.l_mark[exp_count]:
-                    exp_count += 1
-                    timeshift = i
-                    waveshift = j    
-           
-                exp = exp_lookup[exp_count]
-                
-                for comp_num, comp in enumerate(self._sublist_components[exp]):
-                    
-                    if i - timeshift in list(range(npt[exp_count])):
-                        time = meas_times[exp][i - timeshift]
-                    
-                    if j - waveshift in list(range(npl[exp_count])):
-                        wave = meas_lambdas[exp][j - waveshift]
-   
-                    r_idx1 = i*nc + comp_num
-                    r_idx2 = j*nc + comp_num + nc*nt
-                    c_idx =  i*nw + j
-                    
-                    rows.append(r_idx1)
-                    cols.append(c_idx)
-                    data.append(-2 * self.model.experiment[exp].S[wave, comp].value / (self.variances[exp]['device']))
-  
-                    rows.append(r_idx2)
-                    cols.append(c_idx)
-                    data.append(-2 * self.model.experiment[exp].C[time, comp].value / (self.variances[exp]['device']))
-                         
-        B_matrix = coo_matrix((data, (rows, cols)), shape=(ntheta, nw * nt)).tocsr()
+        B_matrix = self._spectral_covariance(variances).B_matrix()
         self.B_matrix = B_matrix
         
         return B_matrix
@@ -291,89 +278,9 @@ class MultipleExperimentsEstimator(PEMixins, object):
             variances (dict): variances
 
         Returns:
-            None
+            Vd_matrix (scipy.sparse.csr_matrix): the block diagonal Vd matrix
         """
-        row = []
-        col = []
-        data = []
-        nt = self._n_meas_times
-        nw = self._n_meas_lambdas
-        nc = self._n_actual
-
-        v_array = np.zeros(nc)
-        s_array = np.zeros(nw * nc)
-        
-        count = 0
-        for x in self.experiments:
-            for k, c in enumerate(self._sublist_components[x]):
-                v_array[count] = variances[x][c]
-                count += 1
-        
-        kshift = 0
-        jshift = 0
-        knum = 0
-        jnum=0
-        count=0
-        exp_count = 0
-        
-        for x in self.experiments:
-            kshift += knum
-            jshift += jnum
-            if exp_count != 0:
-                kshift+=1
-
-            for j, l in enumerate(self.model.experiment[x].meas_lambdas):
-                for k, c in enumerate(self._sublist_components[x]):
-                    
-                    if exp_count == 0:
-                        nc = self.n_mark[exp_count]
-                        nt = self.t_mark[exp_count]
-                        nw = self.l_mark[exp_count]
-                    else: 
-                        nt = (self.t_mark[exp_count] - self.t_mark[exp_count - 1] )
-                        nw = (self.l_mark[exp_count] - self.l_mark[exp_count - 1])
-
-                    s_array[(j+jshift) * nc + (k+kshift)] = self.model.experiment[x].S[l, c].value
-                    idx = (j+jshift) * nc + (k+kshift)
-                    knum = max(knum,k)
-                    count += 1
-                
-                jnum = max(jnum,j)
-            exp_count += 1
-
-        row = []
-        col = []
-        data = []
-        nt = self._n_meas_times
-        nw = self._n_meas_lambdas
-        nd = nt * nw
-        v_device = list()
-        
-        for x in self.experiments:
-            if 'device' in variances[x]:
-                v_device.append(variances[x]['device']) 
-        
-        exp_count = 0
-        v_device_exp = v_device[exp_count]
-        for i in range(nt):
-            for j in range(nw):
-                if i == self.t_mark[exp_count] and j == self.l_mark[exp_count]:
-                    exp_count += 1
-                    v_device_exp = v_device[exp_count]
-                    
-                val = sum(v_array[k] * s_array[j * nc + k] ** 2 for k in range(nc)) + v_device_exp
-                row.append(i * nw + j)
-                col.append(i * nw + j)
-                data.append(val)
-                for p in range(nw):
-                    if j != p:
-                        val = sum(v_array[k] * s_array[j * nc + k] * s_array[p * nc + k] for k in range(nc))
-                        row.append(i * nw + j)
-                        col.append(i * nw + p)
-                        data.append(val)
-
-        Vd_matrix = coo_matrix((data, (row, col)), shape=(nd, nd)).tocsr()
-        
+        Vd_matrix = self._spectral_covariance(variances).Vd_matrix()
         self.Vd_matrix = Vd_matrix
     
         return Vd_matrix
@@ -7,7 +7,6 @@ from scipy.sparse.linalg import (
     lsqr,
     spsolve,
     ) 
-from scipy.optimize import least_squares
 
 from pyomo.dae import *
 from pyomo.environ import *
@@ -16,6 +15,7 @@ from pyomo.environ import (
     )
 
 from kipet.core_methods.PyomoSimulator import *
+from kipet.common.warm_start import add_warm_start_suffixes as _add_warm_start_suffixes
 from kipet.core_methods.ResultsObject import *
 from kipet.mixins.JumpsMixin import JumpsMixin
 
@@ -51,20 +51,17 @@ class Optimizer(JumpsMixin, PyomoSimulator):
         
     @staticmethod
     def add_warm_start_suffixes(model, use_k_aug=False):
-        """Adds suffixed variables to problem"""
+        """Adds suffixed variables to problem (existing suffixes, and the
+        multipliers they hold, are kept)"""
         
-        # Ipopt bound multipliers (obtained from solution)
-        model.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
-        model.ipopt_zU_out = Suffix(direction=Suffix.IMPORT)
-        # Ipopt bound multipliers (sent to solver)
-        model.ipopt_zL_in = Suffix(direction=Suffix.EXPORT)
-        model.ipopt_zU_in = Suffix(direction=Suffix.EXPORT)
-        # Obtain dual solutions from first solve and send to warm start
-        model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+        # Ipopt bound multipliers (in and out) and the duals
+        _add_warm_start_suffixes(model)
         
         if use_k_aug:
-            model.dof_v = Suffix(direction=Suffix.EXPORT)
-            model.rh_name = Suffix(direction=Suffix.IMPORT)
+            if not hasattr(model, 'dof_v'):
+                model.dof_v = Suffix(direction=Suffix.EXPORT)
+            if not hasattr(model, 'rh_name'):
+                model.rh_name = Suffix(direction=Suffix.IMPORT)
             
         return None
             
@@ -134,6 +131,8 @@ class Optimizer(JumpsMixin, PyomoSimulator):
                 else:
                     verbose = 0
                     
+                from scipy.optimize import least_squares
+                
                 res_lsq = least_squares(F,x0,JF,
                                         bounds=(0.0,np.inf),
                                         max_nfev=max_iter,
@@ -177,6 +176,7 @@ class Optimizer(JumpsMixin, PyomoSimulator):
 
         #self.model =copy.deepcopy(self.model)
 
+        # Only the trajectories used to reinitialize the model are needed
         base_values = ResultsObject()
         base_values.load_from_pyomo_model(self.model,
                                           to_load=['Z','dZdt','X','dXdt','Y'])
@@ -231,8 +231,7 @@ class Optimizer(JumpsMixin, PyomoSimulator):
 
         # retriving solutions to results object  
         results = ResultsObject()
-        results.load_from_pyomo_model(self.model,
-                                      to_load=['Z','dZdt','X','dXdt','Y'])
+        results.load_from_pyomo_model(self.model)
 
         c_array = np.zeros((self._n_allmeas_times,self._n_components))
         for i,t in enumerate(self._allmeas_times):
@@ -4,10 +4,8 @@ from __future__ import print_function
 import copy
 import os
 import re
-import scipy.stats as st
 import time
 
-import matplotlib.pyplot as plt
 import numpy as np
 from pyomo import *
 from pyomo.dae import *
@@ -20,13 +18,28 @@ from pyomo.opt import (
 
 from kipet.core_methods.Optimizer import *
 from kipet.core_methods.TemplateBuilder import *
+from kipet.common.parallel import (
+    get_worker_state,
+    resolve_workers,
+    WorkerPool,
+    )
+from kipet.common.diagnostic_tools import (
+    lack_of_fit_maps,
+    wavelength_correlation_matrix,
+    )
 from kipet.common.read_hessian import *
+from kipet.common.spectral_covariance import (
+    SpectralBlock,
+    SpectralCovariance,
+    )
+from kipet.common.warm_start import WarmStartStore
 from kipet.common.objectives import (
     conc_objective, 
     comp_objective,
     absorption_objective,
     )
 from kipet.mixins.PEMixins import PEMixins 
+from kipet.post_model_build.pyomo_model_tools import VarArrayBridge
 from kipet.top_level.variable_names import VariableNames
 
 class ParameterEstimator(PEMixins, Optimizer):
@@ -122,6 +135,10 @@ class ParameterEstimator(PEMixins, Optimizer):
 
             model_variance (bool, optional): Default is True. Flag to tell whether we are only
             considering the variance in the device, or also model noise as well.
+            
+            warm_start (WarmStartStore, optional): values, bound multipliers and duals
+            replayed into the model before the solve (with the IPOPT warm start options)
+            and replaced by those of this solve afterwards.
 
         Returns:
             Results object with loaded results
@@ -163,6 +180,9 @@ class ParameterEstimator(PEMixins, Optimizer):
         G_contribution = kwds.pop('G_contribution', None)
         St = kwds.pop('St', dict())
         Z_in = kwds.pop('Z_in', dict())
+        
+        # WarmStartStore replayed before and updated after the solve
+        warm_start = kwds.pop('warm_start', None)
 
         self.solver = solver
         self.model_variance = model_variance
@@ -213,6 +233,9 @@ class ParameterEstimator(PEMixins, Optimizer):
         if jump:
             self.set_up_jumps(run_opt_kwargs)
             
+        if warm_start is not None:
+            warm_start.apply(self.model, solver_opts if self.solver in ['ipopt', 'ipopt_sens'] else None)
+            
         for key, val in solver_opts.items():
             opt.options[key] = val
             
@@ -246,6 +269,9 @@ class ParameterEstimator(PEMixins, Optimizer):
             raise RuntimeError(
                 'Must either provide concentration data or spectra in order to solve the parameter estimation problem')
 
+        if warm_start is not None:
+            warm_start.capture(self.model)
+
         if report_time:
             end = time.time()
             print("Total execution time in seconds for variance estimation:", end - start)
@@ -253,6 +279,14 @@ class ParameterEstimator(PEMixins, Optimizer):
         return self._get_results()
 
 
+    def _get_parameter_values(self):
+        """Returns the parameter values, unscaled by K if the model is scaled"""
+        
+        if hasattr(self.model, self.__var.model_parameter_scaled): 
+            return {name: getattr(self.model, self.__var.model_parameter)[name].value*getattr(self.model, self.__var.model_parameter_scaled)[name].value for name in self.model.parameter_names}
+        else:
+            return {name: getattr(self.model, self.__var.model_parameter)[name].value for name in self.model.parameter_names}
+    
     def _get_results(self):
         """Removed results unit from function"""
     
@@ -265,10 +299,7 @@ class ParameterEstimator(PEMixins, Optimizer):
         if self._spectra_given:
             self.compute_D_given_SC(results)
 
-        if hasattr(self.model, self.__var.model_parameter_scaled): 
-            setattr(results, self.__var.model_parameter, {name: getattr(self.model, self.__var.model_parameter)[name].value*getattr(self.model, self.__var.model_parameter_scaled)[name].value for name in self.model.parameter_names})
-        else:
-            setattr(results, self.__var.model_parameter, {name: getattr(self.model, self.__var.model_parameter)[name].value for name in self.model.parameter_names})
+        setattr(results, self.__var.model_parameter, self._get_parameter_values())
 
         if self.termination_condition!=None and self.termination_condition!=TerminationCondition.optimal:
             raise Exception("The current iteration was unsuccessful.")
@@ -874,6 +905,8 @@ class ParameterEstimator(PEMixins, Optimizer):
         """
         Function to display calculated confidence intervals
         """
+        import scipy.stats as st
+        
         number_of_stds = st.norm.ppf(1-(1-self.confidence_interval)/2)
         #print(f'STDS: {number_of_stds}')
         
@@ -970,8 +1003,9 @@ class ParameterEstimator(PEMixins, Optimizer):
         cov_mat = self._compute_covariance_C_generic(hessian, variances, use_model_variance=False)
         return cov_mat
     
-    def _compute_B_matrix(self, variances, **kwds):
-        """Builds B matrix for calculation of covariances
+    def _spectral_covariance(self, variances):
+        """Collects C, S and the variances into the structured B and Vd
+        operators used for the covariance of the parameters
 
            This method is not intended to be used by users directly
 
@@ -979,38 +1013,28 @@ class ParameterEstimator(PEMixins, Optimizer):
             variances (dict): variances
 
         Returns:
-            None
+            SpectralCovariance: the structured operators
         """
-        nt = self._n_meas_times
-        time_set = self.model.meas_times
-        conc_data_var = 'C'
-        nw = self._n_meas_lambdas
+        nt = len(self._meas_times)
         nparams = self._get_nparams(self.model)
-       
-        if hasattr(self, '_abs_components'):
-            n_val = self._nabs_components
-            component_set = self._abs_componets
-        else:
-            n_val = self._n_actual
-            component_set = self._sublist_components
-    
-        variance = variances['device']
-        ntheta = n_val * (nw + nt) + nparams
-        B_matrix = np.zeros((ntheta, nw * nt))
-
-        for i, t in enumerate(time_set):
-            for j, l in enumerate(self.model.meas_lambdas):
-                for k, c in enumerate(component_set):
-                    r_idx1 = i * n_val + k
-                    r_idx2 = j * n_val + k + n_val * nt
-                    c_idx = i * nw + j
-                    B_matrix[r_idx1, c_idx] = -2 * self.model.S[l, c].value / variance
-                    B_matrix[r_idx2, c_idx] = -2 * getattr(self.model, conc_data_var)[t, c].value / variance
-                    
-        return B_matrix
 
-    def _compute_Vd_matrix(self, variances, **kwds):
-        """Builds d covariance matrix
+        C = VarArrayBridge(getattr(self.model, self.component_var),
+                           self._meas_times,
+                           self.component_set).get_values()
+        S = VarArrayBridge(self.model.S,
+                           self._meas_lambdas,
+                           self.component_set).get_values()
+        v_array = np.array([variances[c] for c in self.component_set], dtype=float)
+
+        block = SpectralBlock(C, S, v_array, variances['device'],
+                              c_offset=0,
+                              s_offset=self.n_val*nt)
+        ntheta = self.n_val*(nt + S.shape[0]) + nparams
+
+        return SpectralCovariance([block], ntheta)
+
+    def _compute_B_matrix(self, variances, **kwds):
+        """Builds B matrix for calculation of covariances
 
            This method is not intended to be used by users directly
 
@@ -1018,54 +1042,39 @@ class ParameterEstimator(PEMixins, Optimizer):
             variances (dict): variances
 
         Returns:
-            None
+            B_matrix (scipy.sparse.csr_matrix): the B matrix
         """
-        nt = self._n_meas_times
-        nw = self._n_meas_lambdas
-        row = []
-        col = []
-        data = []
-        nd = nt * nw
-        v_device = variances['device']
-
-        s_array = np.zeros(nw * self.n_val)
-        v_array = np.zeros(self.n_val)
-        
-        for k, c in enumerate(self.component_set):
-            v_array[k] = variances[c]
+        return self._spectral_covariance(variances).B_matrix()
 
-        for j, l in enumerate(self.model.meas_lambdas):
-            for k, c in enumerate(self.component_set):
-                s_array[j * self.n_val + k] = self.model.S[l, c].value
+    def _compute_Vd_matrix(self, variances, **kwds):
+        """Builds d covariance matrix
 
-        for i in range(nt):
-            for j in range(nw):
-                val = sum(v_array[k] * s_array[j * self.n_val + k] ** 2 for k in range(self.n_val)) + v_device
-                row.append(i * nw + j)
-                col.append(i * nw + j)
-                data.append(val)
+           This method is not intended to be used by users directly
 
-                for p in range(nw):
-                    if j != p:
-                        val = sum(v_array[k] * s_array[j * self.n_val + k] * s_array[p * self.n_val + k] for k in range(self.n_val))
-                        row.append(i * nw + j)
-                        col.append(i * nw + p)
-                        data.append(val)
+        Args:
+            variances (dict): variances
 
-        Vd_matrix = scipy.sparse.coo_matrix((data, (row, col)), shape=(nd, nd)).tocsr()
-        
-        return Vd_matrix
+        Returns:
+            Vd_matrix (scipy.sparse.csr_matrix): the block diagonal Vd matrix
+        """
+        return self._spectral_covariance(variances).Vd_matrix()
 
-    def _calc_new_D(self, subset):
+    def _calc_new_D(self, subset, D=None):
         """Updates the D data for the wavelength selection"""
         
-        new_D = pd.DataFrame(np.nan, index=self._meas_times, columns=subset)
-        for t in self._meas_times:
-            for l in self._meas_lambdas:
-                if l in subset:
-                    new_D.at[t, l] = self.model.D[t, l]
+        if D is None:
+            D = self._spectral_data_frame()
+        new_D = D.reindex(columns=list(subset))
                     
         return new_D
+    
+    def _spectral_data_frame(self):
+        """Returns the spectral data D of the model as a DataFrame"""
+        
+        D_values = self.model.D.extract_values()
+        D = np.array([[D_values[t, l] for l in self._meas_lambdas] for t in self._meas_times], dtype=float)
+        
+        return pd.DataFrame(D, index=self._meas_times, columns=self._meas_lambdas)
         
 
     def run_param_est_with_subset_lambdas(self, builder_clone, end_time, subset, nfe, ncp, sigmas, solver='ipopt', ):
@@ -1106,12 +1115,14 @@ class ParameterEstimator(PEMixins, Optimizer):
         # need to put in an optional running of the variance estimator for the new
         # parameter estiamtion run, or just use the previous full model run to initialize...
 
-        results, lof = run_param_est(new_template, nfe, ncp, sigmas, solver=solver)
+        # The full model solution is the warm start of the subset problem
+        results, lof = run_param_est(new_template, nfe, ncp, sigmas, solver=solver,
+                                     warm_start=WarmStartStore.from_model(self.model))
 
         return results
 
     def run_lof_analysis(self, builder_before_data, end_time, correlations, lof_full_model, nfe, ncp, sigmas,
-                         step_size=0.2, search_range=(0, 1)):
+                         step_size=0.2, search_range=(0, 1), workers=1, warm_start=True, lof_tolerance=None):
         """ Runs the lack of fit minimization problem used in the Michael's Reaction paper
         from Chen et al. (submitted). To use this function, the full parameter estimation
         problem should be solved first and the correlations for wavelngths from this optimization
@@ -1125,9 +1136,19 @@ class ParameterEstimator(PEMixins, Optimizer):
                     correlations (dict): dictionary containing the wavelengths and their correlations
                                 to the concentration profiles
                     lof_full_model(int): the value of the lack of fit of the full model (with all wavelengths)
+                    
+                    workers (int): number of processes used to solve the subsets
+                                concurrently (None uses all CPUs)
+                    
+                    warm_start (bool): initialize each subset model with the
+                                solution of the full model
+                    
+                    lof_tolerance (float): stop the sweep once the lack of fit
+                                exceeds lof_full_model by more than this value (in %)
 
                 Returns:
-                    *****final model results.
+                    results (DataFrame): the threshold, number of wavelengths,
+                                lack of fit, and parameter values for each subset
 
         """
         if not isinstance(step_size, float):
@@ -1148,135 +1169,149 @@ class ParameterEstimator(PEMixins, Optimizer):
         # firstly we will run the initial search from at increments of 20 % for the correlations
         # we already have lof(0) so we want 10,30,50,70, 90.
         
-        count = 0
+        thresholds = []
         filt = 0.0
-        initial_solutions = list()
-        initial_solutions.append((0, lof_full_model))
         while filt < search_range[1]:
             filt += step_size
             if filt > search_range[1]:
                 break
             elif filt == 1:
                 break
+            thresholds.append(filt)
+        
+        D = self._spectral_data_frame()
+        tasks = []
+        for filt in thresholds:
             new_subs = wavelength_subset_selection(correlations=correlations, n=filt)
-            lists1 = sorted(new_subs.items())
-            x1, y1 = zip(*lists1)
-            x = list(x1)
+            subset = sorted(new_subs.keys())
+            if len(subset) == 0:
+                break
+            tasks.append((filt, self._calc_new_D(subset, D)))
+        
+        shared = {'builder': builder_before_data,
+                  'end_time': end_time,
+                  'nfe': nfe,
+                  'ncp': ncp,
+                  'sigmas': sigmas,
+                  'warm_start': WarmStartStore.from_model(self.model) if warm_start else None,
+                  }
+        
+        workers = resolve_workers(workers, len(tasks))
+        rows = [{'threshold': 0.0,
+                 'n_wavelengths': self._n_meas_lambdas,
+                 'lof': lof_full_model,
+                 **{f'{k}': v for k, v in self._get_parameter_values().items()},
+                 }]
+        
+        pool = WorkerPool(workers, shared=shared) if workers > 1 else None
+        try:
+            for start in range(0, len(tasks), workers):
+                batch = tasks[start:start + workers]
+                if pool is None:
+                    batch_rows = [_solve_lof_subset(task, shared) for task in batch]
+                else:
+                    batch_rows = pool.map(_solve_lof_subset, batch)
+                rows.extend(batch_rows)
+                
+                if lof_tolerance is not None and any(row['lof'] > lof_full_model + lof_tolerance for row in batch_rows):
+                    print(f'The lack of fit increased by more than {lof_tolerance} % - stopping the search')
+                    break
+        finally:
+            if pool is not None:
+                pool.close()
+
+        for row in rows:
+            print("When wavelengths of less than ", row['threshold'], "correlation are removed")
+            print("The lack of fit is: ", row['lof'])
+            
+        return pd.DataFrame(rows)
+
+    # =============================================================================
+    # --------------------------- DIAGNOSTIC TOOLS ------------------------
+    # =============================================================================
 
-            new_D = self._calc_new_D(new_subs)
+    def _spectral_arrays(self, component_var, component_set):
+        """Returns the spectral data D and the profiles of the given
+        concentration variable as arrays over the measured times
 
-            # opt_model, nfe, ncp = construct_model_from_reduced_set(builder_before_data, end_time, new_D)
-            # Now that we have a new DataFrame, we need to build the entire problem from this
-            # An entire new ParameterEstimation problem should be set up, on the outside of
-            # this function and class structure, from the model already developed by the user.
-            new_template = construct_model_from_reduced_set(builder_before_data, end_time, new_D)
-            # need to put in an optional running of the variance estimator for the new
-            # parameter estimation run, or just use the previous full model run to initialize...
-            results, lof = run_param_est(new_template, nfe, ncp, sigmas)
-            initial_solutions.append((filt, lof))
+            Args:
+                component_var (str): name of the concentration variable
 
-            count += 1
+                component_set (list): components to extract
 
-        count = 0
-        for x in initial_solutions:
-            print("When wavelengths of less than ", x[0], "correlation are removed")
-            print("The lack of fit is: ", x[1])
+            Returns:
+                D (np.ndarray): spectral data (times x wavelengths)
 
-    # =============================================================================
-    # --------------------------- DIAGNOSTIC TOOLS ------------------------
-    # =============================================================================
+                C (np.ndarray): concentrations (times x components)
 
-    def lack_of_fit(self):
+        """
+        D_values = self.model.D.extract_values()
+        D = np.array([[D_values[t, l] for l in self._meas_lambdas] for t in self._meas_times], dtype=float)
+        C = VarArrayBridge(getattr(self.model, component_var),
+                           self._meas_times,
+                           component_set).get_values()
+
+        return D, C
+
+    def lack_of_fit(self, return_maps=False):
         """ Runs basic post-processing lack of fit analysis
 
             Args:
-                None
+                return_maps (bool): also return the residuals and the lack of
+                    fit for each wavelength and time
 
             Returns:
                 lack of fit (int): percentage lack of fit
 
+                maps (dict): if return_maps is True, a dictionary with the
+                    residuals (DataFrame, times x wavelengths) and the lack of
+                    fit per wavelength and per time (Series)
+
         """
-        nt = self._n_meas_times
-        nw = self._n_meas_lambdas
-        sum_e = 0
-        sum_d = 0
-        C = np.zeros((nt, self.n_val))
-        S = np.zeros((nw, self.n_val))
-        
-        for c_count, c in enumerate(self.component_set):
-            for t_count, t in enumerate(self._meas_times):
-                C[t_count, c_count] = getattr(self.model, self.component_var)[t, c].value
-
-        for c_count, c in enumerate(self.component_set):
-            for l_count, l in enumerate(self._meas_lambdas):
-                S[l_count, c_count] = self.model.S[l, c].value
-             
-        D_model = C.dot(S.T)
-        
-        for t_count, t in enumerate(self._meas_times):
-            for l_count, l in enumerate(self._meas_lambdas):
-                sum_e += (D_model[t_count, l_count] - self.model.D[t, l]) ** 2
-                sum_d += (self.model.D[t, l]) ** 2
-  
-        lof = np.sqrt(sum_e/sum_d)*100
+        D, C = self._spectral_arrays(self.component_var, self.component_set)
+        S = VarArrayBridge(self.model.S,
+                           self._meas_lambdas,
+                           self.component_set).get_values()
+        
+        lof, residuals, lof_wavelength, lof_time = lack_of_fit_maps(D, C, S)
 
         print("The lack of fit is ", lof, " %")
+        
+        if return_maps:
+            maps = {'residuals': pd.DataFrame(residuals,
+                                              index=self._meas_times,
+                                              columns=self._meas_lambdas),
+                    'lof_wavelength': pd.Series(lof_wavelength, index=self._meas_lambdas),
+                    'lof_time': pd.Series(lof_time, index=self._meas_times),
+                    }
+            return lof, maps
+        
         return lof
 
-    def wavelength_correlation(self):
+    def wavelength_correlation(self, return_matrix=False):
         """ determines the degree of correlation between the individual wavelengths and
         the and the concentrations.
 
             Args:
-                None
+                return_matrix (bool): also return the correlations of each
+                    wavelength with each component
 
             Returns:
                 dictionary of correlations with wavelength
 
-        """
-        nt = self._n_meas_times
+                correlations (DataFrame): if return_matrix is True, the
+                    correlations (wavelengths x components)
 
-        cov_d_l = dict()
-        for c in self._sublist_components:
-            for l in self._meas_lambdas:
-                mean_d = (sum(self.model.D[t, l] for t in self._meas_times) / nt)
-                mean_c = (sum(self.model.C[t, c].value for t in self._meas_times) / nt)
-                cov_d_l[l, c] = 0
-                for t in self._meas_times:
-                    cov_d_l[l, c] += (self.model.D[t, l] - mean_d) * (self.model.C[t, c].value - mean_c)
-
-                cov_d_l[l, c] = cov_d_l[l, c] / (nt - 1)
-
-        # calculating the standard devs for dl and ck over time
-        s_dl = dict()
-
-        for l in self._meas_lambdas:
-            s_dl[l] = 0
-            mean_d = (sum(self.model.D[t, l] for t in self._meas_times) / nt)
-            error = 0
-            for t in self._meas_times:
-                error += (self.model.D[t, l] - mean_d) ** 2
-            s_dl[l] = (error / (nt - 1)) ** 0.5
-
-        s_ck = dict()
-
-        for c in self._sublist_components:
-            s_ck[c] = 0
-            mean_c = (sum(self.model.C[t, c].value for t in self._meas_times) / nt)
-            error = 0
-            for t in self._meas_times:
-                error += (self.model.C[t, c].value - mean_c) ** 2
-            s_ck[c] = (error / (nt - 1)) ** 0.5
-
-        cor_lc = dict()
-
-        for c in self._sublist_components:
-            for l in self._meas_lambdas:
-                cor_lc[l, c] = cov_d_l[l, c] / (s_ck[c] * s_dl[l])
-
-        cor_l = dict()
-        for l in self._meas_lambdas:
-            cor_l[l] = max(cor_lc[l, c] for c in self._sublist_components)
+        """
+        D, C = self._spectral_arrays(self.__var.concentration_spectra, self._sublist_components)
+        cor_lc = wavelength_correlation_matrix(D, C)
+        cor_l = dict(zip(self._meas_lambdas, cor_lc.max(axis=1).tolist()))
+        
+        if return_matrix:
+            cor_lc = pd.DataFrame(cor_lc,
+                                  index=self._meas_lambdas,
+                                  columns=self._sublist_components)
+            return cor_l, cor_lc
 
         return cor_l
 
@@ -1415,7 +1450,7 @@ def construct_model_from_reduced_set(builder_clone, end_time, D):
     return opt_model
 
 
-def run_param_est(opt_model, nfe, ncp, sigmas, solver='ipopt'):
+def run_param_est(opt_model, nfe, ncp, sigmas, solver='ipopt', initial_values=None, warm_start=None):
     """ Runs the parameter estimator for the selected subset
 
         Args:
@@ -1423,6 +1458,10 @@ def run_param_est(opt_model, nfe, ncp, sigmas, solver='ipopt'):
             nfe (int): number of finite elements
             ncp (int): number of collocation points
             sigmas(dict): dictionary containing the variances, as used in the ParameterEstimator class
+            initial_values (dict): optional variable values used to initialize the
+                model after discretization (see get_model_values)
+            warm_start (WarmStartStore): optional warm start (values, multipliers
+                and duals) from a related solve
 
         Returns:
             results_pyomo (results of optimization): Parameter Estimation results
@@ -1432,6 +1471,8 @@ def run_param_est(opt_model, nfe, ncp, sigmas, solver='ipopt'):
 
     p_estimator = ParameterEstimator(opt_model)
     p_estimator.apply_discretization('dae.collocation', nfe=nfe, ncp=ncp, scheme='LAGRANGE-RADAU')
+    if initial_values is not None:
+        set_model_values(p_estimator.model, initial_values)
     options = dict()
 
     # These may not always solve, so we need to come up with a decent initialization strategy here
@@ -1439,14 +1480,93 @@ def run_param_est(opt_model, nfe, ncp, sigmas, solver='ipopt'):
         results_pyomo = p_estimator.run_opt('ipopt',
                                             tee=False,
                                             solver_opts=options,
-                                            variances=sigmas)
+                                            variances=sigmas,
+                                            warm_start=warm_start)
     else:
         results_pyomo = p_estimator.run_opt(solver,
                                             tee=False,
                                             solver_opts=options,
                                             variances=sigmas,
-                                            covariance=True)
+                                            covariance=True,
+                                            warm_start=warm_start)
     
     lof = p_estimator.lack_of_fit()
 
-    return results_pyomo, lof
\ No newline at end of file
+    return results_pyomo, lof
+
+
+def _solve_lof_subset(task, shared=None):
+    """Solves the parameter estimation problem for one wavelength subset of
+    the lack of fit analysis
+
+        Args:
+            task (tuple): the correlation threshold and the reduced dataset
+
+            shared (dict): the objects shared by all subsets (taken from the
+                worker state if None)
+
+        Returns:
+            row (dict): threshold, number of wavelengths, lack of fit, and
+                parameter values
+
+    """
+    filt, new_D = task
+    if shared is None:
+        shared = get_worker_state()
+    
+    new_template = construct_model_from_reduced_set(shared['builder'], shared['end_time'], new_D)
+    # Each subset starts from the full model, not from the previous subset
+    warm_start = shared['warm_start']
+    results, lof = run_param_est(new_template,
+                                 shared['nfe'],
+                                 shared['ncp'],
+                                 shared['sigmas'],
+                                 warm_start=warm_start.copy() if warm_start is not None else None)
+    
+    return {'threshold': filt,
+            'n_wavelengths': new_D.shape[1],
+            'lof': lof,
+            **{f'{k}': v for k, v in results.P.items()},
+            }
+
+
+def get_model_values(model):
+    """Returns the current values of all model variables
+
+        Args:
+            model (ConcreteModel): the model
+
+        Returns:
+            values (dict): variable name to a dict of index to value
+
+    """
+    values = {}
+    for var in model.component_objects(Var):
+        values[var.local_name] = {index: var_data.value for index, var_data in var.items() if var_data.value is not None}
+        
+    return values
+
+
+def set_model_values(model, values):
+    """Sets the values of the model variables from get_model_values. Only
+    variables and indices present in both models are set and fixed variables
+    are not changed
+
+        Args:
+            model (ConcreteModel): the model
+
+            values (dict): values from get_model_values
+
+        Returns:
+            None
+
+    """
+    for var in model.component_objects(Var):
+        var_values = values.get(var.local_name)
+        if var_values is None:
+            continue
+        for index, var_data in var.items():
+            if not var_data.fixed and index in var_values:
+                var_data.value = var_values[index]
+                
+    return None
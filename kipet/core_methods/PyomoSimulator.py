@@ -330,13 +330,14 @@ class PyomoSimulator(Simulator):
     #         _print('Unsupported data type for initialization...')
     #         return None, None
         
-    def initialize_from_trajectory(self, variable_name, trajectories):
+    def initialize_from_trajectory(self, variable_name, trajectories, method='linear'):
         """Initializes discretized points with values from trajectories.
         Args:
             variable_name (str): Name of the variable in pyomo model
             trajectories (DataFrame or Series): Indexed in in the same way the pyomo
             variable is indexed. If the variable is by two sets then the first set is
             the indices of the data frame, the second set is the columns
+            method (str): interpolation method ('linear', 'cubic', or 'hold')
         Returns:
             None
         """
@@ -349,18 +350,22 @@ class PyomoSimulator(Simulator):
        
         if inner_set is None and component_set is None:
             return None
-
-        for component in component_set:
-            if component in trajectories.columns:
-                single_trajectory = trajectories[component]
-                values = interpolate_trajectory(inner_set, single_trajectory)
-                for i, t in enumerate(inner_set):
-                    if not np.isnan(values[i]):
-                        var[t, component].value = values[i]
+        
+        components = [component for component in component_set if component in trajectories.columns]
+        if len(components) == 0:
+            return None
+        
+        inner_set = list(inner_set)
+        values = interpolate_trajectories(inner_set, trajectories[components], method=method)
+        
+        for j, component in enumerate(components):
+            for t, value in zip(inner_set, values[:, j].tolist()):
+                if not np.isnan(value):
+                    var[t, component].value = value
 
         return None
 
-    def scale_variables_from_trajectory(self, variable_name, trajectories):
+    def scale_variables_from_trajectory(self, variable_name, trajectories, method=None):
         """Scales discretized variables with maximum value of the trajectory.
         Note:
             This method only works with ipopt
@@ -369,6 +374,8 @@ class PyomoSimulator(Simulator):
             trajectories (DataFrame or Series): Indexed in in the same way the pyomo
             variable is indexed. If the variable is by two sets then the first set is
             the indices of the data frame, the second set is the columns
+            method (str): if given, the maximum is taken from the trajectories
+            interpolated at the model times with this method ('linear', 'cubic', or 'hold')
         Returns:
             None
         """
@@ -380,14 +387,21 @@ class PyomoSimulator(Simulator):
         if inner_set is None and component_set is None:
             return None
         
-        for component in component_set:
-            
-            if component not in component_set:
-                raise RuntimeError(f'Component {component} is not used in the model')
-                
-            nominal_vals = abs(trajectories[component].max())
-            if nominal_vals >= tol:
-                scale = 1.0 / nominal_vals
+        components = list(component_set)
+        missing = [component for component in components if component not in trajectories.columns]
+        if len(missing) > 0:
+            raise RuntimeError(f'Components {missing} are not in the trajectories')
+        
+        inner_set = list(inner_set)
+        if method is None:
+            nominal_vals = np.abs(trajectories[components].max().to_numpy(dtype=float))
+        else:
+            values = interpolate_trajectories(inner_set, trajectories[components], method=method)
+            nominal_vals = np.abs(np.nanmax(values, axis=0))
+        
+        for component, nominal_val in zip(components, nominal_vals.tolist()):
+            if nominal_val >= tol:
+                scale = 1.0 / nominal_val
                 for t in inner_set:
                     self.model.scaling_factor.set_value(var[t, component], scale)
 
@@ -22,6 +22,7 @@ from kipet.post_model_build.pyomo_model_tools import (
     get_index_sets,
     index_set_info,
     )         
+from kipet.common.binary_io import BinaryStore, storable, write_npz
 from kipet.common.read_write_tools import df_from_pyomo_data
 
 # This needs deletion
@@ -55,6 +56,91 @@ class ResultsObject(object):
     
     def __repr__(self):
         return self.__str__()
+    
+    def __getattr__(self, name):
+        """Loads variables from a binary results file on first access"""
+        
+        store = self.__dict__.get('_store')
+        if store is not None and name in store:
+            value = store.load(name)
+            setattr(self, name, value)
+            return value
+        
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __getstate__(self):
+        """Reads the variables still in the binary results file so that the
+        open archive is not pickled (or deep copied)"""
+
+        self.load_all()
+        state = self.__dict__.copy()
+        state.pop('_store', None)
+
+        return state
+
+    def save(self, filename, variables=None):
+        """Saves the results to a binary (NPZ) file
+        
+        Args:
+            filename (str): the file name (.npz is added if missing)
+            
+            variables (list): the names of the results to save. If None, all
+                results that can be stored (DataFrames, Series, arrays,
+                numeric dicts, and scalars) are saved
+                
+        Returns:
+            filename (Path): the file written
+        
+        """
+        if variables is None:
+            self.load_all()
+            variables = [name for name, value in vars(self).items() if not name.startswith('_') and storable(value)]
+        
+        metadata = {'results_name': self.results_name,
+                    'solver_statistics': {k: v for k, v in self.solver_statistics.items() if storable(v)},
+                    }
+        
+        return write_npz(filename, {name: getattr(self, name) for name in variables}, metadata=metadata)
+    
+    @classmethod
+    def load(cls, filename, lazy=True):
+        """Loads results saved with ResultsObject.save
+        
+        Args:
+            filename (str): the NPZ file
+            
+            lazy (bool): read each variable only when it is first used
+            
+        Returns:
+            results (ResultsObject): the loaded results
+        
+        """
+        results = cls()
+        store = BinaryStore(filename)
+        results.results_name = store.metadata.get('results_name')
+        results.solver_statistics = store.metadata.get('solver_statistics', {})
+        results._store = store
+        
+        if not lazy:
+            results.load_all()
+        
+        return results
+    
+    def load_all(self):
+        """Reads all variables not yet loaded from the binary results file"""
+        
+        store = self.__dict__.get('_store')
+        if store is None:
+            return None
+        
+        for name in store:
+            if name not in self.__dict__:
+                setattr(self, name, store.load(name))
+        
+        store.close()
+        self._store = None
+        
+        return None
 
     def compute_var_norm(self, variable_name, norm_type=np.inf):
         var = getattr(self,variable_name)
@@ -66,32 +152,81 @@ class ResultsObject(object):
         """Convert results dict into df for initialization
         This is used for data with dimensions larger than 2
         """
-        #try:
         index_sets = get_index_sets(var)
         index_dict = index_set_info(index_sets)
-        # print(var)
-        # print(index_dict)
-        time_set = index_sets[index_dict['cont_set'][0]].name
+        time_pos = index_dict['cont_set'][0]
+        time_set = index_sets[time_pos].name
         component_indecies = index_dict['other_set']
         component_sets = [index_sets[i].name for i in component_indecies]
         index = getattr(model, time_set).value_list
         columns = list(itertools.product(*[getattr(model, comp_list).value_list for comp_list in component_sets]))
-        df = pd.DataFrame(data=None, index=index, columns=columns)
-
-        for i in index:
-            for j in columns:
-                jl = list(j)
-                jl.insert(index_dict['cont_set'][0], i)
-                df.loc[i,j] = var[tuple(jl)].value
+        
+        row_pos = {i: n for n, i in enumerate(index)}
+        col_pos = {j: n for n, j in enumerate(columns)}
+        data = np.full((len(index), len(columns)), np.nan)
+        
+        for key, var_data in var.items():
+            value = var_data.value
+            if value is None:
+                continue
+            col = tuple(key[i] for i in component_indecies)
+            data[row_pos[key[time_pos]], col_pos[col]] = value
                 
+        return pd.DataFrame(data=data, index=index, columns=columns)
+    
+    @staticmethod
+    def prepare_2d_data(var):
+        """Convert a variable indexed by two sets into a df (the rows are the
+        first index and the columns the second, missing values are zero)
+        
+        The values are read into a preallocated array using the index sets of
+        the variable. Variables that are not defined over the full product of
+        their index sets use df_from_pyomo_data instead.
+        """
+        index_sets = get_index_sets(var)
+        if len(index_sets) != 2:
+            return df_from_pyomo_data(var)
+        
+        index = list(index_sets[0])
+        columns = list(index_sets[1])
+        if len(var) != len(index)*len(columns):
+            return df_from_pyomo_data(var)
+        
+        row_pos = {i: n for n, i in enumerate(index)}
+        col_pos = {j: n for n, j in enumerate(columns)}
+        data = np.zeros((len(index), len(columns)))
+        
+        for (i, j), var_data in var.items():
+            value = var_data.value
+            if value is not None:
+                data[row_pos[i], col_pos[j]] = value
+        
+        df = pd.DataFrame(data=data, index=index, columns=columns)
+        
+        # Same ordering as df_from_pyomo_data
+        try:
+            df = df.sort_index(axis=0).sort_index(axis=1)
+        except TypeError:
+            pass
+        
         return df
-        #except:
-         #   return None
 
     def load_from_pyomo_model(self, instance, to_load=None):
-        """Load variables from the pyomo model into various formats"""
+        """Load variables from the pyomo model into various formats
         
+        Args:
+            instance (ConcreteModel): the solved model
+            
+            to_load (list): optional list of the variable names to load. If
+                None, all of the model variables are loaded
+                
+        Returns:
+            None
+        
+        """
         variables_to_load = get_vars(instance)
+        if to_load is not None:
+            variables_to_load = [name for name in variables_to_load if name in to_load]
     
         for name in variables_to_load:
     
@@ -104,10 +239,8 @@ class ResultsObject(object):
             elif var.dim()==1:
                 setattr(self, name, pd.Series(var.get_values()))
             elif var.dim()==2:
-                d = var.get_values()
-                keys = d.keys()
-                if keys:
-                    data_frame = df_from_pyomo_data(var)
+                if len(var) > 0:
+                    data_frame = self.prepare_2d_data(var)
                 else:
                     data_frame = pd.DataFrame(data=[],
                                               columns = [],
@@ -9,29 +9,83 @@ from pyomo.environ import *
 from kipet.core_methods.ResultsObject import *
 
 def interpolate_trajectory(t, tr):
+    """Interpolates a single trajectory (Series) at the times t
     
-    tr_val = np.zeros((len(t)))
-    times = [float(ti) for ti in t]
-    indx = tr.index.astype(float)
-
-    for i, t_indx in enumerate(times):
-
-        if i == 0:
-            tr_val[i] = tr.iloc[0]
-            continue        
+    See interpolate_trajectories for the details
+    
+    """
+    return interpolate_trajectories(t, tr.to_frame())[:, 0]
 
-        indx_left = bisect.bisect_left(indx[1:], times[i])
-        if indx_left == len(tr) - 1:
-            tr_val[i] = tr.iloc[indx_left]
-            continue
+def interpolate_trajectories(t, trajectories, method='linear'):
+    """Interpolates all columns of the trajectories at the times t at once
+    
+    The first time in t always takes the first value of the trajectories and
+    times after the last trajectory time hold the last value.
+    
+    Args:
+        t (array-like): the times to interpolate at (sorted)
+        
+        trajectories (DataFrame): the trajectories indexed by time
         
-        dx = indx[indx_left + 1] - indx[indx_left]
-        dy = tr.iloc[indx_left + 1] - tr.iloc[indx_left]
-        m = dy/dx
-        val = tr.iloc[indx_left] +  (times[i] - indx[indx_left]) * m
-        tr_val[i] = val
+        method (str): 'linear' for linear interpolation, 'cubic' for a cubic
+            spline (columns with missing values use linear interpolation), or
+            'hold' to take the last value at or before each time
+            
+    Returns:
+        values (np.ndarray): the interpolated values (times x columns)
+    
+    """
+    times = np.asarray([float(ti) for ti in t])
+    x = trajectories.index.to_numpy(dtype=float)
+    y = trajectories.to_numpy(dtype=float)
+    n = len(x)
+    values = np.empty((len(times), y.shape[1]))
+    
+    if len(times) == 0:
+        return values
+    
+    if method == 'linear':
+        values[:] = _interpolate_linear(times, x, y)
+    
+    elif method == 'hold':
+        indx = np.searchsorted(x, times, side='right') - 1
+        values[:] = y[np.clip(indx, 0, n - 1)]
+        
+    elif method == 'cubic':
+        from scipy.interpolate import CubicSpline
+        
+        has_nan = np.isnan(y).any(axis=0)
+        values[:, has_nan] = _interpolate_linear(times, x, y[:, has_nan])
+        if not has_nan.all():
+            spline = CubicSpline(x, y[:, ~has_nan], axis=0, extrapolate=True)
+            cubic = spline(times)
+            cubic[times > x[-1]] = y[-1, ~has_nan]
+            values[:, ~has_nan] = cubic
+            
+    else:
+        raise ValueError(f'Unknown interpolation method: {method}')
+    
+    values[0] = y[0]
+    
+    return values
+
+def _interpolate_linear(times, x, y):
+    """Linear interpolation of the columns of y (times after x[-1] hold the
+    last value and times before x[1] use the first interval)"""
+    
+    n = len(x)
+    indx = np.searchsorted(x[1:], times, side='left')
+    hold = indx >= n - 1
+    indx = np.minimum(indx, max(n - 2, 0))
+    
+    if n > 1:
+        slope = (y[indx + 1] - y[indx])/(x[indx + 1] - x[indx])[:, None]
+        values = y[indx] + (times - x[indx])[:, None]*slope
+    else:
+        values = np.repeat(y, len(times), axis=0)
+    values[hold] = y[-1]
     
-    return tr_val 
+    return values
 
 class Simulator(object):
     """Base simulator class.
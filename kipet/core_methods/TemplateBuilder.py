@@ -23,7 +23,7 @@ from kipet.core_methods.PyomoSimulator import PyomoSimulator
 from kipet.top_level.variable_names import VariableNames
 from kipet.post_model_build.pyomo_model_tools import get_index_sets
 from kipet.common.VisitorClasses import ReplacementVisitor
-from kipet.common.component_expression import Comp
+from kipet.common.component_expression import Comp, ExpressionTemplate
 
 logger = logging.getLogger('ModelBuilderLogger')
 
@@ -971,28 +971,22 @@ class TemplateBuilder(object):
         # if hasattr(self, 'reaction_dict'):
         if isinstance(self._odes, dict):
             
+            # Each ODE is analyzed once and then instantiated at each time
+            templates = {k: ExpressionTemplate(v.expression, self.c_mod) for k, v in self._odes.items()}
+            
             def rule_odes(m, t, k):
-                exprs = self._odes                
                
                 if t == m.start_time.value:
                     return Constraint.Skip
                 else:
-                    if k in m.mixture_components:
-                        if k in exprs.keys():
+                    if k in templates:
+                        if k in m.mixture_components:
                             deriv_var = f'd{self.__var.concentration_model}dt'
-                            final_expr = getattr(m, deriv_var)[t, k] == exprs[k].expression
-                            final_expr  = self.change_time(final_expr, self.c_mod, t, m)
-                            return final_expr
                         else:
-                            return Constraint.Skip
-                    else:
-                        if k in exprs.keys():
                             deriv_var = f'd{self.__var.state_model}dt'
-                            final_expr = getattr(m, deriv_var)[t, k] == exprs[k].expression
-                            final_expr  = self.change_time(final_expr, self.c_mod, t, m)
-                            return final_expr
-                        else:
-                            return Constraint.Skip
+                        return getattr(m, deriv_var)[t, k] == templates[k].instantiate(m, t)
+                    else:
+                        return Constraint.Skip
 
             setattr(model, self.__var.ode_constraints, Constraint(model.alltime,
                                                                   model.states,
@@ -1005,12 +999,11 @@ class TemplateBuilder(object):
         if self._algebraic_constraints:
             if hasattr(self, 'reaction_dict') or hasattr(self, '_use_alg_dict') and self._use_alg_dict:
                 n_alg_eqns = list(self._algebraic_constraints.keys())
+                templates = {k: ExpressionTemplate(v.expression, self.c_mod) for k, v in self._algebraic_constraints.items()}
+                
                 def rule_algebraics(m, t, k):
-                    alg_const = self._algebraic_constraints[k].expression
                     alg_var = getattr(m, self.__var.algebraic)[t, k]
-                    final_expr = alg_var - alg_const == 0.0
-                    final_expr  = self.change_time(final_expr, self.c_mod, t, m)
-                    return final_expr
+                    return alg_var - templates[k].instantiate(m, t) == 0.0
     
             model.algebraic_consts = Constraint(model.alltime,
                                                 n_alg_eqns,
@@ -1469,17 +1462,7 @@ class TemplateBuilder(object):
         self._apply_bounds_to_variables(pyomo_model)
        
         # Add given state standard deviations to the pyomo model
-        self._state_sigmas = self.template_component_data.var_variances()
-        if hasattr(self, 'template_state_data'):
-            self._state_sigmas.update(**self.template_state_data.var_variances())
-        
-        for k, v in self._state_sigmas.items():
-            if v is None:
-                self._state_sigmas[k] = 1
-                print(f'Warning: No variance provided for model component {k}, it is being set to one')
-       
-        state_sigmas = {k: v for k, v in self._state_sigmas.items() if k in pyomo_model.measured_data}
-        pyomo_model.sigma = Param(pyomo_model.measured_data, domain=Reals, initialize=state_sigmas)
+        self._add_state_sigmas(pyomo_model)
        
         # In case of a second call after known_absorbing has been declared
         if self._huplc_data is not None and self._is_huplc_abs_set:
@@ -1494,6 +1477,26 @@ class TemplateBuilder(object):
             
         return pyomo_model
 
+    def _add_state_sigmas(self, pyomo_model):
+        """Adds the given state variances to the pyomo model as sigma"""
+        
+        self._state_sigmas = self.template_component_data.var_variances()
+        if hasattr(self, 'template_state_data'):
+            self._state_sigmas.update(**self.template_state_data.var_variances())
+        
+        for k, v in self._state_sigmas.items():
+            if v is None:
+                self._state_sigmas[k] = 1
+                print(f'Warning: No variance provided for model component {k}, it is being set to one')
+       
+        state_sigmas = {k: v for k, v in self._state_sigmas.items() if k in pyomo_model.measured_data}
+        
+        if hasattr(pyomo_model, 'sigma'):
+            pyomo_model.del_component('sigma')
+        pyomo_model.sigma = Param(pyomo_model.measured_data, domain=Reals, initialize=state_sigmas)
+        
+        return None
+
     @property
     def num_parameters(self):
         return len(self._parameters)
@@ -2,6 +2,7 @@
 import math
 from os import getcwd, remove
 import sys
+import time
 
 # Third party imports
 import numpy as np
@@ -27,6 +28,10 @@ from kipet.top_level.variable_names import VariableNames
 
 # Pyomo version check
 from pyomo.core.base.set import SetProduct
+try:
+    from pyomo.contrib.appsi.base import TerminationCondition as appsi_TerminationCondition
+except ImportError:
+    appsi_TerminationCondition = None
 
     
    
@@ -60,7 +65,8 @@ class fe_initialize(object):
                   inputs=None,
                   inputs_sub=None,
                   jump_times=None,
-                  jump_states=None
+                  jump_states=None,
+                  persistent=False,
                   ):
         """
         The `the paran name` might be a list of strings or a single string
@@ -113,6 +119,10 @@ class fe_initialize(object):
                 index (time) inputs
             inputs_sub (dict): The multi-index dictionary. Use this dictionary
                 for multi-index inputs.
+                
+            persistent (bool): Use the persistent (APPSI) interface to ipopt.
+                The model is only processed once and only the changed
+                parameters and fixed values are updated for each element.
         
         """
         # This is a huge __init__ ==> offload to methods
@@ -122,6 +132,18 @@ class fe_initialize(object):
         self.ip.options['halt_on_ampl_error'] = 'yes'
         self.ip.options['print_user_options'] = 'yes'
         
+        #: Options for each attempt at solving a finite element
+        self.solver_options = {'print_level': 1,
+                               'bound_push': 1e-02,
+                               }
+        self.retry_options = [{'start_with_resto': 'yes'},
+                              {'start_with_resto': 'no',
+                               'bound_relax_factor': 1e-05},
+                              ]
+        self.persistent = persistent
+        self._persistent_solver = None
+        self.element_stats = []
+        
         self.model_orig = model_orig
         self.model_ref = src_mod.clone()
 
@@ -425,27 +447,23 @@ class fe_initialize(object):
         if self.inputs or self.inputs_sub:
             self.load_input(fe)
         
-        self.ip.options["print_level"] = 1  #: change this on demand
-        # self.ip.options["start_with_resto"] = 'no'
-        self.ip.options['bound_push'] = 1e-02
-        sol = self.ip.solve(self.model_ref, tee=False, symbolic_solver_labels=True)
-
-        # Try to redo it if it fails
-        if sol.solver.termination_condition != TerminationCondition.optimal:
-            self.ip.options["OF_start_with_resto"] = 'yes'
-           
-            sol = self.ip.solve(self.model_ref, tee=False, symbolic_solver_labels=True)
-            if sol.solver.termination_condition != TerminationCondition.optimal:
-                
-                self.ip.options["OF_start_with_resto"] = 'no'
-                self.ip.options["bound_push"] = 1E-02
-                self.ip.options["OF_bound_relax_factor"] = 1E-05
-                sol = self.ip.solve(self.model_ref, tee=True, symbolic_solver_labels=True)
-                self.ip.options["OF_bound_relax_factor"] = 1E-08
-                
-                # It if fails twice, raise an error
-                if sol.solver.termination_condition != TerminationCondition.optimal:
-                    raise Exception("The current iteration was unsuccessful. Iteration :{}".format(fe))
+        start = time.perf_counter()
+        attempts = [{}] + self.retry_options
+        for attempt, options in enumerate(attempts):
+            tee = attempt == len(attempts) - 1 and attempt > 0
+            optimal = self._solve_element(options, tee=tee)
+            if optimal:
+                break
+            
+        self.element_stats.append({'fe': fe,
+                                   'time': time.perf_counter() - start,
+                                   'attempts': attempt + 1,
+                                   'optimal': optimal,
+                                   })
+        
+        # It if fails with all options, raise an error
+        if not optimal:
+            raise Exception("The current iteration was unsuccessful. Iteration :{}".format(fe))
 
         # else:
         #     print(f'{fe + 1} status: optimal')
@@ -453,6 +471,81 @@ class fe_initialize(object):
         self.cycle_ics(fe)
 
     
+    def _solve_element(self, options, tee=False):
+        """Solves the current finite element problem
+
+        Args:
+            options (dict): ipopt options added to solver_options for this attempt
+
+            tee (bool): show the solver output
+
+        Returns:
+            optimal (bool): True if the problem was solved to optimality
+        """
+        options = {**self.solver_options, **options}
+
+        if self.persistent:
+            solver = self._get_persistent_solver()
+            solver.config.stream_solver = tee
+            solver.ipopt_options.clear()
+            solver.ipopt_options.update(options)
+            res = solver.solve(self.model_ref)
+            optimal = res.termination_condition == appsi_TerminationCondition.optimal
+            if optimal:
+                res.solution_loader.load_vars()
+            return optimal
+
+        for option in ['start_with_resto', 'bound_relax_factor']:
+            self.ip.options.pop(f'OF_{option}', None)
+        for option, value in options.items():
+            if option in ['start_with_resto', 'bound_relax_factor']:
+                option = f'OF_{option}'
+            self.ip.options[option] = value
+
+        sol = self.ip.solve(self.model_ref, tee=tee, symbolic_solver_labels=True)
+        return sol.solver.termination_condition == TerminationCondition.optimal
+
+    def _get_persistent_solver(self):
+        """Sets up the persistent ipopt interface the first time it is needed.
+        The constraint structure of the element model does not change during
+        the march, so only the parameters and the fixed variables are updated
+        between the elements.
+        """
+        if self._persistent_solver is not None:
+            return self._persistent_solver
+
+        try:
+            from pyomo.contrib.appsi.solvers import Ipopt
+        except ImportError:
+            raise ImportError('The persistent fe_factory mode requires a Pyomo version with APPSI (pyomo.contrib.appsi)')
+
+        if len(list(self.model_ref.component_data_objects(Objective, active=True))) == 0:
+            self.model_ref.fe_objective = Objective(expr=1)
+
+        solver = Ipopt()
+        solver.config.load_solution = False
+        solver.update_config.check_for_new_or_removed_constraints = False
+        solver.update_config.check_for_new_or_removed_vars = False
+        solver.update_config.check_for_new_or_removed_params = False
+        solver.update_config.check_for_new_objective = False
+        solver.update_config.update_constraints = False
+        solver.update_config.update_named_expressions = False
+        solver.update_config.update_objective = False
+        solver.update_config.treat_fixed_vars_as_params = True
+        solver.set_instance(self.model_ref)
+
+        self._persistent_solver = solver
+        return solver
+
+    def get_element_stats(self):
+        """Returns the timing and retry statistics of the finite elements
+
+        Returns:
+            stats (DataFrame): solve time [s], number of attempts, and status
+                for each finite element
+        """
+        return pd.DataFrame(self.element_stats, columns=['fe', 'time', 'attempts', 'optimal'])
+
     def load_discrete_jump(self, dosing_points):
         """Method is used to define and load the places where discrete jumps are located, e.g.
         dosing points or external inputs.
@@ -644,8 +737,13 @@ class fe_initialize(object):
         """
         print(f'Starting FE Factory: Solving for {len(self.fe_list)} elements')
         
+        self.element_stats = []
         for i in range(0, len(self.fe_list)):
             self.march_forward(i, resto_strategy=resto_strategy)
+            
+        stats = self.get_element_stats()
+        n_retried = int((stats.attempts > 1).sum())
+        print(f'FE Factory finished in {stats.time.sum():0.2f} s ({n_retried} elements needed a retry)')
 
     def load_input(self, fe):
         # type: (int) -> None
@@ -0,0 +1,621 @@
+"""
+Development Tools for benchmarking
+
+Simple timing comparisons between the reference (loop based) implementations
+and the implementations used in KIPET. These are not run as part of the tests
+and are intended to be called directly during development (the reference
+implementations are in kipet.dev_tools.reference_implementations):
+
+    from kipet.dev_tools.benchmarks import benchmark_chen_scipy
+    benchmark_chen_scipy(nt=300, nl=500)
+"""
+# Standard library imports
+import time
+
+# Third party imports
+import numpy as np
+from scipy.sparse import coo_matrix
+
+# KIPET library imports
+from kipet.common.prob_gen_tools import generate_random_absorbance_data
+from kipet.dev_tools.reference_implementations import (
+    _c_jacobian_loop,
+    _c_residual_loop,
+    _msc_loop,
+    _read_instrument_loop,
+    _read_triplets_loop,
+    _reduced_hessian_dense_Z,
+    _s_jacobian_loop,
+    _s_residual_loop,
+    _savitzky_golay_loop,
+    _snv_loop,
+    )
+
+
+def _time_function(func, *args, repeats=3):
+    """Returns the best wall time of func over a number of repeats and the last
+    output of the function
+
+    """
+    best = np.inf
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        output = func(*args)
+        best = min(best, time.perf_counter() - t0)
+
+    return best, output
+
+
+def _print_comparison(title, timings):
+    """Prints the timings of the benchmark in a small table"""
+
+    m = 25
+    print(f'\n{title}\n')
+    for k, v in timings.items():
+        print(f'{str(k).rjust(m)} : {v}')
+
+    return None
+
+
+def generate_synthetic_spectra(nt=300, nl=500, seed=0):
+    """Generates a spectral data matrix D = C*S^T for the reaction A -> B -> C
+    using the absorbance profiles from prob_gen_tools
+
+    Args:
+        nt (int): number of times
+
+        nl (int): number of wavelengths
+
+        seed (int): random seed for the absorbance profiles
+
+    Returns:
+        D, C, S (tuple): numpy arrays of the data, concentrations, and
+            absorbances
+
+    """
+    times = np.linspace(0, 10, nt)
+    wl_span = np.linspace(1610, 2200, nl)
+
+    k1, k2 = 2.0, 0.2
+    A = np.exp(-k1*times)
+    B = k1/(k2 - k1)*(np.exp(-k1*times) - np.exp(-k2*times))
+    C = np.column_stack([A, B, 1 - A - B])
+
+    S = generate_random_absorbance_data(wl_span,
+                                        {'A': 2, 'B': 1, 'C': 1},
+                                        seed=seed).values
+
+    D = C @ S.T
+
+    return D, C, S
+
+
+def benchmark_chen_scipy(nt=300, nl=500, repeats=3, seed=0):
+    """Compares the loop and vectorized residuals and Jacobians used in the
+    scipy version of the Chen et al. variance method
+
+    Args:
+        nt (int): number of times
+
+        nl (int): number of wavelengths
+
+        repeats (int): number of timing repeats (best is reported)
+
+        seed (int): random seed for the synthetic spectra
+
+    Returns:
+        timings (dict): wall times [s] and the largest absolute differences
+
+    """
+    from scipy.sparse import csr_matrix
+    from kipet.variance_methods.chen_method_scipy import (
+        c_jacobian_data,
+        c_jacobian_pattern,
+        c_residual,
+        s_jacobian_data,
+        s_jacobian_pattern,
+        s_residual,
+        )
+
+    D, C, S = generate_synthetic_spectra(nt, nl, seed)
+    nc = C.shape[1]
+    z_array = C.flatten()
+    s_array = S.flatten()
+
+    def s_jacobian(x, z_array, d_array, nl, nt, nc):
+        indices, indptr = s_jacobian_pattern(nt, nl, nc)
+        data = s_jacobian_data(z_array, nl, nt, nc)
+        return csr_matrix((data, indices, indptr), shape=(nt*nl, nc*nl))
+
+    def c_jacobian(x, s_array, d_array, nl, nt, nc):
+        indices, indptr = c_jacobian_pattern(nt, nl, nc)
+        data = c_jacobian_data(s_array, nl, nt, nc)
+        return csr_matrix((data, indices, indptr), shape=(nt*nl, nc*nt))
+
+    s_args = (s_array, z_array, D, nl, nt, nc)
+    c_args = (z_array, s_array, D, nl, nt, nc)
+
+    timings = {}
+    comparisons = [
+        ('S residual', _s_residual_loop, s_residual, s_args),
+        ('S jacobian', _s_jacobian_loop, s_jacobian, s_args),
+        ('C residual', _c_residual_loop, c_residual, c_args),
+        ('C jacobian', _c_jacobian_loop, c_jacobian, c_args),
+        ]
+
+    for name, reference, vectorized, args in comparisons:
+        t_ref, out_ref = _time_function(reference, *args, repeats=repeats)
+        t_vec, out_vec = _time_function(vectorized, *args, repeats=repeats)
+
+        if hasattr(out_ref, 'toarray'):
+            error = abs(out_ref.tocsr() - out_vec).max()
+        else:
+            error = np.max(np.abs(out_ref - out_vec))
+
+        timings[f'{name} loop'] = t_ref
+        timings[f'{name} vectorized'] = t_vec
+        timings[f'{name} max diff'] = error
+
+    _print_comparison(f'Chen scipy method: {nt} times x {nl} wavelengths', timings)
+
+    return timings
+
+
+def _make_template_models(n_species, n_params, n_times, seed=0):
+    """Builds the placeholder model (as in ReactionModel), a target model,
+    and a set of mass action ODEs for the template benchmark
+
+    """
+    from pyomo.environ import ConcreteModel, Set, Var
+
+    rng = np.random.default_rng(seed)
+    species = [f'A{i}' for i in range(n_species)]
+    params = [f'k{i}' for i in range(n_params)]
+
+    set_up = ConcreteModel()
+    set_up.indx = Set(initialize=[0])
+    c_mod = {}
+    for name in species:
+        set_up.add_component(name, Var(set_up.indx, set_up.indx, initialize=1))
+        c_mod[name] = ['Z', getattr(set_up, name)[0, 0]]
+    for name in params:
+        set_up.add_component(name, Var(set_up.indx, initialize=1))
+        c_mod[name] = ['P', getattr(set_up, name)[0]]
+
+    odes = {}
+    for name in species:
+        terms = 0
+        for r in range(4):
+            a, b = rng.choice(species, 2)
+            k = rng.choice(params)
+            terms += c_mod[k][1]*c_mod[a][1]*c_mod[b][1]
+        odes[name] = -c_mod[name][1]*c_mod[params[0]][1] + terms
+
+    model = ConcreteModel()
+    model.alltime = Set(initialize=np.linspace(0, 1, n_times).tolist())
+    model.species = Set(initialize=species)
+    model.params = Set(initialize=params)
+    model.Z = Var(model.alltime, model.species, initialize=1)
+    model.P = Var(model.params, initialize=1)
+
+    return model, c_mod, odes
+
+
+def benchmark_template_build(n_species=40, n_params=30, n_times=600, seed=0):
+    """Compares the time to build the ODE expressions at every time point
+    with the per variable replacement (TemplateBuilder.change_time) and the
+    compiled expression templates
+
+    Args:
+        n_species (int): number of species (ODEs)
+
+        n_params (int): number of parameters
+
+        n_times (int): number of time points (nfe*ncp)
+
+        seed (int): random seed for the reaction network
+
+    Returns:
+        timings (dict): wall times [s] and whether the expressions match
+
+    """
+    from kipet.common.component_expression import ExpressionTemplate
+    from kipet.core_methods.TemplateBuilder import TemplateBuilder
+
+    model, c_mod, odes = _make_template_models(n_species, n_params, n_times, seed)
+    builder = TemplateBuilder()
+    times = list(model.alltime)
+
+    def build_change_time():
+        return [builder.change_time(expr, c_mod, t, model) for t in times for expr in odes.values()]
+
+    def build_template():
+        templates = [ExpressionTemplate(expr, c_mod) for expr in odes.values()]
+        return [template.instantiate(model, t) for t in times for template in templates]
+
+    t_ref, out_ref = _time_function(build_change_time, repeats=1)
+    t_new, out_new = _time_function(build_template, repeats=1)
+
+    same = all(str(a) == str(b) for a, b in zip(out_ref, out_new))
+
+    timings = {'change_time': t_ref,
+               'template': t_new,
+               'speedup': t_ref/t_new,
+               'identical expressions': same,
+               }
+
+    _print_comparison(f'ODE construction: {n_species} species, {n_params} parameters, {n_times} times', timings)
+
+    return timings
+
+
+def benchmark_preprocessing(nt=1000, nl=1000, window_size=15, orderPoly=2, repeats=3, seed=0):
+    """Compares the row by row and the vectorized spectral preprocessing
+    (Savitzky-Golay, SNV, and MSC)
+
+    Args:
+        nt (int): number of times
+
+        nl (int): number of wavelengths
+
+        window_size (int): Savitzky-Golay window
+
+        orderPoly (int): Savitzky-Golay polynomial order
+
+        repeats (int): number of timing repeats (best is reported)
+
+        seed (int): random seed for the noise
+
+    Returns:
+        timings (dict): wall times [s] and the largest relative differences
+
+    """
+    from kipet.top_level.spectral_handler import (
+        msc_array,
+        savitzky_golay_array,
+        savitzky_golay_coefficients,
+        snv_array,
+        )
+
+    D, C, S = generate_synthetic_spectra(nt, nl, seed)
+    D = D + np.random.default_rng(seed).normal(scale=1e-3, size=D.shape)
+    reference = D.mean(axis=0)
+
+    comparisons = []
+    for orderDeriv in range(min(orderPoly, 2) + 1):
+        coefficients = savitzky_golay_coefficients(window_size, orderPoly, orderDeriv)
+        comparisons.append((f'SG (deriv {orderDeriv})',
+                            lambda D, d=orderDeriv: _savitzky_golay_loop(D, window_size, orderPoly, d),
+                            lambda D, c=coefficients, d=orderDeriv: savitzky_golay_array(D, c, clip_negatives=d == 0)))
+    comparisons.append(('SNV', _snv_loop, lambda D: snv_array(np.array(D))))
+    comparisons.append(('MSC', lambda D: _msc_loop(D, reference), lambda D: msc_array(np.array(D), reference)))
+
+    timings = {}
+    for name, reference_func, vectorized in comparisons:
+        t_ref, out_ref = _time_function(reference_func, D, repeats=repeats)
+        t_vec, out_vec = _time_function(vectorized, D, repeats=repeats)
+
+        timings[f'{name} loop'] = t_ref
+        timings[f'{name} vectorized'] = t_vec
+        timings[f'{name} max rel diff'] = np.max(np.abs(out_ref - out_vec))/max(np.max(np.abs(out_ref)), 1e-300)
+
+    _print_comparison(f'Spectral preprocessing: {nt} times x {nl} wavelengths', timings)
+
+    return timings
+
+
+def write_synthetic_spectral_files(directory, nt=300, nl=500, seed=0):
+    """Writes a triplet txt file and an instrument csv file (timestamps on
+    the columns) of synthetic spectra for the reader benchmark
+
+    Args:
+        directory (str): where the files are written
+
+        nt (int): number of times
+
+        nl (int): number of wavelengths
+
+        seed (int): random seed for the absorbance profiles
+
+    Returns:
+        txt_file, csv_file (tuple): the file paths
+
+    """
+    from pathlib import Path
+    import pandas as pd
+
+    D, C, S = generate_synthetic_spectra(nt, nl, seed)
+    times = np.round(np.linspace(0, 3600, nt), 3)
+    wavelengths = np.round(np.linspace(1610, 2200, nl), 3)
+
+    directory = Path(directory)
+    txt_file = directory.joinpath('synthetic_spectra.txt')
+    csv_file = directory.joinpath('synthetic_instrument.csv')
+
+    T, W = np.meshgrid(times, wavelengths, indexing='ij')
+    np.savetxt(txt_file, np.column_stack([T.ravel(), W.ravel(), D.ravel()]), fmt='%.6f %.3f %.12e')
+
+    h, rest = np.divmod(times, 3600)
+    m, s = np.divmod(rest, 60)
+    stamps = [f'{int(a):02d}:{int(b):02d}:{c:06.3f}' for a, b, c in zip(h, m, s)]
+    pd.DataFrame(D.T, index=wavelengths, columns=stamps).to_csv(csv_file)
+
+    return txt_file, csv_file
+
+
+def benchmark_spectral_readers(directory, nt=300, nl=500, chunk_size=None, seed=0):
+    """Compares the line by line and the columnar readers for triplet txt
+    files and instrument csv files
+
+    Args:
+        directory (str): where the generated files are written
+
+        nt (int): number of times
+
+        nl (int): number of wavelengths
+
+        chunk_size (int): lines parsed at once by the columnar readers
+
+        seed (int): random seed for the synthetic spectra
+
+    Returns:
+        timings (dict): wall times [s] and the largest absolute differences
+
+    """
+    from kipet.common.read_write_tools import read_file, read_spectral_data_from_csv
+
+    txt_file, csv_file = write_synthetic_spectral_files(directory, nt, nl, seed)
+
+    comparisons = [
+        ('txt', txt_file, _read_triplets_loop, lambda f: read_file(f, chunk_size=chunk_size)),
+        ('txt float32', txt_file, _read_triplets_loop, lambda f: read_file(f, dtype=np.float32, chunk_size=chunk_size)),
+        ('instrument csv', csv_file, _read_instrument_loop, lambda f: read_spectral_data_from_csv(f, instrument=True, chunk_size=chunk_size)),
+        ]
+
+    timings = {}
+    for name, filename, reference, columnar in comparisons:
+        t_ref, out_ref = _time_function(reference, filename, repeats=1)
+        t_new, out_new = _time_function(columnar, filename, repeats=1)
+
+        timings[f'{name} loop'] = t_ref
+        timings[f'{name} columnar'] = t_new
+        timings[f'{name} max diff'] = np.max(np.abs(out_ref.values - out_new.values))
+
+    _print_comparison(f'Spectral file readers: {nt} times x {nl} wavelengths', timings)
+
+    return timings
+
+
+def _make_kkt_system(n_states, n_params, bandwidth=6, seed=0):
+    """Builds a sparse square constraint Jacobian (banded, as from a
+    discretized DAE), the parameter columns, and a sparse Hessian
+
+    """
+    from scipy.sparse import diags
+
+    rng = np.random.default_rng(seed)
+    n = n_states + n_params
+
+    offsets = list(range(-bandwidth, bandwidth + 1))
+    L = diags([rng.uniform(2*bandwidth, 3*bandwidth, n_states) if k == 0 else rng.uniform(-1, 1, n_states - abs(k)) for k in offsets],
+              offsets, format='csc')
+    F = coo_matrix((rng.uniform(-1, 1, n_states), (np.arange(n_states), rng.integers(0, n_params, n_states))),
+                   shape=(n_states, n_params)).tocsr()
+
+    rows = rng.integers(0, n, 3*n)
+    cols = rng.integers(0, n, 3*n)
+    H = coo_matrix((rng.uniform(-1, 1, 3*n), (rows, cols)), shape=(n, n))
+    H = H + H.T + diags(rng.uniform(1, 2, n))
+    col_ind = sorted(rng.choice(n, n_params, replace=False).tolist())
+
+    return F, L, H.tocsr(), col_ind
+
+
+def benchmark_reduced_hessian(n_states=20000, n_params=10, repeats=3, seed=0):
+    """Compares the reduced Hessian from a dense Z (spsolve for each call)
+    with the cached sparse LU version in ReducedHessian
+
+    Args:
+        n_states (int): number of variables that are not parameters
+
+        n_params (int): number of parameters
+
+        repeats (int): number of repeated calls (NSD/estimability loops)
+
+        seed (int): random seed for the KKT system
+
+    Returns:
+        timings (dict): wall times [s] and the largest relative difference
+
+    """
+    from kipet.common.ReducedHessian import ReducedHessian, lu_factor_cache
+
+    F, L, H, col_ind = _make_kkt_system(n_states, n_params, seed=seed)
+    lu_factor_cache.clear()
+
+    t_ref, out_ref = _time_function(_reduced_hessian_dense_Z, F, L, H, col_ind, repeats=repeats)
+    t_first, out_new = _time_function(ReducedHessian._reduced_hessian_matrix, F, L, H, col_ind, False, repeats=1)
+    t_cached, out_new = _time_function(ReducedHessian._reduced_hessian_matrix, F, L, H, col_ind, False, repeats=repeats)
+
+    L_new = L.copy()
+    L_new.data = L_new.data*1.01
+    t_pattern, _ = _time_function(ReducedHessian._reduced_hessian_matrix, F, L_new, H, col_ind, False, repeats=1)
+
+    ref = out_ref[0].toarray()
+    timings = {'dense Z': t_ref,
+               'sparse LU (first)': t_first,
+               'sparse LU (same KKT)': t_cached,
+               'sparse LU (same pattern)': t_pattern,
+               'max rel diff': np.max(np.abs(ref - out_new[0].toarray()))/np.max(np.abs(ref)),
+               }
+    timings.update({f'cache {k}': v for k, v in lu_factor_cache.stats().items()})
+
+    _print_comparison(f'Reduced Hessian: {n_states} states, {n_params} parameters', timings)
+
+    return timings
+
+
+def benchmark_model_snapshot(n_species=40, n_params=30, n_times=600, seed=0):
+    """Compares copying a model (deepcopy, as in EstimationPotential) with
+    taking and restoring a ModelState snapshot
+
+    Args:
+        n_species (int): number of species
+
+        n_params (int): number of parameters
+
+        n_times (int): number of time points
+
+        seed (int): random seed for the reaction network
+
+    Returns:
+        timings (dict): wall times [s]
+
+    """
+    import copy
+    from kipet.post_model_build.pyomo_model_tools import ModelState
+
+    model, c_mod, odes = _make_template_models(n_species, n_params, n_times, seed)
+
+    def snapshot_and_restore():
+        state = ModelState(model)
+        state.restore()
+
+    t_copy, _ = _time_function(copy.deepcopy, model, repeats=1)
+    t_snapshot, _ = _time_function(snapshot_and_restore, repeats=1)
+
+    timings = {'deepcopy': t_copy,
+               'snapshot + restore': t_snapshot,
+               'variables': len(model.Z) + len(model.P),
+               }
+
+    _print_comparison(f'Model copy: {n_species} species, {n_times} times', timings)
+
+    return timings
+
+
+def benchmark_import_time(repeats=3):
+    """Compares the time to import kipet in a fresh interpreter with the time
+    to import its required dependencies (pyomo, pandas, pint, and numpy)
+
+    Args:
+        repeats (int): number of fresh interpreters per measurement
+
+    Returns:
+        timings (dict): best wall times [s]
+
+    """
+    import subprocess
+    import sys
+
+    def import_time(statement):
+        code = f'import time; t0 = time.perf_counter(); {statement}; print(time.perf_counter() - t0)'
+        best = np.inf
+        for i in range(repeats):
+            output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+            best = min(best, float(output.stdout.strip().splitlines()[-1]))
+        return best
+
+    dependencies = 'import pyomo.environ, pandas, pint, numpy'
+    t_deps = import_time(dependencies)
+    t_kipet = import_time(f'{dependencies}; import kipet')
+
+    timings = {'dependencies': t_deps,
+               'dependencies + kipet': t_kipet,
+               'kipet': t_kipet - t_deps,
+               }
+
+    _print_comparison('Import time', timings)
+
+    return timings
+
+
+def benchmark_svd(nt=2000, nl=1500, k=10, noise=1e-4, repeats=1, seed=0):
+    """Compares the full SVD used previously for the PCA and rank diagnostics
+    with the truncated SVD methods in diagnostic_tools
+
+    Args:
+        nt (int): number of times
+
+        nl (int): number of wavelengths
+
+        k (int): number of singular values computed
+
+        noise (float): standard deviation of the noise added to the spectra
+
+        repeats (int): number of timing repeats
+
+        seed (int): random seed
+
+    Returns:
+        timings (dict): wall times [s] and the largest relative error in the
+            singular values of the absorbing species (the remaining k - 3
+            values are noise and are not resolved by the randomized method)
+
+    """
+    from kipet.common.diagnostic_tools import truncated_svd
+
+    D, C, S = generate_synthetic_spectra(nt, nl, seed)
+    D = D + noise*np.random.default_rng(seed).standard_normal(D.shape)
+
+    t_full, (U, s_full, V) = _time_function(np.linalg.svd, D, True, repeats=repeats)
+    timings = {'full': t_full}
+    nc = C.shape[1]
+
+    for method in ['economy', 'randomized', 'streaming']:
+        t, (U, s, V) = _time_function(lambda: truncated_svd(D, k, method=method, seed=seed), repeats=repeats)
+        timings[method] = t
+        timings[f'{method} error'] = np.max(np.abs(s[:nc] - s_full[:nc])/s_full[:nc])
+
+    _print_comparison(f'SVD: {nt} x {nl}, k = {k}', timings)
+
+    return timings
+
+
+def benchmark_plot_size(nt=2000, nl=1500, max_points=20000, seed=0):
+    """Compares the size of the HTML written for a spectral surface plot with
+    all of the data, with the decimated data, and with the decimated data
+    written as binary arrays
+
+    Args:
+        nt (int): number of times
+
+        nl (int): number of wavelengths
+
+        max_points (int): the cell budget of the decimated surface
+
+        seed (int): random seed for the absorbance profiles
+
+    Returns:
+        sizes (dict): HTML sizes [MB] (without plotly.js) and times [s]
+
+    """
+    import pandas as pd
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    from kipet.visuals.decimation import decimate_frame, encode_figure
+
+    D, C, S = generate_synthetic_spectra(nt, nl, seed)
+    df = pd.DataFrame(D, index=np.linspace(0, 10, nt), columns=np.linspace(1610, 2200, nl))
+
+    def surface_html(data, binary=False):
+        fig = go.Figure(go.Surface(x=data.columns, y=data.index, z=data.values))
+        if binary:
+            return pio.to_html(encode_figure(fig), include_plotlyjs=False, validate=False)
+        return pio.to_html(fig, include_plotlyjs=False)
+
+    t_full, html_full = _time_function(surface_html, df, repeats=1)
+    t_dec, html_dec = _time_function(lambda: surface_html(decimate_frame(df, max_points)), repeats=1)
+    t_bin, html_bin = _time_function(lambda: surface_html(decimate_frame(df, max_points), True), repeats=1)
+
+    sizes = {'full [MB]': len(html_full)/1e6,
+             'decimated [MB]': len(html_dec)/1e6,
+             'decimated binary [MB]': len(html_bin)/1e6,
+             'full [s]': t_full,
+             'decimated [s]': t_dec,
+             'decimated binary [s]': t_bin,
+             }
+
+    _print_comparison(f'Surface plot: {nt} x {nl}, {max_points} cells', sizes)
+
+    return sizes
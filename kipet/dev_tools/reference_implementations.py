@@ -0,0 +1,174 @@
+"""
+Reference implementations
+
+The original (loop based) implementations that were replaced by faster
+versions in KIPET. The tests check the new versions against these and
+kipet.dev_tools.benchmarks times both.
+"""
+# Third party imports
+import numpy as np
+from scipy.sparse import coo_matrix
+
+
+def _s_residual_loop(x, z_array, d_array, nl, nt, nc):
+    """Reference implementation of the S residuals"""
+
+    diff = np.zeros(nt*nl)
+    for i in range(nt):
+        for j in range(nl):
+            diff[i*nl+j] = d_array[i, j]-sum(z_array[i*nc+k]*x[j*nc+k] for k in range(nc))
+    return diff
+
+
+def _s_jacobian_loop(x, z_array, d_array, nl, nt, nc):
+    """Reference implementation of the S residual Jacobian"""
+
+    row = []
+    col = []
+    data = []
+    for i in range(nt):
+        for j in range(nl):
+            for k in range(nc):
+                row.append(i*nl+j)
+                col.append(j*nc+k)
+                data.append(-z_array[i*nc+k])
+    return coo_matrix((data, (row, col)),
+                      shape=(nt*nl, nc*nl))
+
+
+def _c_residual_loop(x, s_array, d_array, nl, nt, nc):
+    """Reference implementation of the C residuals"""
+
+    diff = np.zeros(nt*nl)
+    for i in range(nt):
+        for j in range(nl):
+            diff[i*nl+j] = d_array[i, j]-sum(s_array[j*nc+k]*x[i*nc+k] for k in range(nc))
+    return diff
+
+
+def _c_jacobian_loop(x, s_array, d_array, nl, nt, nc):
+    """Reference implementation of the C residual Jacobian"""
+
+    row = []
+    col = []
+    data = []
+    for i in range(nt):
+        for j in range(nl):
+            for k in range(nc):
+                row.append(i*nl+j)
+                col.append(i*nc+k)
+                data.append(-s_array[j*nc+k])
+    return coo_matrix((data, (row, col)),
+                      shape=(nt*nl, nc*nt))
+
+
+def _savitzky_golay_loop(D, window_size, orderPoly, orderDeriv=0):
+    """Reference (row by row) implementation of the Savitzky-Golay filter"""
+
+    half_window = (window_size - 1) // 2
+    b = np.array([[k**i for i in range(orderPoly + 1)] for k in range(-half_window, half_window + 1)], dtype=float)
+    m = np.linalg.pinv(b)[orderDeriv]
+    no_noise = np.array(D, dtype=float)
+    for t in range(D.shape[0]):
+        row = D[t]
+        firstvals = row[0] - np.abs(row[1:half_window + 1][::-1] - row[0])
+        lastvals = row[-1] + np.abs(row[-half_window - 1:-1][::-1] - row[-1])
+        y = np.concatenate((firstvals, row, lastvals))
+        no_noise[t] = np.convolve(m, y, mode='valid')
+
+    if orderDeriv == 0:
+        no_noise[no_noise < 0] = 0
+
+    return no_noise
+
+
+def _snv_loop(D, offset=0):
+    """Reference (row by row) implementation of the SNV filter"""
+
+    snv_proc = np.array(D, dtype=float)
+    nl = D.shape[1]
+    for t in range(D.shape[0]):
+        mean_spectra = D[t].sum()/nl
+        std = ((mean_spectra - D[t])**2).sum()
+        snv_proc[t] = (D[t] - mean_spectra)*(std/(nl - 1))**0.5
+        if offset != 0:
+            snv_proc[t] += 1/offset
+
+    return snv_proc
+
+
+def _msc_loop(D, reference):
+    """Reference (row by row) implementation of the MSC filter"""
+
+    msc_proc = np.array(D, dtype=float)
+    for t in range(D.shape[0]):
+        fit = np.polyfit(reference, D[t], 1, full=True)
+        msc_proc[t] = (D[t] - fit[0][1])/fit[0][0]
+
+    return msc_proc
+
+
+def _read_triplets_loop(filename):
+    """Reference (line by line) reader for triplet txt files"""
+
+    from kipet.common.read_write_tools import dict_to_df, is_float_re
+
+    data_dict = {}
+    with open(filename, 'r') as f:
+        for line in f:
+            if line not in ['', '\n', '\t', '\t\n']:
+                l = line.split()
+                if is_float_re(l[1]):
+                    l[1] = float(l[1])
+                data_dict[float(l[0]), l[1]] = float(l[2])
+
+    df_data = dict_to_df(data_dict)
+    df_data.sort_index(ascending=True, inplace=True)
+    return df_data
+
+
+def _read_instrument_loop(filename):
+    """Reference reader for instrument csv files (renames one time at a time)"""
+
+    import pandas as pd
+
+    data = pd.read_csv(filename, index_col=0, parse_dates=True)
+    data = data.T
+    for n in data.index:
+        h, m, s = n.split(':')
+        sec = (float(h)*60 + float(m))*60 + float(s)
+        data.rename(index={n: sec}, inplace=True)
+    data.index = [float(n) for n in data.index]
+    return data
+
+
+def _reduced_hessian_dense_Z(F, L, H, col_ind):
+    """Reference reduced Hessian (spsolve and a dense Z copied into sparse
+    Z and Z^T matrices)
+
+    """
+    from scipy.sparse import csc_matrix
+    from scipy.sparse.linalg import spsolve
+
+    n = H.shape[0]
+    n_free = n - F.shape[0]
+
+    X = spsolve(L.tocsc(), -F.tocsc())
+
+    col_ind_left = list(set(range(n)).difference(set(col_ind)))
+    col_ind_left.sort()
+
+    Z = np.zeros([n, n_free])
+    Z[col_ind, :] = np.eye(n_free)
+
+    if isinstance(X, csc_matrix):
+        Z[col_ind_left, :] = X.todense()
+    else:
+        Z[col_ind_left, :] = X.reshape(-1, 1)
+
+    Z_mat = coo_matrix(np.mat(Z)).tocsr()
+    Z_mat_T = coo_matrix(np.mat(Z).T).tocsr()
+    Hess = H.tocsr()
+    reduced_hessian = Z_mat_T * Hess * Z_mat
+
+    return reduced_hessian, Z_mat
@@ -8,14 +8,18 @@ import collections
 import os
 import pathlib
 import sys
+import time
 
 # Third party imports
 import pandas as pd
 
 # Kipet library imports
 import kipet.core_methods.data_tools as data_tools
-from kipet.core_methods.MEE import MultipleExperimentsEstimator
-from kipet.nsd_funs.NSD_KIPET import NSD
+from kipet.common.parallel import (
+    get_worker_state,
+    resolve_workers,
+    WorkerPool,
+    )
 from kipet.top_level.reaction_model import (
     ReactionModel,
     _set_directory,
@@ -294,17 +298,23 @@ class KipetModel():
             
     def run_opt(self, *args, **kwargs):
         """Solve a single model or solve multiple models using the MEE
+        
+        The keyword argument workers sets the number of processes used to fit
+        the individual models (and the NSD scenarios).
         """
         method = kwargs.get('method', 'mee')
         
         if len(self.models) > 1:
             if method == 'mee':
-                self._calculate_parameters()
+                self._calculate_parameters(workers=kwargs.get('workers', 1))
                 self._create_multiple_experiments_estimator(*args, **kwargs)
                 self.run_full_model()
             elif method == 'nsd':
-                self._calculate_parameters()
-                self.mee_nsd(strategy='ipopt')
+                self._calculate_parameters(workers=kwargs.get('workers', 1))
+                self.mee_nsd(strategy='ipopt',
+                             workers=kwargs.get('workers', 1),
+                             kkt_method=kwargs.get('kkt_method', 'k_aug'),
+                             warm_start=kwargs.get('warm_start', False))
             else:
                 raise ValueError('Not a valid method for optimization')
             
@@ -319,6 +329,8 @@ class KipetModel():
         """A quick wrapper for MEE without big changes
         
         """
+        from kipet.core_methods.MEE import MultipleExperimentsEstimator
+        
         self.mee = MultipleExperimentsEstimator(self.models)
         self.mee.confidence_interval = self.settings.general.confidence
         
@@ -329,28 +341,54 @@ class KipetModel():
         
         self.mee.spectra_problem = self.settings.general.spectra_problem
         
-    def _calculate_parameters(self):
+    def _calculate_parameters(self, workers=1):
         """Uses the ReactionModel framework to calculate parameters instead of 
         repeating this in the MEE
         
+        The individual fits are independent and can be solved concurrently by
+        a process pool. Each worker fits its own copy of the model and the
+        results are loaded back into the ReactionModels. The wall time of each
+        fit is kept in fit_times and in results.solver_statistics['fit_time'].
+        
+        Args:
+            workers (int): number of processes used for the individual fits
+                (1 solves them sequentially, None uses all CPUs)
+        
+        Returns:
+            None
+        
         """
+        to_fit = []
         for name, model in self.models.items():
             if not model.optimized:
-                # Do this for each model separately...
-                # for dataset in model.datasets:
-                #     if self.settings.general.freq_wavelength_subset is not None:
-                #         if model.datasets[dataset.name].category == 'spectral':
-                #             freq = self.settings.general.freq_wavelength_subset
-                #             model.datasets[dataset.name].data = decrease_wavelengths(dataset.data, freq)
-                
-                # if not self.use_individual_settings:
-                    
-                #     model.settings.update(**self.settings)
-                
-                model.run_opt()
+                to_fit.append(name)
             else:
                 print(f'Model {name} has already been optimized')
                 
+        self.fit_times = {}
+        workers = resolve_workers(workers, len(to_fit))
+        
+        if workers > 1:
+            print(f'Fitting {len(to_fit)} models using {workers} workers')
+            with WorkerPool(workers, shared={'models': self.models}) as pool:
+                fits = pool.map(_fit_reaction_model, to_fit)
+            
+            for name, (state, wall_time) in zip(to_fit, fits):
+                self.models[name]._load_fit_state(state)
+                self.fit_times[name] = wall_time
+        
+        else:
+            for name in to_fit:
+                start = time.perf_counter()
+                self.models[name].run_opt()
+                self.fit_times[name] = time.perf_counter() - start
+                
+        for name, wall_time in self.fit_times.items():
+            results = getattr(self.models[name], 'results', None)
+            if results is not None:
+                results.solver_statistics['fit_time'] = wall_time
+            print(f'Model {name} fitted in {wall_time:.2f} s')
+                
         return None
     
     def run_full_model(self):
@@ -369,19 +407,30 @@ class KipetModel():
             
         return results
     
-    def mee_nsd(self, strategy='ipopt'):
+    def mee_nsd(self, strategy='ipopt', workers=1, kkt_method='k_aug', warm_start=False):
         """Performs the NSD on the multiple datasets
         
         Args:
             strategy (str): Method used to control the outer problem
                 ipopt, trust-region, newton-step
                 
+            workers (int): number of processes used to solve the scenarios
+                (1 solves them sequentially, None uses all CPUs)
+                
+            kkt_method (str): k_aug (solver files) or pynumero (in memory)
+                
+            warm_start (bool): restart each scenario solve from the
+                multipliers of its last solve
+                
         Returns:
             results
         
         """        
         kwargs = {'kipet': True,
-                  'objective_multiplier': 1
+                  'objective_multiplier': 1,
+                  'workers': workers,
+                  'kkt_method': kkt_method,
+                  'warm_start': warm_start,
                   }
         
         if self.global_parameters is not None:
@@ -389,6 +438,8 @@ class KipetModel():
         else:
             global_parameters = self.all_params
         
+        from kipet.nsd_funs.NSD_KIPET import NSD
+        
         self.nsd = NSD(self.models,
                        strategy=strategy,
                        global_parameters=global_parameters, 
@@ -414,7 +465,8 @@ class KipetModel():
             
             directory (str): absolute directory to use instead
             
-            filetype (str): the filetype to be used (in case not in file name)
+            filetype (str): the filetype to be used (csv, txt, npz) in case it
+                is not in the file name
         
         Returns:
             None
@@ -429,7 +481,7 @@ class KipetModel():
         #     _filename.parent.mkdir(exist_ok=True)
         calling_file_name = os.path.dirname(os.path.realpath(sys.argv[0]))
         _filename = pathlib.Path(calling_file_name).joinpath(_filename)
-        data_tools.write_file(_filename, data)
+        data_tools.write_file(_filename, data, filetype=filetype)
         
         return None
         
@@ -528,4 +580,22 @@ class KipetModel():
     
     
     
-    
\ No newline at end of file
+    
+
+
+def _fit_reaction_model(name):
+    """Runs run_opt for one ReactionModel in a worker process
+
+    Args:
+        name (str): name of the model in the shared models dict
+
+    Returns:
+        tuple: the picklable fit state and the wall time of the fit
+
+    """
+    model = get_worker_state()['models'][name]
+    start = time.perf_counter()
+    model.run_opt()
+    wall_time = time.perf_counter() - start
+
+    return model._get_fit_state(), wall_time
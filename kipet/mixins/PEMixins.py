@@ -7,6 +7,7 @@ from pyomo.environ import (
     )
 
 from kipet.common.read_hessian import *
+from kipet.common.warm_start import add_warm_start_suffixes as _add_warm_start_suffixes
 
 class PEMixins(object):
 
@@ -94,26 +95,22 @@ class PEMixins(object):
     def _variances_p_calc(self, hessian, variances):
         """Computes the covariance for post calculation anaylsis
         
+        V_theta = (H B) Vd (H B)^T is formed from the structured B and Vd
+        operators (see kipet.common.spectral_covariance) without building
+        the dense matrices.
+        
         """        
         print(f'Var: {variances}')
         
-        
-        
         nparams = self._n_params
 
         H = hessian[-nparams:, :]
- 
-        B = self._compute_B_matrix(variances)
-        Vd = self._compute_Vd_matrix(variances)
+        operators = self._spectral_covariance(variances)
         
-        print(f'B: {B.shape}')
         print(f'H: {H.shape}')
-        print(f'Vd: {Vd.shape}')
+        print(f'nd: {operators.nd}')
         
-        R = B.T @ H.T
-        A = Vd @ R
-        L = H @ B
-        V_theta = (A.T @ L.T).T
+        V_theta = operators.covariance(H)
         variances_p = np.diag(V_theta)
         
         if hasattr(self, '_eigredhess2file') and self._eigredhess2file==True:
@@ -123,20 +120,17 @@ class PEMixins(object):
 
     @staticmethod
     def add_warm_start_suffixes(model, use_k_aug=False):
-        """Adds suffixed variables to problem"""
+        """Adds suffixed variables to problem (existing suffixes, and the
+        multipliers they hold, are kept)"""
         
-        # Ipopt bound multipliers (obtained from solution)
-        model.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
-        model.ipopt_zU_out = Suffix(direction=Suffix.IMPORT)
-        # Ipopt bound multipliers (sent to solver)
-        model.ipopt_zL_in = Suffix(direction=Suffix.EXPORT)
-        model.ipopt_zU_in = Suffix(direction=Suffix.EXPORT)
-        # Obtain dual solutions from first solve and send to warm start
-        model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+        # Ipopt bound multipliers (in and out) and the duals
+        _add_warm_start_suffixes(model)
         
         if use_k_aug:
-            model.dof_v = Suffix(direction=Suffix.EXPORT)
-            model.rh_name = Suffix(direction=Suffix.IMPORT)
+            if not hasattr(model, 'dof_v'):
+                model.dof_v = Suffix(direction=Suffix.EXPORT)
+            if not hasattr(model, 'rh_name'):
+                model.rh_name = Suffix(direction=Suffix.IMPORT)
             
         return None
             
@@ -14,10 +14,10 @@ class WavelengthSelectionMixins():
     
     """Wrapper class mixin of wavelength subset selection methods for KipetModel"""
     
-    def lack_of_fit(self):
+    def lack_of_fit(self, return_maps=False):
         """Wrapper for ParameterEstimator lack_of_fit method"""
     
-        lof = self.p_estimator.lack_of_fit()
+        lof = self.p_estimator.lack_of_fit(return_maps=return_maps)
         return lof
         
     def wavelength_correlation(self, corr_plot=False):
@@ -54,9 +54,8 @@ class WavelengthSelectionMixins():
         ncp = self.settings.collocation.ncp
         sigmas = self.settings.parameter_estimator.variances
         
-        self.p_estimator.run_lof_analysis(builder_before_data, end_time, correlations, lof, nfe, ncp, sigmas, **kwargs)
-    
-        # Make a dict for the results - why is this not the case?
+        results = self.p_estimator.run_lof_analysis(builder_before_data, end_time, correlations, lof, nfe, ncp, sigmas, **kwargs)
+        return results
     
     def wavelength_subset_selection(self, n=0):
         """Wrapper for wavelength_subset_selection method in ParameterEstimator"""
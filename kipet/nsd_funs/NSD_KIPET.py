@@ -51,6 +51,11 @@ from kipet.common.objectives import (
     conc_objective,
     comp_objective,
     )
+from kipet.common.parallel import (
+    WorkerPool,
+    get_worker_state,
+    resolve_workers,
+    )
 from kipet.core_methods.ParameterEstimator import ParameterEstimator
 from kipet.common.ReducedHessian import ReducedHessian
 from kipet.core_methods.ResultsObject import ResultsObject        
@@ -73,6 +78,11 @@ class NSD():
         self.scaled = kwargs.get('scaled', False)
         self.global_parameters = global_parameters
         self.isKipetModel = kwargs.get('kipet', True)
+        self.workers = kwargs.get('workers', 1)
+        self.kkt_method = kwargs.get('kkt_method', 'k_aug')
+        self.warm_start = kwargs.get('warm_start', False)
+        self._pool = None
+        self._scenario_cache = None
         
         self.reduced_hessian_kwargs = {}
         
@@ -253,7 +263,7 @@ class NSD():
         return bounds
     
     @staticmethod
-    def objective_function(x, scenarios, parameter_names):
+    def objective_function(x, scenarios, parameter_names, kkt_method='k_aug', warm_start=False):
         """Inner problem calculation for the NSD
         
         Args:
@@ -263,6 +273,10 @@ class NSD():
             
             parameter_names (list): list of global parameters
             
+            kkt_method (str): k_aug or pynumero (in memory, no solver files)
+            
+            warm_start (bool): restart the solves from the last multipliers
+            
         Returns:
             
             objective_value (float): sum of sub-problem objectives
@@ -279,7 +293,7 @@ class NSD():
         objective_value = 0
         for i, model in enumerate(scenarios):
             
-            rh = ReducedHessian(model, file_number=i)
+            rh = ReducedHessian(model, kkt_method=kkt_method, file_number=i, warm_start=warm_start)
             rh.parameter_set = parameter_names
             rh.optimize_model(d=x)
             objective_value += model.objective.expr()
@@ -290,7 +304,7 @@ class NSD():
         return objective_value
     
     @staticmethod
-    def calculate_m(x, scenarios, parameter_names):
+    def calculate_m(x, scenarios, parameter_names, kkt_method='k_aug', warm_start=False):
         """Calculate the vector of duals for the NSD
         
         Args:
@@ -300,6 +314,10 @@ class NSD():
             
             parameter_names (list): list of global parameters
             
+            kkt_method (str): k_aug or pynumero (in memory, no solver files)
+            
+            warm_start (bool): restart the solves from the last multipliers
+            
         Returns:
             
             m (np.array): vector of duals
@@ -314,9 +332,10 @@ class NSD():
         
         kwargs = {
             'param_con_method': 'global',
-            'kkt_method': 'k_aug',
+            'kkt_method': kkt_method,
             'set_param_bounds': False,
             'param_set_name': 'parameter_names',
+            'warm_start': warm_start,
             }
         
         for i, model_opt in enumerate(scenarios):
@@ -343,7 +362,7 @@ class NSD():
         return m
     
     @staticmethod
-    def calculate_M(x, scenarios, parameter_names):
+    def calculate_M(x, scenarios, parameter_names, kkt_method='k_aug', warm_start=False):
         """Calculate the sum of reduced Hessians for the NSD
         
         Args:
@@ -353,6 +372,10 @@ class NSD():
             
             parameter_names (list): list of global parameters
             
+            kkt_method (str): k_aug or pynumero (in memory, no solver files)
+            
+            warm_start (bool): restart the solves from the last multipliers
+            
         Returns:
             
             M (np.array): sum of reduced Hessians
@@ -367,7 +390,7 @@ class NSD():
             
         for i, model in enumerate(scenarios):
             
-            rh = ReducedHessian(model, file_number=i)
+            rh = ReducedHessian(model, kkt_method=kkt_method, file_number=i)
             rh.parameter_set = parameter_names
             reduced_hessian = rh.calculate_reduced_hessian()
             
@@ -402,7 +425,114 @@ class NSD():
             M (np.array): sum of reduced Hessians
         """
         return np.zeros((len(x), 1))
-       
+
+    def _start_pool(self):
+        """Starts the process pool used to solve the scenarios concurrently.
+        This needs to be called after the models are prepared since the
+        workers receive a copy of the scenarios when the pool is created.
+
+        Returns:
+            None
+
+        """
+        workers = resolve_workers(self.workers, len(self.model_list))
+        self._scenario_cache = None
+
+        if workers > 1:
+            self._pool = WorkerPool(workers, shared={'scenarios': self.model_list})
+            print(f'Solving {len(self.model_list)} scenarios using {workers} workers')
+
+        return None
+
+    def _stop_pool(self):
+        """Closes the process pool, if any
+
+        Returns:
+            None
+
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        self._scenario_cache = None
+
+        return None
+
+    def _scenario_functions(self):
+        """Returns the functions for the objective, the duals, and the reduced
+        Hessians depending on the execution mode
+
+        Returns:
+            functions (tuple): objective, m, M functions
+
+        """
+        if self._pool is None:
+            return self.objective_function, self.calculate_m, self.calculate_M
+
+        return self._parallel_objective_function, self._parallel_m, self._parallel_M
+
+    def _evaluate_scenarios(self, x, derivatives=False):
+        """Solves all scenarios at x using the process pool and aggregates the
+        results in scenario order. The last evaluation is cached since the
+        outer solver requests the objective, m, and M at the same point.
+
+        Args:
+            x (np.array): array of parameter values
+
+            derivatives (bool): also calculate the duals and reduced Hessians
+
+        Returns:
+            evaluation (dict): objective, m, and M for the point x
+
+        """
+        key = tuple(float(v) for v in np.asarray(x).flatten())
+        cached = self._scenario_cache
+
+        if cached is not None and cached['x'] == key and (cached['derivatives'] or not derivatives):
+            return cached
+
+        for i, p in enumerate(self.parameter_names):
+            print(f'{p} = {key[i]:0.12f}')
+
+        tasks = [(i, key, self.parameter_names, derivatives, self.kkt_method, self.warm_start) for i in range(len(self.model_list))]
+        outputs = self._pool.map(_solve_scenario, tasks)
+
+        M_size = len(self.parameter_names)
+        evaluation = {
+            'x': key,
+            'derivatives': derivatives,
+            'objective': 0,
+            'm': np.zeros(M_size),
+            'M': np.zeros((M_size, M_size)),
+            }
+
+        for output in outputs:
+            evaluation['objective'] += output['objective']
+            if derivatives:
+                for i, param in enumerate(self.parameter_names):
+                    if param in output['duals']:
+                        evaluation['m'][i] += output['duals'][param]
+                evaluation['M'] += output['reduced_hessian']
+
+        self._scenario_cache = evaluation
+
+        return evaluation
+
+    def _parallel_objective_function(self, x, scenarios, parameter_names, kkt_method='k_aug', warm_start=False):
+        """Parallel version of objective_function"""
+
+        return self._evaluate_scenarios(x)['objective']
+
+    def _parallel_m(self, x, scenarios, parameter_names, kkt_method='k_aug', warm_start=False):
+        """Parallel version of calculate_m"""
+
+        return self._evaluate_scenarios(x, derivatives=True)['m']
+
+    def _parallel_M(self, x, scenarios, parameter_names, kkt_method='k_aug', warm_start=False):
+        """Parallel version of calculate_M"""
+
+        return self._evaluate_scenarios(x, derivatives=True)['M']
+
     def ipopt_method(self, scaled=False, callback=None, options=None, **kwargs):
         """ Minimization of scalar function of one or more variables with
             constraints
@@ -444,12 +574,17 @@ class NSD():
         kwargs = {
                 'scenarios': self.model_list,
                 'parameter_names': self.parameter_names,
-                'parameter_number': len(d_vals)
+                'parameter_number': len(d_vals),
+                'kkt_method': self.kkt_method,
+                'warm_start': self.warm_start,
                  }
     
-        problem_object = Optproblem(objective=self.objective_function,
-                                    hessian=self.calculate_M,
-                                    gradient=self.calculate_m,
+        self._start_pool()
+        objective_function, calculate_m, calculate_M = self._scenario_functions()
+    
+        problem_object = Optproblem(objective=objective_function,
+                                    hessian=calculate_M,
+                                    gradient=calculate_m,
                                     jacobian=self.calculate_grad,
                                     kwargs=kwargs,
                                     callback=callback)
@@ -482,7 +617,14 @@ class NSD():
                 nlp.addOption(key, value)
         
         
-        x, results = nlp.solve(d_vals)
+        try:
+            x, results = nlp.solve(d_vals)
+        finally:
+            self._stop_pool()
+        
+        # The workers hold their own copies of the scenarios
+        if resolve_workers(self.workers, len(self.model_list)) > 1:
+            self.objective_function(x, self.model_list, self.parameter_names, self.kkt_method, self.warm_start)
         
         # Prepare parameter results
         # print(d_init_unscaled)
@@ -536,16 +678,26 @@ class NSD():
                 #'xtol': 1e-6,
                 }
             
-            results = minimize(self.objective_function, 
-                                d_vals,
-                                args=(self.model_list, self.parameter_names), 
-                                method=self.method,
-                                jac=self.calculate_m,
-                                hess=self.calculate_M,
-                                callback=callback,
-                                bounds=self._generate_bounds_object(),
-                                options=tr_options,
-                            )
+            self._start_pool()
+            objective_function, calculate_m, calculate_M = self._scenario_functions()
+            
+            try:
+                results = minimize(objective_function, 
+                                    d_vals,
+                                    args=(self.model_list, self.parameter_names, self.kkt_method, self.warm_start), 
+                                    method=self.method,
+                                    jac=calculate_m,
+                                    hess=calculate_M,
+                                    callback=callback,
+                                    bounds=self._generate_bounds_object(),
+                                    options=tr_options,
+                                )
+            finally:
+                self._stop_pool()
+            
+            # The workers hold their own copies of the scenarios
+            if resolve_workers(self.workers, len(self.model_list)) > 1:
+                self.objective_function(results.x, self.model_list, self.parameter_names, self.kkt_method, self.warm_start)
             
             # Prepare parameter results
             if scaled:
@@ -587,6 +739,7 @@ class NSD():
                                     d_vals,
                                     self.model_list, 
                                     self.parameter_names,
+                                    warm_start=self.warm_start,
                                     )
            
             # Get the M matrices to determine search direction
@@ -686,6 +839,58 @@ class NSD():
         
         return None
             
+def _solve_scenario(task):
+    """Solves a single NSD scenario inside a worker process
+    
+    The worker keeps track of the point at which each of its scenario copies
+    was last solved so that the duals and reduced Hessian are only calculated
+    from a model solved at the requested point.
+    
+    Args:
+        task (tuple): scenario index, parameter values, parameter names,
+            whether the duals and reduced Hessian are needed, the KKT method,
+            and whether the solves are warm started
+            
+    Returns:
+        output (dict): objective, duals, and reduced Hessian of the scenario
+    
+    """
+    i, x, parameter_names, derivatives, kkt_method, warm_start = task
+    
+    state = get_worker_state()
+    model = state['scenarios'][i]
+    solved_at = state.setdefault('solved_at', {})
+    
+    if solved_at.get(i) != x:
+        rh = ReducedHessian(model, kkt_method=kkt_method, file_number=i, warm_start=warm_start)
+        rh.parameter_set = parameter_names
+        rh.optimize_model(d=np.array(x))
+        solved_at[i] = x
+    
+    output = {'objective': model.objective.expr()}
+    
+    if derivatives:
+        kwargs = {
+            'param_con_method': 'global',
+            'kkt_method': kkt_method,
+            'set_param_bounds': False,
+            'param_set_name': 'parameter_names',
+            }
+        
+        rh = ReducedHessian(model, file_number=i, **kwargs)
+        rh.parameter_set = parameter_names
+        output['duals'] = rh.calculate_duals()
+        
+        rh = ReducedHessian(model, kkt_method=kkt_method, file_number=i)
+        rh.parameter_set = parameter_names
+        output['reduced_hessian'] = np.asarray(rh.calculate_reduced_hessian())
+        
+        # The solver files are removed after the KKT data is read
+        if kkt_method == 'k_aug':
+            solved_at[i] = None
+    
+    return output
+
 class Optproblem(object):
     """Optimization problem
 
@@ -711,14 +916,20 @@ class Optproblem(object):
         scenarios = self.kwargs.get('scenarios', None)
         parameter_names = self.kwargs.get('parameter_names', None)
         
-        return self.fun(x, scenarios, parameter_names)
+        kkt_method = self.kwargs.get('kkt_method', 'k_aug')
+        warm_start = self.kwargs.get('warm_start', False)
+        
+        return self.fun(x, scenarios, parameter_names, kkt_method, warm_start)
     
     def gradient(self, x):
         
         scenarios = self.kwargs.get('scenarios', None)
         parameter_names = self.kwargs.get('parameter_names', None)
         
-        return self.grad(x, scenarios, parameter_names)
+        kkt_method = self.kwargs.get('kkt_method', 'k_aug')
+        warm_start = self.kwargs.get('warm_start', False)
+        
+        return self.grad(x, scenarios, parameter_names, kkt_method, warm_start)
 
     def constraints(self, x):
         """The problem is unconstrained in the outer problem excluding
@@ -746,7 +957,9 @@ class Optproblem(object):
         
         scenarios = self.kwargs.get('scenarios', None)
         parameter_names = self.kwargs.get('parameter_names', None)
-        H = self.hess(x, scenarios, parameter_names)
+        kkt_method = self.kwargs.get('kkt_method', 'k_aug')
+        warm_start = self.kwargs.get('warm_start', False)
+        H = self.hess(x, scenarios, parameter_names, kkt_method, warm_start)
         
         return H[hs.row, hs.col]
 
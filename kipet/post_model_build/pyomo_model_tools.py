@@ -1,11 +1,16 @@
 """
 Model tools
 """
+# Standard library imports
+import time
+
 # Third party imports
+import numpy as np
 from pyomo.core.base.var import Var
 from pyomo.core.base.param import Param
 from pyomo.core.base.set import BoundsInitializer
 from pyomo.core.base.set import SetProduct
+from pyomo.core.base.suffix import Suffix
 from pyomo.dae.contset import ContinuousSet
 from pyomo.dae.diffvar import DerivativeVar
 
@@ -122,4 +127,130 @@ def change_continuous_set(cs, new_bounds):
             cs.add(bnd)
     cs._fe = sorted(cs)
     
-    return None
\ No newline at end of file
+    return None
+
+
+class VarArrayBridge():
+    
+    """Maps a two dimensional indexed Pyomo variable onto a numpy array
+    
+    The variable data objects are collected once in row-major order so that
+    whole profiles can be moved between the model and numpy without looking
+    up each index again. The time spent moving data is recorded in
+    transfer_time.
+    
+    Args:
+        var (IndexedVar): the Pyomo variable (indexed by row, col)
+        
+        rows (list): the first index of the variable (e.g. times)
+        
+        cols (list): the second index of the variable (e.g. components)
+    
+    """
+    def __init__(self, var, rows, cols):
+        
+        self.rows = list(rows)
+        self.cols = list(cols)
+        self.shape = (len(self.rows), len(self.cols))
+        self._var_data = [var[r, c] for r in self.rows for c in self.cols]
+        self.transfer_time = 0
+        self.transfers = 0
+        
+    @classmethod
+    def from_var(cls, var):
+        """Creates the bridge using the full index sets of the variable"""
+        
+        index_sets = get_index_sets(var)
+        return cls(var, list(index_sets[0]), list(index_sets[1]))
+        
+    def __len__(self):
+        return len(self._var_data)
+        
+    def get_values(self, flat=False):
+        """Returns the variable values as an array (None is returned as nan)
+        
+        Args:
+            flat (bool): return a flat array instead of rows x cols
+            
+        Returns:
+            values (np.ndarray): the current values of the variable
+            
+        """
+        t0 = time.perf_counter()
+        values = np.array([v.value for v in self._var_data], dtype=float)
+        if not flat:
+            values = values.reshape(self.shape)
+        self._record(t0)
+        return values
+    
+    def set_values(self, values):
+        """Sets the variable values from an array with rows x cols entries
+        
+        Args:
+            values (array-like): the new values of the variable
+            
+        Returns:
+            None
+            
+        """
+        t0 = time.perf_counter()
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size != len(self._var_data):
+            raise ValueError(f'Expected {len(self._var_data)} values but got {values.size}')
+        for v, val in zip(self._var_data, values.tolist()):
+            v.value = val
+        self._record(t0)
+        return None
+    
+    def _record(self, t0):
+        
+        self.transfer_time += time.perf_counter() - t0
+        self.transfers += 1
+        return None
+
+
+class ModelState():
+    
+    """Snapshot of the state of a model that a solve (and the set up for it)
+    changes: the variable values, bounds and fixed flags, the suffix values,
+    and the top level components. restore() puts the model back in this state,
+    which replaces making a deepcopy of the model before changing it.
+    
+    Args:
+        model (ConcreteModel): the model
+    
+    """
+    def __init__(self, model):
+        
+        self.model = model
+        self.components = set(model.component_map().keys())
+        self.var_state = [(v, v.value, v.lb, v.ub, v.fixed)
+                          for var in model.component_objects(Var) 
+                          for v in var.values()]
+        self.suffix_state = {name: dict(suffix.items()) 
+                             for name, suffix in model.component_map(Suffix).items()}
+        
+    def restore(self):
+        """Removes the components added since the snapshot and resets the
+        variables and suffixes
+        
+        Returns:
+            None
+        
+        """
+        for name in reversed(list(self.model.component_map().keys())):
+            if name not in self.components:
+                self.model.del_component(name)
+        
+        for v, value, lb, ub, fixed in self.var_state:
+            v.value = value
+            v.setlb(lb)
+            v.setub(ub)
+            v.fixed = fixed
+            
+        for name, values in self.suffix_state.items():
+            suffix = getattr(self.model, name)
+            suffix.clear()
+            suffix.update(values)
+            
+        return None
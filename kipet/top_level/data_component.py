@@ -10,12 +10,14 @@ import os
 
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-from plotly import __version__
-from plotly.offline import download_plotlyjs, init_notebook_mode, plot, iplot
-
+from kipet.common.binary_io import BinaryStore, write_npz
 from kipet.core_methods.data_tools import *
-from kipet.visuals.plots import colors
+from kipet.visuals.decimation import (
+    decimate_frame,
+    decimate_series,
+    default_max_points,
+    show_figure,
+    )
 
 data_categories = ['concentration', 'spectral', 'state', 'trajectory', 'custom']
 
@@ -191,27 +193,76 @@ class DataSet(object):
     
         return None
     
+    def save(self, filename):
+        """Saves the DataSet to a binary (NPZ) file
+        
+        Args:
+            filename (str): the file name (.npz is added if missing)
+            
+        Returns:
+            filename (Path): the file written
+        
+        """
+        metadata = {'name': self.name,
+                    'category': self.category,
+                    'units': None if self.units is None else str(self.units),
+                    'notes': self.notes,
+                    'description': self.description,
+                    }
+        return write_npz(filename, {'data': self.data}, metadata=metadata)
+    
+    @classmethod
+    def load(cls, filename):
+        """Loads a DataSet saved with DataSet.save
+        
+        Args:
+            filename (str): the NPZ file
+            
+        Returns:
+            dataset (DataSet): the loaded DataSet
+        
+        """
+        with BinaryStore(filename) as store:
+            metadata = store.metadata
+            data = store.load('data') if 'data' in store else None
+            
+        return cls(metadata['name'],
+                   category=metadata['category'],
+                   data=data,
+                   units=metadata['units'],
+                   notes=metadata['notes'],
+                   description=metadata['description'],
+                   )
+    
     def remove_negatives(self):
         """Replaces the negative values with zero"""
         self.data[self.data < 0] = 0
         return None
     
-    def show_data(self):
-        """Method to show the data using Plotly"""
+    def show_data(self, max_points=default_max_points, binary=False):
+        """Method to show the data using Plotly
+        
+        Args:
+            max_points (int): points per trace (cells for spectral data) kept
+                after decimation (all if None)
+                
+            binary (bool): write the arrays binary encoded
+        
+        """
         
         if self.data is None:
             print('No data to plot')
             return None
         
         if self.category in ['concentration', 'state', 'trajectory', 'custom']:
-            self._plot_2D_data()
+            self._plot_2D_data(max_points, binary)
             
         if self.category == 'spectral':
-            self._plot_spectral_data()
+            self._plot_spectral_data(max_points=max_points, binary=binary)
     
         return None
     
-    def _plot_2D_data(self):
+    def _plot_2D_data(self, max_points=default_max_points, binary=False):
         """Simple plots for showing concentration or complementary state data
         
         """
@@ -227,10 +278,14 @@ class DataSet(object):
         if self.units is not None and len(self.units) == 2:
             x_axis_text = ' '.join([x_axis_text, '[' + self.units[1] +']'])
         
+        import plotly.graph_objs as go
+        from kipet.visuals.plots import colors
+        
         fig = go.Figure()
         for i, cols in enumerate(self.data.columns):
-            fig.add_trace(go.Scatter(x=self.data.index,
-                                     y=self.data[cols],
+            x, y = decimate_series(self.data.index, self.data[cols], max_points)
+            fig.add_trace(go.Scatter(x=x,
+                                     y=y,
                                      mode='markers',
                                      name=cols,
                                      marker=dict(size=10, opacity=0.5, color=colors[i])),
@@ -241,26 +296,34 @@ class DataSet(object):
                           yaxis_title=f'{y_axis_text}',
                           title_font_size=30)
 
-        plot(fig)
+        show_figure(fig, binary)
 
         return None
 
-    def _plot_spectral_data(self, dimension='3D'):
+    def _plot_spectral_data(self, dimension='3D', max_points=default_max_points, binary=False):
         """ Plots spectral data
         
             Args:
-                dataFrame (DataFrame): spectral data
+                dimension (str): only '3D' (surface) is available
+                
+                max_points (int): number of surface cells kept after
+                    decimation (all if None)
+                    
+                binary (bool): write the arrays binary encoded
               
             Returns:
                 None
     
         """
+        import plotly.graph_objs as go
+        
         if dimension=='3D':
             
+            data = decimate_frame(self.data, max_points)
             fig = go.Figure()
-            fig.add_trace(go.Surface(x=self.data.columns,
-                               y=self.data.index,
-                               z=self.data.values,
+            fig.add_trace(go.Surface(x=data.columns,
+                               y=data.index,
+                               z=data.values,
                               ))
             
             fig.update_layout(scene = dict(
@@ -271,7 +334,7 @@ class DataSet(object):
                                 title_text=f'{self.name}: {self.category.capitalize()} data',
                                 title_font_size=30)
             
-            plot(fig)
+            show_figure(fig, binary)
             
             return None
 
@@ -0,0 +1,237 @@
+"""
+Model build cache
+
+Refitting the same chemistry to new data rebuilds (and rediscretizes) an
+identical Pyomo model each time. The ModelBuildCache keeps the built models
+keyed on the structure of the ReactionModel: the model elements, the ODE and
+algebraic expressions, the index structure of the data and, for the
+discretized models, the collocation settings. On a hit a clone of the cached
+model is returned and only the data and the initial values are swapped in.
+"""
+# Standard library imports
+import collections
+import hashlib
+
+# Third party imports
+import numpy as np
+from pyomo.environ import Param, value, Var
+
+model_blocks = ['components', 'states', 'parameters', 'constants', 'algebraics']
+
+
+class ModelBuildCache():
+
+    """Least recently used store of built Pyomo models with hit/miss counters
+
+    Args:
+        max_size (int): the number of models kept
+
+    """
+    def __init__(self, max_size=8):
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._models = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._models)
+
+    def __contains__(self, key):
+        return key in self._models
+
+    def get(self, key):
+        """Returns a clone of the cached model (None on a miss)
+
+        Args:
+            key (str): the structure key
+
+        Returns:
+            model (ConcreteModel): a clone of the cached model or None
+
+        """
+        if key not in self._models:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._models.move_to_end(key)
+        return self._models[key].clone()
+
+    def store(self, key, model):
+        """Stores a clone of the model under key
+
+        Args:
+            key (str): the structure key
+
+            model (ConcreteModel): the model to cache
+
+        Returns:
+            None
+
+        """
+        self._models[key] = model.clone()
+        self._models.move_to_end(key)
+
+        while len(self._models) > self.max_size:
+            self._models.popitem(last=False)
+
+        return None
+
+    def clear(self):
+        """Removes the cached models and resets the counters"""
+
+        self._models.clear()
+        self.hits = 0
+        self.misses = 0
+
+        return None
+
+    def stats(self):
+        """Returns the cache statistics
+
+        Returns:
+            stats (dict): hits, misses, and the number of cached models
+
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._models),
+                }
+
+
+# Shared by all ReactionModels so that new instances of the same chemistry hit
+model_cache = ModelBuildCache()
+
+
+def _frame_structure(df):
+    """Index structure of a DataFrame: the index, the columns, and the
+    positions of the missing values (these are not part of the model)
+
+    """
+    values = np.asarray(df.values, dtype=float)
+    mask = hashlib.sha1(np.isnan(values).tobytes()).hexdigest()
+
+    return (tuple(df.index), tuple(df.columns), mask)
+
+
+def structure_key(reaction_model, *extra):
+    """Hashes everything that determines the structure of the Pyomo model
+    made by ReactionModel.create_pyomo_model
+
+    Values that are swapped in on a cache hit (data, initial values, bounds,
+    variances) are not part of the key.
+
+    Args:
+        reaction_model (ReactionModel): the model (after populate_template)
+
+        extra: anything else to include in the key (e.g. collocation settings)
+
+    Returns:
+        key (str): the structure key
+
+    """
+    signature = []
+
+    for block in model_blocks:
+        for element in getattr(reaction_model, block):
+            signature.append((block,
+                              element.name,
+                              str(element.units),
+                              getattr(element, 'known', None),
+                              getattr(element, 'absorbing', None),
+                              ))
+
+    for label, exprs in [('ode', reaction_model.odes_dict), ('alg', reaction_model.algs_dict)]:
+        for name, expr in exprs.items():
+            signature.append((label, name, expr.expression.to_string()))
+
+    for dataset in reaction_model.datasets:
+        signature.append(('data', dataset.name, dataset.category, _frame_structure(dataset.data)))
+
+    if reaction_model.spectra is not None:
+        signature.append(('spectra', _frame_structure(reaction_model.spectra.data)))
+
+    signature.append(('settings',
+                      reaction_model.settings.general.simulation_times,
+                      reaction_model.settings.general.scale_parameters,
+                      reaction_model.custom_objective,
+                      tuple(getattr(reaction_model, 'fixed_params', [])),
+                      ))
+    signature.append(('extra', extra))
+
+    return hashlib.sha1(repr(signature).encode()).hexdigest()
+
+
+def transfer_values(source, target):
+    """Copies the values, bounds, and fixed flags of the variables and the
+    values of the Params from source to target. Components and indices are
+    matched by name and only those present in both models are changed.
+
+    Args:
+        source (ConcreteModel): the model holding the new values
+
+        target (ConcreteModel): the (cached) model to update
+
+    Returns:
+        None
+
+    """
+    for source_var in source.component_objects(Var):
+        target_var = target.find_component(source_var.local_name)
+        if not isinstance(target_var, Var):
+            continue
+
+        for index, source_data in source_var.items():
+            if index not in target_var:
+                continue
+            target_data = target_var[index]
+            target_data.value = source_data.value
+            target_data.setlb(source_data.lb)
+            target_data.setub(source_data.ub)
+            target_data.fixed = source_data.fixed
+
+    for source_param in source.component_objects(Param):
+        target_param = target.find_component(source_param.local_name)
+        if not isinstance(target_param, Param) or not source_param.is_indexed():
+            continue
+
+        values = {index: value(source_param[index]) for index in source_param if index in target_param}
+
+        if target_param.mutable:
+            target_param.store_values(values)
+        else:
+            _rebuild_param(target_param, values)
+
+    return None
+
+
+def _rebuild_param(param, values):
+    """Replaces an immutable Param by a new Param with the updated values.
+    The data Params are not used in any expression when the model is built,
+    so nothing refers to the old component.
+
+    Args:
+        param (Param): the immutable Param in the target model
+
+        values (dict): the new values by index
+
+    Returns:
+        None
+
+    """
+    block = param.parent_block()
+    name = param.local_name
+    new_values = {index: value(param[index]) for index in param}
+    new_values.update(values)
+
+    new_param = Param(param.index_set(),
+                      initialize=new_values,
+                      within=param.domain,
+                      default=param.default(),
+                      mutable=False,
+                      )
+    block.del_component(param)
+    block.add_component(name, new_param)
+
+    return None
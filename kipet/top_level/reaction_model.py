@@ -19,18 +19,18 @@ from pyomo.dae.diffvar import DerivativeVar
 
 # Kipet library imports
 import kipet.core_methods.data_tools as data_tools
-from kipet.core_methods.EstimationPotential import (
-    replace_non_estimable_parameters,
-    rhps_method,
-    )
-from kipet.core_methods.EstimabilityAnalyzer import EstimabilityAnalyzer
 from kipet.core_methods.FESimulator import FESimulator
-from kipet.core_methods.ParameterEstimator import ParameterEstimator
+from kipet.core_methods.ParameterEstimator import (
+    get_model_values,
+    ParameterEstimator,
+    set_model_values,
+    )
 from kipet.core_methods.PyomoSimulator import PyomoSimulator
 from kipet.core_methods.TemplateBuilder import TemplateBuilder
 from kipet.core_methods.VarianceEstimator import VarianceEstimator
 # from kipet.common.component_expression import get_unit_model
 from kipet.common.model_funs import step_fun
+from kipet.common.warm_start import WarmStartStore
 from kipet.post_model_build.pyomo_model_tools import get_vars
 from kipet.dev_tools.display import Print
 from kipet.post_model_build.scaling import scale_models
@@ -55,6 +55,11 @@ from kipet.top_level.expression import (
     ODEExpressions,
     )
 from kipet.top_level.helper import DosingPoint
+from kipet.top_level.model_cache import (
+    model_cache,
+    structure_key,
+    transfer_values,
+    )
 from kipet.top_level.settings import (
     Settings, 
     )
@@ -118,6 +123,7 @@ class ReactionModel(WavelengthSelectionMixins):
         self.unit_base = kwargs.get('unit_base', None)
         
         self._G_data = {'G_contribution': None, 'Z_in': dict(), 'St': dict()}
+        self.warm_start = WarmStartStore()
         self.__var = VariableNames()
 
         # self.components_used = set()
@@ -359,12 +365,13 @@ class ReactionModel(WavelengthSelectionMixins):
     
         return None
     
-    def call_fe_factory(self):
+    def call_fe_factory(self, persistent=False):
         """Somewhat of a wrapper for this simulator method, but better"""
 
         self.simulator.call_fe_factory({
             self.__var.dosing_variable: [self.__var.dosing_component]},
-            self.dosing_points)
+            self.dosing_points,
+            persistent=persistent)
 
         return None
     
@@ -760,12 +767,26 @@ class ReactionModel(WavelengthSelectionMixins):
         self._make_c_dict()
         setattr(self.builder, 'c_mod', self.c)
         
-        self.model = self.builder.create_pyomo_model(start_time, end_time)
+        self._model_key = None
+        cached_model = None
+        if self.settings.general.use_model_cache and self._is_cacheable:
+            self._model_key = structure_key(self, skip_non_abs)
+            cached_model = model_cache.get(self._model_key)
         
-        non_abs_comp = self.components.get_match('absorbing', False)
+        if cached_model is not None:
+            _print('Using the cached model structure')
+            self.model = self._update_cached_model(cached_model, start_time, end_time)
         
-        if not skip_non_abs and len(non_abs_comp) > 0:
-            self.builder.set_non_absorbing_species(self.model, non_abs_comp, check=True)    
+        else:
+            self.model = self.builder.create_pyomo_model(start_time, end_time)
+            
+            non_abs_comp = self.components.get_match('absorbing', False)
+            
+            if not skip_non_abs and len(non_abs_comp) > 0:
+                self.builder.set_non_absorbing_species(self.model, non_abs_comp, check=True)    
+            
+            if self._model_key is not None:
+                model_cache.store(self._model_key, self.model)
         
         if hasattr(self,'fixed_params') and len(self.fixed_params) > 0:
             for param in self.fixed_params:
@@ -773,6 +794,49 @@ class ReactionModel(WavelengthSelectionMixins):
             
         return None
     
+    @property
+    def _is_cacheable(self):
+        """True if the model structure is fully described by structure_key
+        (dosing, steps, unwanted contributions, and the special data types
+        are always built from scratch)
+        
+        """
+        builder = self.builder
+        
+        return not (self._has_step_or_dosing or self._has_dosing_points or
+                    builder._G_contribution is not None or
+                    builder._absorption_data is not None or
+                    builder._is_known_abs_set or
+                    builder._huplc_data is not None or
+                    builder._smoothparam_data is not None)
+    
+    def _update_cached_model(self, model, start_time, end_time):
+        """Swaps the data and initial values of this ReactionModel into a
+        cached model with the same structure. The values are taken from the
+        variables and data of a model built without constraints.
+        
+        Args:
+            model (ConcreteModel): clone of the cached model
+            
+            start_time (float): start time of the model
+            
+            end_time (float): end time of the model
+            
+        Returns:
+            model (ConcreteModel): the updated model
+        
+        """
+        self.builder.early_return = True
+        try:
+            values_model = self.builder.create_pyomo_model(start_time, end_time)
+        finally:
+            self.builder.early_return = False
+        
+        transfer_values(values_model, model)
+        self.builder._add_state_sigmas(model)
+        
+        return model
+    
     def _add_feed_times(self):
         
         feed_times = set()
@@ -972,14 +1036,37 @@ class ReactionModel(WavelengthSelectionMixins):
         else:
             raise ValueError('Keyword argument estimator must be p_estimator or v_estimator.')  
         
+        if estimator == 'p_estimator' and self._reuse_ve_model:
+            _print('Making the PE model from the VE model')
+            self._p_model_from_v_model()
+            return None
+        
         model_to_clone = self.model
+        collocation = self.settings.collocation
+        
+        discretized_key = None
+        discretized_model = None
+        if getattr(self, '_model_key', None) is not None:
+            discretized_key = structure_key(self, self._model_key, collocation.method,
+                                            collocation.ncp, collocation.nfe, collocation.scheme)
+            discretized_model = model_cache.get(discretized_key)
+        
+        if discretized_model is not None:
+            # Same structure and collocation: only the values are updated
+            transfer_values(model_to_clone, discretized_model)
+            setattr(self, f'{estimator[0]}_model', discretized_model)
+            setattr(self, estimator, Estimator(discretized_model))
+            getattr(self, estimator)._default_initialization()
         
-        setattr(self, f'{estimator[0]}_model', model_to_clone.clone())
-        setattr(self, estimator, Estimator(getattr(self, f'{estimator[0]}_model')))
-        getattr(self, estimator).apply_discretization(self.settings.collocation.method,
-                                                      ncp=self.settings.collocation.ncp,
-                                                      nfe=self.settings.collocation.nfe,
-                                                      scheme=self.settings.collocation.scheme)
+        else:
+            setattr(self, f'{estimator[0]}_model', model_to_clone.clone())
+            setattr(self, estimator, Estimator(getattr(self, f'{estimator[0]}_model')))
+            getattr(self, estimator).apply_discretization(collocation.method,
+                                                          ncp=collocation.ncp,
+                                                          nfe=collocation.nfe,
+                                                          scheme=collocation.scheme)
+            if discretized_key is not None:
+                model_cache.store(discretized_key, getattr(self, f'{estimator[0]}_model'))
         _print('Starting from_traj')
         self._from_trajectories(estimator)
         
@@ -992,6 +1079,44 @@ class ReactionModel(WavelengthSelectionMixins):
                 getattr(getattr(self, estimator).model, self.__var.dosing_variable)[time, self.__var.dosing_component].set_value(time)
                 getattr(getattr(self, estimator).model, self.__var.dosing_variable)[time, self.__var.dosing_component].fix()
         
+        if estimator == 'v_estimator':
+            # The fixed variables of the discretized model, before the VE
+            # fixes anything, are needed if the PE model is made from it
+            self._v_model_fixed = {(var.local_name, index) for var in self.v_model.component_objects(Var)
+                                   for index, var_data in var.items() if var_data.fixed}
+        
+        return None
+    
+    @property
+    def _reuse_ve_model(self):
+        """True if the PE model is made from the discretized VE model (only
+        a VE model made in the current run_opt call is used)"""
+        
+        return self.settings.general.reuse_ve_model and \
+            getattr(self, 'v_model', None) is not None and \
+            getattr(self, '_v_model_fixed', None) is not None
+    
+    def _p_model_from_v_model(self):
+        """Makes the PE model by cloning the solved VE model after
+        discretization. The discretization is not repeated and the variable
+        values and suffixes (duals) of the VE solution are carried over
+        directly, so no initialization from the VE results is needed. The
+        variables are fixed as they were before the VE was run.
+        
+        """
+        self.p_model = self.v_model.clone()
+        
+        for var in self.p_model.component_objects(Var):
+            name = var.local_name
+            for index, var_data in var.items():
+                if (name, index) in self._v_model_fixed:
+                    var_data.fix()
+                else:
+                    var_data.unfix()
+        
+        self.p_estimator = ParameterEstimator(self.p_model)
+        # The VE model is used once
+        self._v_model_fixed = None
         
         return None
     
@@ -1017,6 +1142,10 @@ class ReactionModel(WavelengthSelectionMixins):
             pe_settings = {**self.settings.parameter_estimator, **self._G_data}
         else:
             pe_settings = {**self.settings.parameter_estimator} #, **self._G_data}, 
+        
+        # Repeated solves of this model start from the last solution
+        if self.settings.general.warm_start:
+            pe_settings['warm_start'] = self.warm_start
             
         self._run_opt('p_estimator', **pe_settings)
         
@@ -1076,6 +1205,9 @@ class ReactionModel(WavelengthSelectionMixins):
         """
         _print('Starting the RunOpt method')
         
+        # A VE model from an earlier call is not used for the PE model
+        self._v_model_fixed = None
+        
         # Make the model if not present
         if self.model is None:    
             self.create_pyomo_model()  
@@ -1127,6 +1259,7 @@ class ReactionModel(WavelengthSelectionMixins):
                 
         # Create ParameterEstimator
         _print('Making PEstimator')
+        reuse_ve_model = self._reuse_ve_model
         self.create_estimator(estimator='p_estimator')
         
         variances = self.components.variances
@@ -1134,7 +1267,7 @@ class ReactionModel(WavelengthSelectionMixins):
         
         # The VE results can be used to initialize the PE
         if 'v_estimator' in self.results_dict:
-            if self.settings.general.initialize_pe:
+            if self.settings.general.initialize_pe and not reuse_ve_model:
                 # Update PE using VE results
                 self.initialize_from_variance_trajectory()
                 # No initialization from simulation is needed
@@ -1173,9 +1306,62 @@ class ReactionModel(WavelengthSelectionMixins):
         
         # Tells MEE that the individual model is already solved
         self.optimized = True
-        
+
         return self.results
-    
+
+    def _get_fit_state(self):
+        """Collects the results of run_opt in a picklable form so that a fit
+        made in a worker process can be loaded into the model in the main
+        process (Pyomo models are not passed between processes)
+
+        Returns:
+            state (dict): the results, variances and p_model values
+
+        """
+        state = {'results': self.results,
+                 'results_dict': self.results_dict,
+                 'variances': self.variances,
+                 'p_values': get_model_values(self.p_model),
+                 'termination_condition': self.p_estimator.termination_condition,
+                 }
+
+        return state
+
+    def _load_fit_state(self, state):
+        """Loads a fit made by run_opt in another process (see _get_fit_state)
+
+        The ParameterEstimator is rebuilt without the simulation based
+        initialization and its model takes the values of the solved model.
+
+        Args:
+            state (dict): the output of _get_fit_state
+
+        Returns:
+            None
+
+        """
+        if self.model is None:
+            self.create_pyomo_model()
+
+        self._update_related_settings()
+        self.variances = state['variances']
+        self.settings.parameter_estimator.solver_opts = self.settings.solver
+        self.settings.parameter_estimator.variances = self.variances
+
+        sim_init = self.settings.parameter_estimator.sim_init
+        self.settings.parameter_estimator.sim_init = False
+        self.create_estimator(estimator='p_estimator')
+        self.settings.parameter_estimator.sim_init = sim_init
+
+        set_model_values(self.p_model, state['p_values'])
+        self.p_estimator.termination_condition = state['termination_condition']
+
+        self.results_dict = state['results_dict']
+        self.results = state['results']
+        self.optimized = True
+
+        return None
+
     @staticmethod
     def _scale_variances(variances):
         
@@ -1330,7 +1516,8 @@ class ReactionModel(WavelengthSelectionMixins):
     def rhps_method(self,
                      method='k_aug',
                      calc_method='global',
-                     scaled=True):
+                     scaled=True,
+                     in_place=False):
         """This calls the reduce_models method in the EstimationPotential
         module to reduce the model based on the reduced hessian parameter
         selection method.
@@ -1343,6 +1530,10 @@ class ReactionModel(WavelengthSelectionMixins):
                     constants from the model and restores the parameter values
                     and their bounds.
                     
+            in_place (bool): defaults to False, calculate the reduced Hessians
+                on the model itself (changes are undone afterwards) instead of
+                on copies of the model
+                    
         Returns:
             results (ResultsObject): A standard results object with the reduced
                 model results
@@ -1356,12 +1547,15 @@ class ReactionModel(WavelengthSelectionMixins):
         kwargs['method'] = method
         kwargs['calc_method'] = calc_method
         kwargs['scaled'] = scaled
+        kwargs['in_place'] = in_place
         kwargs['use_bounds'] = False
         kwargs['use_duals'] = False
         kwargs['ncp'] = self.settings.collocation.ncp
         kwargs['nfe'] = self.settings.collocation.nfe
         
         # parameter_dict = self.parameters.as_dict(bounds=True)
+        from kipet.core_methods.EstimationPotential import rhps_method
+        
         results, reduced_model = rhps_method(self.model, **kwargs)
         
 #        results.file_dir = self.settings.general.charts_directory
@@ -1427,11 +1621,17 @@ class ReactionModel(WavelengthSelectionMixins):
                         parameter_uncertainties=None,
                         meas_uncertainty=None,
                         sigmas=None,
+                        model_mode='lazy',
                         ):
         
         """This is a wrapper for the EstimabilityAnalyzer 
+        
+        model_mode is passed to EstimabilityAnalyzer.wu_estimability ('lazy'
+        or 'reuse') and controls how the simplified models are held in memory
         """
         # Here we use the estimability analysis tools
+        from kipet.core_methods.EstimabilityAnalyzer import EstimabilityAnalyzer
+        
         self.e_analyzer = EstimabilityAnalyzer(self.model)
         # Problem needs to be discretized first
         self.e_analyzer.apply_discretization('dae.collocation',
@@ -1457,7 +1657,8 @@ class ReactionModel(WavelengthSelectionMixins):
             params_to_select = self.e_analyzer.run_analyzer(method='Wu', 
                                                             parameter_rankings=listparams,
                                                             meas_scaling=meas_uncertainty, 
-                                                            variances=sigmas
+                                                            variances=sigmas,
+                                                            model_mode=model_mode,
                                                             )
             # We can then use this information to fix certain parameters and run the parameter estimation
             print(params_to_select)
@@ -1695,13 +1896,23 @@ class ReactionModel(WavelengthSelectionMixins):
         return None
     
     
-    def plot(self, var=None, jupyter=False):
+    def plot(self, var=None, jupyter=False, max_points=None, binary=None):
+        
+        """Plot results using the variable or variable class
         
-        """Plot results using the variable or variable class"""
+        max_points (points per trace) and binary (binary encoded arrays)
+        default to the general settings plot_max_points and plot_binary. Set
+        plot_max_points to None to plot every point.
+        
+        """
         
         from kipet.visuals.plots import PlotObject
         
-        self._plot_object = PlotObject(reaction_model=self, jupyter=jupyter)
+        self._plot_object = PlotObject(reaction_model=self,
+                                       jupyter=jupyter,
+                                       max_points=max_points,
+                                       binary=binary,
+                                       )
         
         if var == 'Z':
             self._plot_object._plot_all_Z()
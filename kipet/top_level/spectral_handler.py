@@ -1,17 +1,20 @@
 """
 Spectral Data Handling for Kipet
 """
+from functools import lru_cache, partial
 import inspect
 import os
 
 import numpy as np
 import pandas as pd
-import plotly.graph_objs as go
-from plotly import __version__
-from plotly.offline import download_plotlyjs, init_notebook_mode, plot, iplot
 
+from kipet.common.binary_io import BinaryStore, write_npz
 from kipet.core_methods.data_tools import *
-from kipet.visuals.plots import colors
+from kipet.visuals.decimation import (
+    decimate_frame,
+    default_max_points,
+    show_figure,
+    )
 
 class SpectralData():
     
@@ -51,22 +54,68 @@ class SpectralData():
             new_columns = [float(col) for col in old_columns]
             self.data.columns = new_columns
             
+    def save(self, filename):
+        """Saves the spectral data (and the original data, if different) to a
+        binary (NPZ) file
+        
+        Args:
+            filename (str): the file name (.npz is added if missing)
+            
+        Returns:
+            filename (Path): the file written
+        
+        """
+        variables = {'data': self.data}
+        if self.data_orig is not None and self.data_orig is not self.data:
+            variables['data_orig'] = self.data_orig
+        
+        metadata = {'name': self.name,
+                    'remove_negatives': self.remove_negatives,
+                    }
+        return write_npz(filename, variables, metadata=metadata)
+    
+    @classmethod
+    def load(cls, filename):
+        """Loads spectral data saved with SpectralData.save
+        
+        Args:
+            filename (str): the NPZ file
+            
+        Returns:
+            spectral_data (SpectralData): the loaded spectral data
+        
+        """
+        with BinaryStore(filename) as store:
+            spectral_data = cls(store.metadata['name'], data=store.load('data') if 'data' in store else None)
+            if 'data_orig' in store:
+                spectral_data.data_orig = store.load('data_orig')
+            spectral_data.remove_negatives = store.metadata['remove_negatives']
+        
+        return spectral_data
+    
     def reset(self):
         
         self.data = self.data_orig
         return None
         
-    def plot(self, data_set='data'):
+    def plot(self, data_set='data', max_points=default_max_points, binary=False):
         """ Plots spectral data
         
             Args:
-                dataFrame (DataFrame): spectral data
+                data_set (str): 'data' or 'data_orig'
+                
+                max_points (int): number of surface cells kept after
+                    decimation (all if None)
+                    
+                binary (bool): write the arrays binary encoded
               
             Returns:
                 None
     
         """
-        data = getattr(self, data_set)
+        import plotly.graph_objs as go
+        
+        data = decimate_frame(getattr(self, data_set), max_points)
        
         fig = go.Figure()
         fig.add_trace(go.Surface(x=data.columns,
@@ -82,7 +131,7 @@ class SpectralData():
                             title_text=f'{self.name}: Spectral Data',
                             title_font_size=30)
         
-        plot(fig)
+        show_figure(fig, binary)
             
         return None
     
@@ -90,6 +139,20 @@ class SpectralData():
         
         self.data[self.data < 0] = 0
     
+    def pipeline(self):
+        """Starts a preprocessing pipeline for the spectral data
+        
+        The steps are added by chaining the methods of the returned
+        PreprocessingPipeline and are applied with its apply method:
+            
+            spectra.pipeline().baseline_shift().msc().savitzky_golay(window_size=15).apply(chunk_size=500)
+            
+        Returns:
+            PreprocessingPipeline
+            
+        """
+        return PreprocessingPipeline(self)
+    
     def savitzky_golay(self, window_size=3, orderPoly=2, orderDeriv=0, in_place=True):
         """
         Implementation of the Savitzky-Golay filter for Kipet. Used for smoothing data, with
@@ -112,59 +175,10 @@ class SpectralData():
             Original paper: A. Savitzky, M. J. E. Golay, Smoothing and Differentiation of Data by 
             Simplified Least Squares Procedures. Analytical Chemistry, 1964, 36 (8), pp 1627-1639.
         """
-        # data checks
-        dataFrame = self.data
-            #dataFrame = self.data_orig
-        try:
-            window_size = np.abs(np.int(window_size))
-            orderPoly = np.abs(np.int(orderPoly))
-        except ValueError:
-            raise ValueError("window_size and order have to be of type int")
-        if window_size % 2 != 1 or window_size < 1:
-            raise TypeError("window_size size must be a positive odd number")
-        if window_size < orderPoly + 2:
-            raise TypeError("window_size is too small for the polynomials order")    
-        if orderPoly >= window_size:
-            raise ValueError("polyorder must be less than window_length.")
-    
-        if not isinstance(dataFrame, pd.DataFrame):
-            raise TypeError("data must be inputted as a pandas DataFrame, try using read_spectral_data_from_txt or similar function first")
-        print("Applying the Savitzky-Golay filter")
-        
-        order_range = range(orderPoly+1)
-        half_window = (window_size -1) // 2
-        # precompute coefficients
-        b = np.mat([[k**i for i in order_range] for k in range(-half_window, half_window+1)])
-        m = np.linalg.pinv(b).A[orderDeriv]
-        #rate = 1
-        #m = np.linalg.pinv(b).A[orderDeriv] * rate**orderDeriv * factorial(orderDeriv)
-        D = np.array(dataFrame)
-        no_noise = np.array(dataFrame)
-        # pad the signal at the extremes with values taken from the signal itself
-        for t in range(len(dataFrame.index)):
-            row = list()
-            for l in range(len(dataFrame.columns)):
-                row.append(D[t,l])
-            firstvals = row[0] - np.abs( row[1:half_window+1][::-1] - row[0] )
-            lastvals = row[-1] + np.abs(row[-half_window-1:-1][::-1] - row[-1])
-            y = np.concatenate((firstvals, row, lastvals))
-            new_row = np.convolve( m, y, mode='valid')
-            no_noise[t]=new_row
-            
-        if orderDeriv == 0:
-            for t in range(len(dataFrame.index)):
-                for l in range(len(dataFrame.columns)):
-                    if no_noise[t,l] < 0:
-                        no_noise[t,l] = 0
-        
-        data_frame = pd.DataFrame(data=no_noise,
-                                  columns = dataFrame.columns,
-                                  index=dataFrame.index)
-        
-        if in_place:
-            self.data = data_frame
-        
-        return data_frame
+        pipeline = self.pipeline().savitzky_golay(window_size=window_size,
+                                                  orderPoly=orderPoly,
+                                                  orderDeriv=orderDeriv)
+        return pipeline.apply(in_place=in_place)
     
     def snv(self, offset=0, in_place=True):
         """
@@ -186,43 +200,7 @@ class SpectralData():
         References:
     
         """
-        dataFrame = self.data
-        # if dataFrame is None:
-        #     dataFrame = self.data_orig
-            
-        # data checks
-        if not isinstance(dataFrame, pd.DataFrame):
-            raise TypeError("data must be inputted as a pandas DataFrame, try using read_spectral_data_from_txt or similar function first")
-        print("Applying the SNV pre-processing")    
-    
-        D = np.array(dataFrame)
-        snv_proc = np.array(dataFrame)
-        for t in range(len(dataFrame.index)):
-            row = list()
-            sum_spectra = 0
-            for l in range(len(dataFrame.columns)):
-                row.append(D[t,l])
-                sum_spectra += D[t,l]
-            mean_spectra = sum_spectra/(len(dataFrame.columns))
-            std = 0
-            for l in range(len(dataFrame.columns)):
-                std += (mean_spectra-D[t,l])**2
-            new_row = list()
-            for l in range(len(dataFrame.columns)):
-                if offset ==0:
-                    w = (D[t,l]-mean_spectra)*(std/(len(dataFrame.columns)-1))**0.5
-                else:
-                    w = (D[t,l]-mean_spectra)*(std/(len(dataFrame.columns)-1))**0.5 + 1/offset
-                new_row.append(w)
-                    
-            snv_proc[t]=new_row
-    
-        data_frame = pd.DataFrame(data=snv_proc,
-                                  columns = dataFrame.columns,
-                                  index=dataFrame.index)
-        if in_place:
-            self.data = data_frame
-        return data_frame
+        return self.pipeline().snv(offset=offset).apply(in_place=in_place)
     
     def msc(self, reference_spectra=None, in_place=True):
         """
@@ -243,55 +221,7 @@ class SpectralData():
         References:
     
         """
-        dataFrame = self.data
-        # if dataFrame is None:
-        #     dataFrame = self.data_orig
-        # data checks
-        if not isinstance(dataFrame, pd.DataFrame):
-            raise TypeError("data must be inputted as a pandas DataFrame, try using read_spectral_data_from_txt or similar function first")
-        print("Applying the MSC pre-processing")  
-        
-        #Want to make it possible to include user-defined reference spectra
-        #this is not great as we could provide the data with some conditioning 
-        #in order to construct references based on different user inputs
-        if reference_spectra != None:
-            if not isinstance(reference_spectra, pd.DataFrame):
-                raise TypeError("data must be inputted as a pandas DataFrame, try using read_spectral_data_from_txt or similar function first")
-            
-            if len(dataFrame.columns) != len(reference_spectra.columns) and len(dataFrame.rows) != len(reference_spectra.rows):
-                raise NotImplementedError("the reference spectra must have the same number of entries as the data")
-        
-        D = np.array(dataFrame)
-        ref = np.array(dataFrame)
-        msc_proc = np.array(dataFrame)
-        
-        # the average spectrum is calculated as reference spectra for MSC when none is given by user
-        if reference_spectra == None:
-            sum_spectra = 0
-            
-            for t in range(len(dataFrame.index)):
-                sum_spectra = 0
-                for l in range(len(dataFrame.columns)):
-                    sum_spectra += D[t,l]
-                mean_spectra = sum_spectra/(len(dataFrame.columns))
-                for l in range(len(dataFrame.columns)):
-                    ref[t,l] = mean_spectra 
-        else:
-            #should add in some checks and additional ways to formulate these depending on what input the user provides
-            #need to find out the type of data usually inputted here in order to do this
-            ref = reference_spectra
-        for t in range(len(dataFrame.index)):
-            row = list()
-            fit = np.polyfit(ref[t,:],D[t,:],1, full=True)
-            row[:] = (D[t,:] - fit[0][1]) / fit[0][0]
-            msc_proc[t,:]=row  
-    
-        data_frame = pd.DataFrame(data=msc_proc,
-                                  columns = dataFrame.columns,
-                                  index=dataFrame.index)
-        if in_place:
-            self.data = data_frame
-        return data_frame
+        return self.pipeline().msc(reference_spectra=reference_spectra).apply(in_place=in_place)
     
     def baseline_shift(self, shift=None, in_place=True):
         """
@@ -311,27 +241,7 @@ class SpectralData():
         References:
     
         """
-        dataFrame = self.data
-        # if dataFrame is None:
-        #     dataFrame = self.data_orig
-        # data checks
-        if not isinstance(dataFrame, pd.DataFrame):
-            raise TypeError("data must be inputted as a pandas DataFrame, try using read_spectral_data_from_txt or similar function first")
-        print("Applying the baseline shift pre-processing") 
-        if shift == None:
-            shift = float(dataFrame.min().min())*(-1)
-        
-        print("shifting dataset by: ", shift)    
-        D = np.array(dataFrame)
-        for t in range(len(dataFrame.index)):
-            for l in range(len(dataFrame.columns)):
-                D[t,l] = D[t,l]+shift
-        
-        data_frame = pd.DataFrame(data=D, columns = dataFrame.columns, index = dataFrame.index)
-        
-        if in_place:
-            self.data = data_frame
-        return data_frame
+        return self.pipeline().baseline_shift(shift=shift).apply(in_place=in_place)
     
     def decrease_wavelengths(self, A_set=2, specific_subset=None, in_place=True):
         '''
@@ -378,4 +288,281 @@ class SpectralData():
             
         if in_place:
             self.data = new_D
-        return new_D
\ No newline at end of file
+        return new_D
+
+@lru_cache(maxsize=None)
+def _savitzky_golay_kernel(window_size, orderPoly, orderDeriv):
+    """Returns the (read-only) Savitzky-Golay coefficients, computed once for
+    each combination of window, polynomial order, and derivative order
+    
+    """
+    half_window = (window_size - 1) // 2
+    b = np.vander(np.arange(-half_window, half_window + 1, dtype=float), orderPoly + 1, increasing=True)
+    kernel = np.linalg.pinv(b)[orderDeriv]
+    kernel.setflags(write=False)
+    return kernel
+
+def savitzky_golay_coefficients(window_size, orderPoly, orderDeriv=0):
+    """Returns the Savitzky-Golay filter coefficients for a window
+    
+    Args:
+        window_size (int): the length of the window (odd)
+        orderPoly (int): order of the polynomial used in the filter
+        orderDeriv (int): the order of the derivative to compute
+        
+    Returns:
+        coefficients (np.ndarray): the filter coefficients
+        
+    """
+    return _savitzky_golay_kernel(int(window_size), int(orderPoly), int(orderDeriv)).copy()
+
+def savitzky_golay_array(D, coefficients, clip_negatives=True):
+    """Applies the Savitzky-Golay filter along the rows (wavelengths) of D
+    
+    The rows are padded at the extremes with values taken from the signal
+    itself and the padded rows are convolved with the coefficients in a
+    single call, so no array of windows is made.
+    
+    Args:
+        D (np.ndarray): the spectra (times x wavelengths)
+        coefficients (np.ndarray): filter coefficients from savitzky_golay_coefficients
+        clip_negatives (bool): set negative values to zero (smoothing only)
+        
+    Returns:
+        D_filtered (np.ndarray): the filtered spectra
+        
+    """
+    from scipy.ndimage import convolve1d
+    
+    half_window = (len(coefficients) - 1) // 2
+    first = D[:, :1]
+    last = D[:, -1:]
+    firstvals = first - np.abs(D[:, half_window:0:-1] - first)
+    lastvals = last + np.abs(D[:, -2:-half_window - 2:-1] - last)
+    padded = np.concatenate((firstvals, D, lastvals), axis=1)
+    D_filtered = convolve1d(padded, coefficients, axis=1)[:, half_window:half_window + D.shape[1]]
+    
+    if clip_negatives:
+        np.maximum(D_filtered, 0, out=D_filtered)
+    
+    return D_filtered
+
+def snv_array(D, offset=0):
+    """Applies the SNV filter to each row (spectrum) of D in place
+    
+    Args:
+        D (np.ndarray): the spectra (times x wavelengths)
+        offset (float): user-defined offset
+        
+    Returns:
+        D (np.ndarray): the processed spectra
+        
+    """
+    D -= D.mean(axis=1, keepdims=True)
+    sum_squares = np.einsum('ij,ij->i', D, D)
+    D *= np.sqrt(sum_squares/(D.shape[1] - 1))[:, None]
+    if offset != 0:
+        D += 1/offset
+    
+    return D
+
+def msc_array(D, reference):
+    """Applies the MSC filter to each row (spectrum) of D in place
+    
+    Each spectrum is regressed on the reference spectrum and the offset and
+    slope of the fit are removed. The slopes and intercepts of all spectra
+    are found at once from the closed-form least squares solution.
+    
+    Args:
+        D (np.ndarray): the spectra (times x wavelengths)
+        reference (np.ndarray): the reference spectrum (wavelengths)
+        
+    Returns:
+        D (np.ndarray): the processed spectra
+        
+    """
+    ref_centered = reference - reference.mean()
+    slope = (D @ ref_centered)/(ref_centered @ ref_centered)
+    intercept = D.mean(axis=1) - slope*reference.mean()
+    D -= intercept[:, None]
+    D /= slope[:, None]
+    
+    return D
+
+
+class PreprocessingPipeline():
+    
+    """Chains spectral preprocessing steps and applies them in one pass
+    
+    The steps are applied to blocks of times (chunk_size rows) and the
+    results are written into a single output array, so no intermediate
+    DataFrames are made between the steps. Steps that need a statistic of
+    the whole dataset (automatic baseline shift, average reference spectrum)
+    compute it beforehand by streaming the chunks through the preceding steps.
+    
+    Args:
+        spectral_data (SpectralData): the spectral data to process
+    
+    """
+    def __init__(self, spectral_data):
+        
+        self.spectral_data = spectral_data
+        self.steps = []
+        
+    def __repr__(self):
+        
+        steps = ' -> '.join(step[0] for step in self.steps)
+        return f'PreprocessingPipeline({self.spectral_data.name}: {steps})'
+        
+    def savitzky_golay(self, window_size=3, orderPoly=2, orderDeriv=0):
+        """Adds the Savitzky-Golay filter (see SpectralData.savitzky_golay)"""
+        
+        try:
+            window_size = abs(int(window_size))
+            orderPoly = abs(int(orderPoly))
+        except ValueError:
+            raise ValueError("window_size and order have to be of type int")
+        if window_size % 2 != 1 or window_size < 1:
+            raise TypeError("window_size size must be a positive odd number")
+        if window_size < orderPoly + 2:
+            raise TypeError("window_size is too small for the polynomials order")    
+        if orderPoly >= window_size:
+            raise ValueError("polyorder must be less than window_length.")
+        
+        coefficients = savitzky_golay_coefficients(window_size, orderPoly, orderDeriv)
+        self.steps.append(('Savitzky-Golay filter',
+                           lambda D: savitzky_golay_array(D, coefficients, clip_negatives=orderDeriv == 0),
+                           None))
+        return self
+    
+    def snv(self, offset=0):
+        """Adds the SNV filter (see SpectralData.snv)"""
+        
+        self.steps.append(('SNV pre-processing',
+                           lambda D: snv_array(D, offset),
+                           None))
+        return self
+    
+    def msc(self, reference_spectra=None):
+        """Adds the MSC filter (see SpectralData.msc)"""
+        
+        if reference_spectra is not None:
+            if not isinstance(reference_spectra, (pd.DataFrame, pd.Series, np.ndarray)):
+                raise TypeError("the reference spectra must be a pandas DataFrame, Series, or a numpy array")
+            reference = np.asarray(reference_spectra, dtype=float).ravel()
+            self.steps.append(('MSC pre-processing',
+                               lambda D: msc_array(D, reference),
+                               None))
+        else:
+            self.steps.append(('MSC pre-processing',
+                               lambda reference, D: msc_array(D, reference),
+                               _MeanSpectrum))
+        return self
+    
+    def baseline_shift(self, shift=None):
+        """Adds the baseline shift (see SpectralData.baseline_shift)"""
+        
+        if shift is not None:
+            self.steps.append(('baseline shift pre-processing',
+                               lambda D: np.add(D, shift, out=D),
+                               None))
+        else:
+            self.steps.append(('baseline shift pre-processing',
+                               lambda shift, D: np.add(D, shift, out=D),
+                               _BaselineShift))
+        return self
+    
+    def apply(self, chunk_size=None, in_place=True, overwrite=False):
+        """Applies the steps of the pipeline to the spectral data
+        
+        Args:
+            chunk_size (int): number of times processed at once. If None, all
+                times are processed together
+            in_place (bool): replace the data of the SpectralData object
+            overwrite (bool): write the results into the array holding the
+                current data instead of a new array. Note that data_orig is
+                also changed if it is the same object as data
+            
+        Returns:
+            DataFrame containing the pre-processed data
+        
+        """
+        dataFrame = self.spectral_data.data
+        if not isinstance(dataFrame, pd.DataFrame):
+            raise TypeError("data must be inputted as a pandas DataFrame, try using read_spectral_data_from_txt or similar function first")
+        
+        if overwrite:
+            values = dataFrame.to_numpy(dtype=float, copy=False)
+        else:
+            values = np.array(dataFrame, dtype=float)
+        
+        n_times = values.shape[0]
+        if chunk_size is None or chunk_size <= 0:
+            chunk_size = max(n_times, 1)
+        
+        functions = []
+        for name, func, statistic in self.steps:
+            print(f'Applying the {name}')
+            if statistic is not None:
+                stat = statistic()
+                for start in range(0, n_times, chunk_size):
+                    chunk = self._run_chunk(values, start, chunk_size, functions)
+                    stat.update(chunk)
+                value = stat.result()
+                if isinstance(stat, _BaselineShift):
+                    print("shifting dataset by: ", value)
+                func = partial(func, value)
+            functions.append(func)
+        
+        for start in range(0, n_times, chunk_size):
+            values[start:start + chunk_size] = self._run_chunk(values, start, chunk_size, functions)
+        
+        data_frame = pd.DataFrame(data=values,
+                                  columns=dataFrame.columns,
+                                  index=dataFrame.index,
+                                  copy=False)
+        if in_place:
+            self.spectral_data.data = data_frame
+        
+        return data_frame
+    
+    @staticmethod
+    def _run_chunk(values, start, chunk_size, functions):
+        """Passes a copy of a block of times through the given steps"""
+        
+        chunk = np.array(values[start:start + chunk_size], dtype=float)
+        for func in functions:
+            chunk = func(chunk)
+            
+        return chunk
+    
+
+class _MeanSpectrum():
+    
+    """Accumulates the average spectrum over chunks of times"""
+    
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+        
+    def update(self, chunk):
+        self.total = self.total + chunk.sum(axis=0)
+        self.count += chunk.shape[0]
+        
+    def result(self):
+        return self.total/self.count
+    
+
+class _BaselineShift():
+    
+    """Accumulates the automatic baseline shift (the negative minimum) over
+    chunks of times"""
+    
+    def __init__(self):
+        self.minimum = np.inf
+        
+    def update(self, chunk):
+        self.minimum = min(self.minimum, float(chunk.min()))
+        
+    def result(self):
+        return -self.minimum
@@ -109,10 +109,7 @@ def run_alternate_method(var_est_object, solver, run_opt_kwargs):
     print(f'sigma_vals: {sigma_vals}')
     results = ResultsObject()
     
-    vars_to_load = ['Z', 'dZdt', 'X', 'dXdt', 'C', 'Cs', 'S', 'Y']
-    if not hasattr(var_est_object, '_abs_components'):
-        vars_to_load.remove('Cs')
-    results.load_from_pyomo_model(var_est_object.model, to_load=vars_to_load)
+    results.load_from_pyomo_model(var_est_object.model)
      
     results.P = {name: var_est_object.model.P[name].value for name in var_est_object.model.parameter_names}
     results.sigma_sq = sigma_vals
@@ -207,10 +204,7 @@ def run_direct_sigmas_method(var_est_object, solver, run_opt_kwargs):
    
     results = ResultsObject()
     
-    vars_to_load = ['Z', 'dZdt', 'X', 'dXdt', 'C', 'Cs', 'S', 'Y']
-    if not hasattr(var_est_object, '_abs_components'):
-        vars_to_load.remove('Cs')
-    results.load_from_pyomo_model(var_est_object.model, to_load=vars_to_load)
+    results.load_from_pyomo_model(var_est_object.model)
     
     results.P = {name: var_est_object.model.P[name].value for name in var_est_object.model.parameter_names}
     results.sigma_sq = sigma_vals
@@ -2,6 +2,7 @@
 Initialization for method from Chen et al. 2016 
 """
 import os
+import time
 
 from pyomo.environ import (
     Objective,
@@ -9,6 +10,7 @@ from pyomo.environ import (
     )
 
 from kipet.core_methods.ResultsObject import *
+from kipet.post_model_build.pyomo_model_tools import VarArrayBridge
 from kipet.variance_methods.chen_method_pyomo import *
 from kipet.variance_methods.chen_method_scipy import *
 
@@ -77,32 +79,43 @@ def run_method(var_est_object, solver, run_opt_kwargs):
             build_s_model(var_est_object)
             build_c_model(var_est_object)
         
+    # Z is compared between iterations using the full profile
+    z_bridge = VarArrayBridge.from_var(var_est_object.model.Z)
+    bridges = [z_bridge]
+    if not lsq_ipopt:
+        bridges += list(get_array_bridges(var_est_object).values())
+    
+    var_est_object.iteration_timings = []
+    
     for it in range(max_iter):
         
-        rb = ResultsObject()
+        transfer_start = sum(b.transfer_time for b in bridges)
+        timings = {}
         
-        vars_to_load = ['Z', 'C', 'Cs', 'S', 'Y']
-        if not hasattr(var_est_object, '_abs_components'):
-            vars_to_load.remove('Cs')
-        rb.load_from_pyomo_model(var_est_object.model, to_load=vars_to_load)
+        Z_before = np.nan_to_num(z_bridge.get_values())
         
+        t0 = time.perf_counter()
         solve_Z(var_est_object, solver)
+        timings['Z'] = time.perf_counter() - t0
 
+        t0 = time.perf_counter()
         if lsq_ipopt:
             solve_S(var_est_object, solver)
+            timings['S'] = time.perf_counter() - t0
+            t0 = time.perf_counter()
             solve_C(var_est_object, solver)
         else:
             solved_s = solve_s_scipy(var_est_object)
+            timings['S'] = time.perf_counter() - t0
+            t0 = time.perf_counter()
             solved_c = solve_c_scipy(var_est_object)
+        timings['C'] = time.perf_counter() - t0
             
-        ra = ResultsObject()    
-        vars_to_load = ['Z', 'C', 'Cs', 'S']
-        if not hasattr(var_est_object, '_abs_components'):
-            vars_to_load.remove('Cs')
-        ra.load_from_pyomo_model(var_est_object.model, to_load=vars_to_load)
+        Z_after = np.nan_to_num(z_bridge.get_values())
+        Z_norm = np.linalg.norm(Z_before - Z_after, norm_order)
         
-        r_diff = compute_diff_results(rb,ra)
-        Z_norm = r_diff.compute_var_norm('Z', norm_order)
+        timings['transfer'] = sum(b.transfer_time for b in bridges) - transfer_start
+        var_est_object.iteration_timings.append(timings)
         
         if it > 0:
             print("{: >11} {: >20}".format(it, Z_norm))
@@ -110,12 +123,11 @@ def run_method(var_est_object, solver, run_opt_kwargs):
         if Z_norm < tol and it >= 1:
             break
             
+    _print_iteration_timings(var_est_object.iteration_timings)
+            
     results = ResultsObject()
     
-    vars_to_load = ['Z', 'dZdt', 'X', 'dXdt', 'C', 'Cs', 'S', 'Y']
-    if not hasattr(var_est_object, '_abs_components'):
-        vars_to_load.remove('Cs')
-    results.load_from_pyomo_model(var_est_object.model, to_load=vars_to_load)
+    results.load_from_pyomo_model(var_est_object.model)
 
     print('Iterative optimization converged. Estimating variances now')
     solved_variances = _solve_variances(var_est_object,
@@ -206,6 +218,30 @@ def solve_initalization(var_est_object, solver, **kwds):
     
     return None
 
+def _print_iteration_timings(iteration_timings):
+    """Prints the average time spent in each part of the Chen iterations
+
+       This method is not intended to be used by users directly
+
+    Args:
+        iteration_timings (list): list of dicts with the timings [s] of each
+            iteration
+
+    Returns:
+        None
+
+    """
+    if len(iteration_timings) == 0:
+        return None
+    
+    n_iter = len(iteration_timings)
+    print(f'\nAverage time per iteration ({n_iter} iterations):')
+    for key in iteration_timings[0].keys():
+        average = sum(timing[key] for timing in iteration_timings)/n_iter
+        print(f'{str(key).rjust(11)} : {average:0.4f} s')
+    
+    return None
+
 def _log_iterations(var_est_object, filename, iteration):
     """log solution of each subproblem in Weifengs procedure
 
@@ -342,10 +378,8 @@ def build_scipy_lsq_arrays(var_est_object):
         None
 
     """
-    var_est_object._d_array = np.zeros((var_est_object._n_meas_times, var_est_object._n_meas_lambdas))
-    for i, t in enumerate(var_est_object._meas_times):
-        for j, l in enumerate(var_est_object._meas_lambdas):
-            var_est_object._d_array[i,j] = var_est_object.model.D[t,l]
+    D = var_est_object.model.D
+    var_est_object._d_array = np.array([[D[t, l] for l in var_est_object._meas_lambdas] for t in var_est_object._meas_times], dtype=float)
 
     if hasattr(var_est_object,'_abs_components'):
         n_val = var_est_object._nabs_components
@@ -355,6 +389,8 @@ def build_scipy_lsq_arrays(var_est_object):
     var_est_object._s_array = np.ones(var_est_object._n_meas_lambdas * n_val) 
     var_est_object._z_array = np.ones(var_est_object._n_allmeas_times * n_val)
     var_est_object._c_array = np.ones(var_est_object._n_allmeas_times * n_val)
+    
+    build_array_bridges(var_est_object)
  
     return None
 
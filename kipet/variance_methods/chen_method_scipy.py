@@ -1,14 +1,17 @@
 """
 Module to hold the method developed by Chen et al. 2016 based on Scipy
 """
+from functools import lru_cache
 import sys
+import time
 
 import numpy as np
 from pyomo.environ import *
 from scipy.optimize import least_squares
-from scipy.sparse import coo_matrix
+from scipy.sparse import csr_matrix
 
 from kipet.core_methods.data_tools import stdout_redirector
+from kipet.post_model_build.pyomo_model_tools import VarArrayBridge
 try:
     from StringIO import StringIO
 except ImportError:
@@ -44,8 +47,114 @@ def build_s_model(var_est_object):
                     if var_est_object.model.S[l, k].value != var_est_object.model.known_absorbance_data[k][l]:
                         var_est_object.model.S[l, k].set_value(var_est_object.model.known_absorbance_data[k][l])
                         var_est_object.S_model.S[l, k].fix()
-                        
 
+def build_array_bridges(var_est_object):
+    """Maps the S, Z, and C variables of the model onto numpy arrays once so
+    that the profiles can be moved in bulk in every iteration
+
+       This method is not intended to be used by users directly
+
+    Args:
+        var_est_object (VarianceEstimator): the estimator
+
+    Returns:
+        None
+
+    """
+    model = var_est_object.model
+    var_est_object._array_bridges = {
+        'S': VarArrayBridge(model.S,
+                            var_est_object._meas_lambdas,
+                            var_est_object.component_set),
+        'Z': VarArrayBridge(model.Z,
+                            var_est_object._allmeas_times,
+                            var_est_object.component_set),
+        'C': VarArrayBridge(getattr(model, var_est_object.component_var),
+                            var_est_object._allmeas_times,
+                            var_est_object.component_set),
+        }
+    
+    return None
+
+def get_array_bridges(var_est_object):
+    """Returns the array bridges, creating them if needed"""
+    
+    if not hasattr(var_est_object, '_array_bridges'):
+        build_array_bridges(var_est_object)
+        
+    return var_est_object._array_bridges
+
+def _set_known_absorbance(var_est_object):
+    """Resets the known absorbance profiles in the model after S is updated"""
+    
+    if hasattr(var_est_object.model, 'known_absorbance'):
+        for c in var_est_object.model.known_absorbance:
+            if c in var_est_object.component_set:
+                for l in var_est_object._meas_lambdas:
+                    var_est_object.model.S[l, c].set_value(var_est_object.model.known_absorbance_data[c][l])
+                    
+    return None
+
+@lru_cache(maxsize=4)
+def s_jacobian_pattern(nt, nl, nc):
+    """Sparsity pattern (CSR indices and indptr) of the Jacobian of the S
+    residuals. Row i*nl + j depends on S[j, k] for all k. The pattern is the
+    same in every Chen iteration and is therefore cached.
+    
+    Args:
+        nt (int): number of times
+        
+        nl (int): number of wavelengths
+        
+        nc (int): number of absorbing components
+        
+    Returns:
+        indices, indptr (tuple): CSR structure of the Jacobian
+    
+    """
+    indices = np.tile(np.arange(nl*nc), nt)
+    indptr = np.arange(0, nt*nl*nc + 1, nc)
+    return indices, indptr
+
+@lru_cache(maxsize=4)
+def c_jacobian_pattern(nt, nl, nc):
+    """Sparsity pattern (CSR indices and indptr) of the Jacobian of the C
+    residuals. Row i*nl + j depends on C[i, k] for all k.
+    
+    Args:
+        nt (int): number of times
+        
+        nl (int): number of wavelengths
+        
+        nc (int): number of absorbing components
+        
+    Returns:
+        indices, indptr (tuple): CSR structure of the Jacobian
+    
+    """
+    indices = np.repeat(np.arange(nt)*nc, nl*nc) + np.tile(np.arange(nc), nt*nl)
+    indptr = np.arange(0, nt*nl*nc + 1, nc)
+    return indices, indptr
+
+def s_residual(x, z_array, d_array, nl, nt, nc):
+    """Residuals D - Z*S^T of the S subproblem as a flat array"""
+    
+    return (d_array - z_array.reshape(nt, nc) @ x.reshape(nl, nc).T).ravel()
+
+def c_residual(x, s_array, d_array, nl, nt, nc):
+    """Residuals D - C*S^T of the C subproblem as a flat array"""
+    
+    return (d_array - x.reshape(nt, nc) @ s_array.reshape(nl, nc).T).ravel()
+
+def s_jacobian_data(z_array, nl, nt, nc):
+    """Jacobian entries of the S residuals ordered as in s_jacobian_pattern"""
+    
+    return -np.broadcast_to(z_array.reshape(nt, 1, nc), (nt, nl, nc)).ravel()
+
+def c_jacobian_data(s_array, nl, nt, nc):
+    """Jacobian entries of the C residuals ordered as in c_jacobian_pattern"""
+    
+    return -np.tile(s_array, nt)
 
 def solve_s_scipy(var_est_object, **kwds):
     """Solves formulation 22 in weifengs paper (using scipy least_squares)
@@ -105,35 +214,27 @@ def solve_s_scipy(var_est_object, **kwds):
     else:
         n = var_est_object._n_components
 
-    for j, l in enumerate(var_est_object._meas_lambdas):
-        for k, c in enumerate(var_est_object.component_set):
-            if var_est_object.model.S[l, c].value < 0.0 and var_est_object._is_D_deriv == False:  #: only less thant zero for non-absorbing
-                var_est_object._s_array[j * n + k] = 1e-2
-            else:
-                var_est_object._s_array[j * n + k] = var_est_object.model.S[l, c].value
-
-    for j, t in enumerate(var_est_object._allmeas_times):
-        for k, c in enumerate(var_est_object.component_set):
-            var_est_object._z_array[j * n + k] = var_est_object.model.Z[t, c].value
+    bridges = get_array_bridges(var_est_object)
+    
+    s_array = bridges['S'].get_values(flat=True)
+    if var_est_object._is_D_deriv == False:  #: only less thant zero for non-absorbing
+        s_array[s_array < 0.0] = 1e-2
+    var_est_object._s_array = s_array
+    var_est_object._z_array = bridges['Z'].get_values(flat=True)
+
+    nl = var_est_object._n_meas_lambdas
+    nt = var_est_object._n_allmeas_times
+    
+    # Z is fixed in this subproblem, so the Jacobian is constant
+    jac_indices, jac_indptr = s_jacobian_pattern(nt, nl, n)
+    jac_data = s_jacobian_data(var_est_object._z_array, nl, nt, n)
 
     def F(x, z_array, d_array, nl, nt, nc):
-        diff = np.zeros(nt*nl)
-        for i in range(nt):
-            for j in range(nl):
-                diff[i*nl+j] = d_array[i, j]-sum(z_array[i*nc+k]*x[j*nc+k] for k in range(nc))
-        return diff
+        return s_residual(x, z_array, d_array, nl, nt, nc)
 
     def JF(x, z_array, d_array, nl, nt, nc):
-        row = []
-        col = []
-        data = []
-        for i in range(nt):
-            for j in range(nl):
-                for k in range(nc):
-                    row.append(i*nl+j)
-                    col.append(j*nc+k)
-                    data.append(-z_array[i*nc+k])
-        return coo_matrix((data, (row, col)),
+        # least_squares may scale the data in place
+        return csr_matrix((jac_data.copy(), jac_indices, jac_indptr),
                           shape=(nt*nl, nc*nl))
 
 
@@ -193,12 +294,8 @@ def solve_s_scipy(var_est_object, **kwds):
         t1 = time.time()
         print("Scipy.optimize.least_squares time={:.3f} seconds".format(t1-t0))
 
-    for j, l in enumerate(var_est_object._meas_lambdas):
-        for k, c in enumerate(var_est_object.component_set):
-            var_est_object.model.S[l, c].value = res.x[j * n + k]
-            if hasattr(var_est_object.model, 'known_absorbance'):
-                if c in var_est_object.model.known_absorbance:
-                    var_est_object.model.S[l, c].set_value(var_est_object.model.known_absorbance_data[c][l])
+    bridges['S'].set_values(res.x)
+    _set_known_absorbance(var_est_object)
 
     return res.success
 
@@ -283,38 +380,28 @@ def solve_c_scipy(var_est_object, **kwds):
     else:
         n = var_est_object._n_components
         
-    for i, t in enumerate(var_est_object._allmeas_times):
-        for k, c in enumerate(var_est_object.component_set):
-            if getattr(var_est_object.model, var_est_object.component_var)[t, c].value <= 0.0:
-                var_est_object._c_array[i * n + k] = 1e-15
-            else:
-                var_est_object._c_array[i * n + k] = getattr(var_est_object.model, var_est_object.component_var)[t, c].value
-
-    for j, l in enumerate(var_est_object._meas_lambdas):
-        for k, c in enumerate(var_est_object.component_set):
-            var_est_object._s_array[j * n + k] = var_est_object.model.S[l, c].value
-
-
-    def F(x,s_array,d_array,nl,nt,nc):
-        diff = np.zeros(nt*nl)
-        for i in range(nt):
-            for j in range(nl):
-                diff[i*nl+j]=d_array[i,j]-sum(s_array[j*nc+k]*x[i*nc+k] for k in range(nc))
-        return diff
-
-    def JF(x,s_array,d_array,nl,nt,nc):
-        row = []
-        col = []
-        data = []
-        for i in range(nt):
-            for j in range(nl):
-                for k in range(nc):
-                    row.append(i*nl+j)
-                    col.append(i*nc+k)
-                    data.append(-s_array[j*nc+k])
-
-        return coo_matrix((data, (row, col)),
-                          shape=(nt*nl,nc*nt))
+    bridges = get_array_bridges(var_est_object)
+    
+    c_array = bridges['C'].get_values(flat=True)
+    c_array[c_array <= 0.0] = 1e-15
+    var_est_object._c_array = c_array
+    var_est_object._s_array = bridges['S'].get_values(flat=True)
+
+
+    nl = var_est_object._n_meas_lambdas
+    nt = var_est_object._n_allmeas_times
+    
+    # S is fixed in this subproblem, so the Jacobian is constant
+    jac_indices, jac_indptr = c_jacobian_pattern(nt, nl, n)
+    jac_data = c_jacobian_data(var_est_object._s_array, nl, nt, n)
+
+    def F(x, s_array, d_array, nl, nt, nc):
+        return c_residual(x, s_array, d_array, nl, nt, nc)
+
+    def JF(x, s_array, d_array, nl, nt, nc):
+        # least_squares may scale the data in place
+        return csr_matrix((jac_data.copy(), jac_indices, jac_indptr),
+                          shape=(nt*nl, nc*nt))
 
     if tee:
         res = least_squares(F, 
@@ -367,8 +454,6 @@ def solve_c_scipy(var_est_object, **kwds):
         t1 = time.time()
         print("Scipy.optimize.least_squares time={:.3f} seconds".format(t1-t0))
 
-    for j, t in enumerate(var_est_object._allmeas_times):
-        for k,c in enumerate(var_est_object.component_set):
-            getattr(var_est_object.model, var_est_object.component_var)[t,c].value = res.x[j*n+k]
+    bridges['C'].set_values(res.x)
    
     return res.success
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+Level of detail for large plots
+
+Spectral data and profiles with many points make very large figures (every
+point is written into the HTML file). The functions here reduce the data to a
+point budget before it is added to a figure:
+
+    decimate_series - keeps the minimum and the maximum of each bucket of a
+                      line so that peaks and dips are still drawn
+    decimate_frame  - reduces a surface (times x wavelengths) block-wise,
+                      keeping the most extreme value in each block
+
+encode_figure writes the arrays of a figure as base64 typed arrays (single
+precision by default), which plotly.js (2.28 and later) reads directly. With
+an older plotly the arrays are left as they are.
+"""
+# Standard library imports
+import base64
+import math
+import re
+import warnings
+
+# Third party imports
+import numpy as np
+import pandas as pd
+
+# Points per trace (or cells per surface) kept when no budget is given
+default_max_points = 20000
+
+_typed_array_dtypes = {'f4': np.float32, 'f8': np.float64}
+
+# First plotly.js version that reads base64 typed arrays
+_typed_array_plotlyjs = (2, 28)
+
+
+def minmax_indices(y, max_points=default_max_points):
+    """Returns the sorted indices of the points kept when a line is reduced
+    to max_points: the first and last points and the minimum and maximum of
+    each bucket of consecutive points
+
+    Args:
+        y (array-like): the values of the line
+
+        max_points (int): the point budget (no decimation if None)
+
+    Returns:
+        indices (np.ndarray): the indices of the kept points
+
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+
+    n_buckets = max(max_points//2 - 1, 1)
+    size = math.ceil(n/n_buckets)
+    n_buckets = math.ceil(n/size)
+
+    padded = np.full(n_buckets*size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets)*size
+
+    i_min = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    i_max = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+
+    indices = np.concatenate([[0, n - 1], i_min, i_max])
+    return np.unique(indices[indices < n])
+
+
+def decimate_series(x, y, max_points=default_max_points):
+    """Reduces a line to the point budget using min/max buckets
+
+    Args:
+        x (array-like): the x values
+
+        y (array-like): the y values
+
+        max_points (int): the point budget (no decimation if None)
+
+    Returns:
+        x, y (tuple): the decimated values as arrays
+
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = minmax_indices(y, max_points)
+
+    return x[indices], y[indices]
+
+
+def _block_shape(n_rows, n_cols, max_points):
+    """Returns the number of output rows and columns for a surface so that
+    rows*cols <= max_points. The aspect ratio is kept unless an axis is short
+    enough to be kept whole.
+
+    """
+    scale = math.sqrt(n_rows*n_cols/max_points)
+    keep_whole = math.sqrt(max_points)
+
+    if n_rows <= n_cols:
+        rows = n_rows if n_rows <= keep_whole else max(1, round(n_rows/scale))
+        cols = min(n_cols, max(1, max_points//rows))
+    else:
+        cols = n_cols if n_cols <= keep_whole else max(1, round(n_cols/scale))
+        rows = min(n_rows, max(1, max_points//cols))
+
+    return rows, cols
+
+
+def _block_centers(labels, size, n_blocks):
+    """Returns the mean label of each block of size consecutive labels"""
+
+    labels = np.asarray(labels, dtype=float)
+    padded = np.full(n_blocks*size, np.nan)
+    padded[:len(labels)] = labels
+    padded = padded.reshape(n_blocks, size)
+
+    return np.nansum(padded, axis=1)/np.sum(~np.isnan(padded), axis=1)
+
+
+def decimate_frame(df, max_points=default_max_points):
+    """Reduces a surface (times x wavelengths) to at most max_points cells.
+    Each cell is the value in its block that is furthest from the block mean
+    (the maximum for a peak, the minimum for a dip) placed at the center of
+    the block.
+
+    Args:
+        df (pandas.DataFrame): the data with numeric index and columns
+
+        max_points (int): the cell budget (no decimation if None)
+
+    Returns:
+        df_decimated (pandas.DataFrame): the decimated data
+
+    """
+    n_rows, n_cols = df.shape
+    if max_points is None or n_rows*n_cols <= max_points:
+        return df
+
+    rows, cols = _block_shape(n_rows, n_cols, max_points)
+    row_size = math.ceil(n_rows/rows)
+    col_size = math.ceil(n_cols/cols)
+    rows = math.ceil(n_rows/row_size)
+    cols = math.ceil(n_cols/col_size)
+
+    padded = np.full((rows*row_size, cols*col_size), np.nan)
+    padded[:n_rows, :n_cols] = df.values
+    blocks = padded.reshape(rows, row_size, cols, col_size)
+
+    valid = ~np.isnan(blocks)
+    count = valid.sum(axis=(1, 3))
+    block_max = np.where(valid, blocks, -np.inf).max(axis=(1, 3))
+    block_min = np.where(valid, blocks, np.inf).min(axis=(1, 3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        block_mean = np.where(valid, blocks, 0).sum(axis=(1, 3))/count
+    extreme = np.where(block_max - block_mean >= block_mean - block_min, block_max, block_min)
+    extreme[count == 0] = np.nan
+
+    return pd.DataFrame(extreme,
+                        index=_block_centers(df.index, row_size, rows),
+                        columns=_block_centers(df.columns, col_size, cols),
+                        )
+
+
+def typed_arrays_supported():
+    """Returns True if the plotly.js bundled with plotly reads typed arrays"""
+
+    from plotly.offline import get_plotlyjs_version
+
+    version = tuple(int(v) for v in re.findall(r'\d+', get_plotlyjs_version())[:2])
+    return version >= _typed_array_plotlyjs
+
+
+def _typed_array(array, dtype):
+    """Returns the plotly.js typed array spec of a numeric array"""
+
+    array = np.ascontiguousarray(array, dtype=_typed_array_dtypes[dtype])
+    spec = {'dtype': dtype,
+            'bdata': base64.b64encode(array.tobytes()).decode('ascii'),
+            }
+    if array.ndim > 1:
+        spec['shape'] = str(array.shape)[1:-1]
+
+    return spec
+
+
+def _encode(value, dtype):
+    """Replaces the float arrays in a figure dict with typed arrays"""
+
+    if isinstance(value, dict):
+        if value.get('dtype') == 'f8' and 'bdata' in value:
+            array = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.float64)
+            if 'shape' in value:
+                array = array.reshape([int(s) for s in value['shape'].split(',')])
+            return _typed_array(array, dtype)
+        return {k: _encode(v, dtype) for k, v in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [_encode(v, dtype) for v in value]
+
+    if isinstance(value, (np.ndarray, pd.Index, pd.Series)):
+        array = np.asarray(value)
+        if array.size > 0 and array.dtype.kind in 'fiu':
+            return _typed_array(array, dtype)
+
+    return value
+
+
+def encode_figure(fig, dtype='f4'):
+    """Returns the figure as a dict with the numeric arrays written as base64
+    typed arrays. Use validate=False when writing the dict with plotly.io.
+    If the installed plotly is too old for typed arrays, the arrays are not
+    encoded (with a warning).
+
+    Args:
+        fig (go.Figure): the figure
+
+        dtype (str): 'f4' (single precision) or 'f8'
+
+    Returns:
+        fig_dict (dict): the encoded figure
+
+    """
+    if dtype not in _typed_array_dtypes:
+        raise ValueError(f'dtype must be one of {list(_typed_array_dtypes)}')
+
+    fig_dict = fig.to_plotly_json() if hasattr(fig, 'to_plotly_json') else fig
+
+    if not typed_arrays_supported():
+        warnings.warn('Binary arrays need plotly.js 2.28 or later (plotly 5.19 or later), the arrays are not encoded')
+        return fig_dict
+
+    return _encode(fig_dict, dtype)
+
+
+def show_figure(fig, binary=False):
+    """Writes the figure with plotly.offline.plot and opens it
+
+    Args:
+        fig (go.Figure): the figure
+
+        binary (bool): write the arrays binary encoded
+
+    Returns:
+        None
+
+    """
+    from plotly.offline import plot
+
+    if binary:
+        plot(encode_figure(fig), validate=False)
+    else:
+        plot(fig)
+
+    return None
@@ -12,6 +12,11 @@ import plotly.graph_objects as go
 import plotly.io as pio
 
 # Kipet library imports
+from kipet.visuals.decimation import (
+    decimate_series,
+    default_max_points,
+    encode_figure,
+    )
 """
 Constants used for plotting
 """
@@ -34,9 +39,17 @@ colors += ['#4285F4', '#DB4437', '#F4B400', '#0F9D58',
 
 class PlotObject():
     
-    """This will hold the relevant information needed to make a plot in KIPET"""
+    """This will hold the relevant information needed to make a plot in KIPET
     
-    def __init__(self, reaction_model=None, jupyter=False):
+    Each trace is reduced to max_points points (min/max buckets) and the
+    figures are written with binary encoded arrays if binary is True. The
+    defaults are taken from the general settings (plot_max_points and
+    plot_binary). Binary arrays need plotly 5.19 or later (plotly.js 2.28),
+    with an older plotly the arrays are written as usual.
+    
+    """
+    
+    def __init__(self, reaction_model=None, jupyter=False, max_points=None, binary=None):
         
         self.reaction_model = reaction_model
         self.name = reaction_model.name
@@ -44,11 +57,16 @@ class PlotObject():
         self.filename = None
         self.jupyter = jupyter
         
+        general = reaction_model.settings.general
+        self.max_points = getattr(general, 'plot_max_points', default_max_points) if max_points is None else max_points
+        self.binary = getattr(general, 'plot_binary', False) if binary is None else binary
+        
     def _make_line_trace(self, fig, x, y, name, color):
         """Make line traces
         
         """
         line = dict(color=colors[color], width=4)
+        x, y = decimate_series(x, y, self.max_points)
         fig.add_trace(
             go.Scatter(x=x,
                        y=y,
@@ -62,6 +80,7 @@ class PlotObject():
         """Make marker traces
         
         """
+        x, y = decimate_series(x, y, self.max_points)
         fig.add_trace(
             go.Scatter(x=x,
                        y=y,
@@ -112,7 +131,10 @@ class PlotObject():
         if not self.jupyter:
            print(f'Plot saved as: {filename}')
 
-        plot_method(fig, file=filename.as_posix(), auto_open=True)
+        if self.binary:
+            plot_method(encode_figure(fig), file=filename.as_posix(), auto_open=True, validate=False)
+        else:
+            plot_method(fig, file=filename.as_posix(), auto_open=True)
     
         return None
 
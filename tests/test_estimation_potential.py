@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+from pyomo.environ import ConcreteModel, Constraint, Objective, Set, Var
+from scipy.sparse import csc_matrix, csr_matrix
+
+from kipet.common.ReducedHessian import ReducedHessian
+from kipet.core_methods.EstimationPotential import EstimationPotential
+
+
+def _kkt_info(rh):
+    """Stands in for the KKT data of the solved model (see
+    make_estimation_potential). Fixed variables are not part of the KKT
+    system."""
+
+    model = rh.model_object
+    jacobian = [{'x': 1.0, 'P[k1]': -1.0, 'P[k2]': -2.0},
+                {'y': 1.0, 'P[k1]': -1.0, 'P[k2]': -1.0},
+                ]
+    hessian = {'x': 2.0, 'y': 2.0, 'P[k1]': 0.2, 'P[k2]': 0.2}
+    names = [v.name for v in [model.x, model.y, model.P['k1'], model.P['k2']] if not v.fixed]
+
+    rh.kkt_data = {'J': csc_matrix([[row.get(name, 0.0) for name in names] for row in jacobian]),
+                   'H': csr_matrix(np.diag([hessian[name] for name in names])),
+                   'var_ind': names,
+                   'con_ind': ['con_x', 'con_y'],
+                   'duals': None,
+                   }
+
+    return None
+
+
+def _model_state(model):
+    """Components, variable values, bounds and fixed flags"""
+
+    variables = {(var.local_name, index): (v.value, v.lb, v.ub, v.fixed)
+                 for var in model.component_objects(Var) for index, v in var.items()}
+
+    return list(model.component_map().keys()), variables
+
+
+class TestEstimationPotential(unittest.TestCase):
+
+
+    """Tests the reduced Hessian calculations of the estimability analysis"""
+
+    def make_estimation_potential(self, in_place):
+
+        model = ConcreteModel()
+        model.parameter_names = Set(initialize=['k1', 'k2'], ordered=True)
+        model.P = Var(model.parameter_names, initialize=1.0, bounds=(0, 10))
+        model.x = Var(initialize=3.0)
+        model.y = Var(initialize=2.0)
+        model.con_x = Constraint(expr=model.x == model.P['k1'] + 2*model.P['k2'])
+        model.con_y = Constraint(expr=model.y == model.P['k1'] + model.P['k2'])
+        model.objective = Objective(expr=(model.x - 1)**2 + (model.y - 1)**2
+                                    + 0.1*(model.P['k1']**2 + model.P['k2']**2))
+
+        return EstimationPotential(model, options={}, method='pynumero', in_place=in_place)
+
+    def calculate(self, est_param, parameter_sets):
+
+        reduced_hessians = []
+        with mock.patch('kipet.common.ReducedHessian.SolverFactory'), \
+             mock.patch.object(ReducedHessian, 'get_kkt_info', _kkt_info):
+            for parameter_set in parameter_sets:
+                reduced_hessians.append(np.asarray(est_param._calculate_reduced_hessian(parameter_set)))
+
+        return reduced_hessians
+
+    def test_in_place_reduced_hessian(self):
+
+        expected = [np.array([[4.2, 6.0], [6.0, 10.2]]), np.array([[4.2]]), np.array([[10.2]])]
+
+        for in_place in [True, False]:
+            est_param = self.make_estimation_potential(in_place)
+            snapshot = _model_state(est_param.model)
+
+            reduced_hessians = self.calculate(est_param, [['k1', 'k2'], ['k1'], ['k2']])
+
+            for reduced_hessian, expected_hessian in zip(reduced_hessians, expected):
+                np.testing.assert_allclose(reduced_hessian, expected_hessian, rtol=1e-12)
+            self.assertEqual(_model_state(est_param.model), snapshot)
+            self.assertEqual(est_param._reduced_hessian is not None, in_place)
+
+    def test_timing_stats(self):
+
+        est_param = self.make_estimation_potential(in_place=True)
+        self.calculate(est_param, [['k1', 'k2'], ['k1']])
+
+        stats = est_param.get_timing_stats()
+        self.assertEqual(list(stats.columns), ['iteration', 'parameters', 'copy', 'solve', 'kkt', 'linear_algebra'])
+        self.assertEqual(list(stats.iteration), [0, 1])
+        self.assertEqual(list(stats.parameters), [2, 1])
+        self.assertTrue((stats[['copy', 'solve', 'kkt', 'linear_algebra']] >= 0).all().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
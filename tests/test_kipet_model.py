@@ -99,8 +99,100 @@ class TestKipetModel(unittest.TestCase):
         filename = 'example_data/Ex_1_C_data.txt'
         df_data = kipet_model.read_data_file(filename)
         self.assertIsInstance(df_data, DataFrame)
+
+    def make_fitted_pyomo_model(self):
+        
+        from pyomo.environ import ConcreteModel, Set, Var
+        
+        model = ConcreteModel()
+        model.parameter_names = Set(initialize=['k1', 'k2'], ordered=True)
+        model.P = Var(model.parameter_names, initialize=1.0)
+        model.Z = Var([0.0, 1.0], ['A', 'B'], initialize=0.0)
+        return model
+
+    def test_fit_state_round_trip(self):
+        """Test that a fit state made in a worker is loaded into a model"""
+        
+        import pickle
+        from kipet.core_methods.ResultsObject import ResultsObject
+        from kipet.top_level.reaction_model import ReactionModel
+        
+        kipet_model = kipet.KipetModel()
+        r1 = kipet_model.new_reaction('r1')
+        r2 = kipet_model.new_reaction('r2')
+        
+        r1.p_model = self.make_fitted_pyomo_model()
+        r1.p_model.P['k1'].value = 2.5
+        r1.p_model.Z[1.0, 'B'].value = 0.75
+        r1.p_estimator = mock.Mock(termination_condition='optimal')
+        r1.results = ResultsObject()
+        r1.results.P = {'k1': 2.5, 'k2': 1.0}
+        r1.results_dict = {'p_estimator': r1.results}
+        r1.variances = {'A': 1e-3, 'B': 2e-3, 'device': 1e-6}
+        
+        state = pickle.loads(pickle.dumps(r1._get_fit_state()))
+        
+        def create_estimator(model, estimator=None):
+            model.p_model = self.make_fitted_pyomo_model()
+            model.p_model.P['k2'].fix(0.5)
+            model.p_estimator = mock.Mock()
+            
+        r2.model = object()
+        with mock.patch.object(ReactionModel, 'create_estimator', create_estimator), \
+             mock.patch.object(ReactionModel, '_update_related_settings'):
+            r2._load_fit_state(state)
+        
+        self.assertTrue(r2.optimized)
+        self.assertEqual(r2.results.P, {'k1': 2.5, 'k2': 1.0})
+        self.assertIs(r2.results_dict['p_estimator'], r2.results)
+        self.assertEqual(r2.variances, r1.variances)
+        self.assertEqual(r2.settings.parameter_estimator.variances, r1.variances)
+        self.assertEqual(r2.p_model.P['k1'].value, 2.5)
+        self.assertEqual(r2.p_model.P['k2'].value, 0.5)
+        self.assertEqual(r2.p_model.Z[1.0, 'B'].value, 0.75)
+        self.assertEqual(r2.p_estimator.termination_condition, 'optimal')
+
+    def test_fit_times_in_results(self):
+        """Test that the fit times are stored in the results"""
+        
+        from kipet.core_methods.ResultsObject import ResultsObject
+        from kipet.top_level.reaction_model import ReactionModel
         
+        kipet_model = kipet.KipetModel()
+        kipet_model.new_reaction('r1')
+        kipet_model.new_reaction('r2')
+        
+        def run_opt(model):
+            model.results = ResultsObject()
+            model.optimized = True
+            
+        with mock.patch.object(ReactionModel, 'run_opt', run_opt):
+            kipet_model._calculate_parameters(workers=1)
         
+        self.assertEqual(set(kipet_model.fit_times), {'r1', 'r2'})
+        for name, model in kipet_model.models.items():
+            self.assertEqual(model.results.solver_statistics['fit_time'], kipet_model.fit_times[name])
+
+    def test_import_is_lazy(self):
+        """Test that importing kipet does not load the plotting and solver
+        subsystems"""
+
+        import subprocess
+        import sys
+
+        lazy_modules = ['matplotlib.pyplot',
+                        'plotly',
+                        'kipet.core_methods.MEE',
+                        'kipet.core_methods.EstimabilityAnalyzer',
+                        'kipet.core_methods.EstimationPotential',
+                        'kipet.nsd_funs.NSD_KIPET',
+                        'pyomo.contrib.pynumero.interfaces.pyomo_nlp',
+                        ]
+        code = f'import sys, kipet; print([m for m in {lazy_modules} if m in sys.modules])'
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip().splitlines()[-1], '[]')
+
+
     # def test_mee(self):
         
     #     from unittest.mock import MagicMock
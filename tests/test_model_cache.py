@@ -0,0 +1,184 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import ConcreteModel, Param, Set, Var, value
+
+import kipet
+from kipet.top_level.model_cache import (
+    model_cache,
+    ModelBuildCache,
+    structure_key,
+    transfer_values,
+    )
+
+
+def _build(data, k1=2.0, A0=1.0, fixed=False):
+    """Small stand-in for a built model: variables, a mutable Param and an
+    immutable data Param over the data index"""
+
+    model = ConcreteModel()
+    model.alltime = Set(initialize=list(data.index), ordered=True)
+    model.mixture_components = Set(initialize=list(data.columns), ordered=True)
+    model.parameter_names = Set(initialize=['k1'], ordered=True)
+
+    model.P = Var(model.parameter_names, initialize=k1, bounds=(0.0, 10*k1))
+    model.Z = Var(model.alltime, model.mixture_components, initialize=A0)
+    model.init_conditions = Param(model.mixture_components, initialize=A0, mutable=True)
+    model.C = Param(model.alltime, model.mixture_components,
+                    initialize={(t, c): data.loc[t, c] for t in data.index for c in data.columns})
+
+    if fixed:
+        model.P['k1'].fix()
+
+    return model
+
+
+def _model_values(model):
+    """All variable values, bounds, fixed flags and Param values by name"""
+
+    values = {}
+    for var in model.component_objects(Var):
+        for index, var_data in var.items():
+            values[var.local_name, index] = (var_data.value, var_data.lb, var_data.ub, var_data.fixed)
+    for param in model.component_objects(Param):
+        for index in param:
+            values[param.local_name, index] = value(param[index])
+
+    return values
+
+
+class TestModelCache(unittest.TestCase):
+
+
+    """Tests the model build cache"""
+
+    def make_reaction_model(self, name, k1=2.0, A0=1.0, second_order=False):
+
+        kipet_model = kipet.KipetModel()
+        r1 = kipet_model.new_reaction(name)
+        k1 = r1.parameter('k1', value=k1, bounds=(0.0, 10.0))
+        A = r1.component('A', value=A0)
+        B = r1.component('B', value=0.0)
+        rate = k1*A**2 if second_order else k1*A
+        r1.add_ode('A', -rate)
+        r1.add_ode('B', rate)
+        return r1
+
+    def make_data(self, scale=1.0):
+
+        t = np.linspace(0, 5, 6)
+        return pd.DataFrame({'A': scale*np.exp(-t), 'B': scale*(1 - np.exp(-t))}, index=t)
+
+    def test_cache_hits_misses_and_size(self):
+
+        cache = ModelBuildCache(max_size=2)
+        model = _build(self.make_data())
+
+        self.assertIsNone(cache.get('a'))
+        cache.store('a', model)
+        cache.store('b', model)
+        clone = cache.get('a')
+        self.assertIsNot(clone, model)
+        self.assertEqual(_model_values(clone), _model_values(model))
+
+        cache.store('c', model)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 2})
+
+        cache.clear()
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0, 'size': 0})
+
+    def test_structure_key(self):
+
+        key = structure_key(self.make_reaction_model('r1'))
+
+        self.assertEqual(key, structure_key(self.make_reaction_model('r2', k1=3.0, A0=0.5)))
+        self.assertNotEqual(key, structure_key(self.make_reaction_model('r3', second_order=True)))
+        self.assertNotEqual(key, structure_key(self.make_reaction_model('r1'), 'discretized'))
+
+        r1 = self.make_reaction_model('r1')
+        r1.add_data('C_data', data=self.make_data())
+        r2 = self.make_reaction_model('r2')
+        r2.add_data('C_data', data=self.make_data(scale=2.0))
+        self.assertNotEqual(key, structure_key(r1))
+        self.assertEqual(structure_key(r1), structure_key(r2))
+
+        data = self.make_data()
+        data.iloc[2, 0] = np.nan
+        r3 = self.make_reaction_model('r3')
+        r3.add_data('C_data', data=data)
+        self.assertNotEqual(structure_key(r1), structure_key(r3))
+
+    def test_uncacheable_models(self):
+
+        r1 = self.make_reaction_model('r1')
+        self.assertTrue(r1._is_cacheable)
+
+        r1.builder._huplc_data = pd.DataFrame()
+        self.assertFalse(r1._is_cacheable)
+
+    def test_cache_hit_matches_fresh_build(self):
+
+        cache = ModelBuildCache()
+        cache.store('key', _build(self.make_data()))
+
+        fresh = _build(self.make_data(scale=2.0), k1=3.0, A0=0.5, fixed=True)
+        cached = cache.get('key')
+        transfer_values(_build(self.make_data(scale=2.0), k1=3.0, A0=0.5, fixed=True), cached)
+
+        self.assertEqual(_model_values(cached), _model_values(fresh))
+        self.assertFalse(cached.C.mutable)
+
+        discretized = cached.clone()
+        transfer_values(_build(self.make_data(scale=3.0)), discretized)
+        self.assertEqual(_model_values(discretized), _model_values(_build(self.make_data(scale=3.0))))
+
+    def make_fitting_model(self, name, scale=1.0, A0=1.0, use_model_cache=True):
+
+        r1 = self.make_reaction_model(name, A0=A0)
+        r1.add_data('C_data', data=self.make_data(scale=scale))
+        r1.settings.general.use_model_cache = use_model_cache
+        r1.settings.parameter_estimator.sim_init = False
+        r1.fix_parameter('k1')
+        return r1
+
+    def assert_same_model(self, model, fresh_model):
+
+        self.assertEqual(_model_values(model), _model_values(fresh_model))
+        self.assertEqual(list(model.alltime), list(fresh_model.alltime))
+        self.assertEqual({k: value(v) for k, v in model.sigma.items()},
+                         {k: value(v) for k, v in fresh_model.sigma.items()})
+
+    def test_reaction_model_cache_hit_matches_fresh_build(self):
+
+        model_cache.clear()
+        self.addCleanup(model_cache.clear)
+
+        r1 = self.make_fitting_model('r1')
+        r1.create_pyomo_model()
+        self.assertEqual(model_cache.stats(), {'hits': 0, 'misses': 1, 'size': 1})
+
+        r2 = self.make_fitting_model('r2', scale=2.0, A0=0.5)
+        r2.create_pyomo_model()
+        self.assertEqual(model_cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+        fresh = self.make_fitting_model('r3', scale=2.0, A0=0.5, use_model_cache=False)
+        fresh.create_pyomo_model()
+        self.assertEqual(model_cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+        self.assertNotEqual(_model_values(r1.model), _model_values(r2.model))
+        self.assertTrue(r2.model.P['k1'].fixed)
+        self.assert_same_model(r2.model, fresh.model)
+
+        # The discretized models are cached as well
+        for r in [r1, r2, fresh]:
+            r.create_estimator('p_estimator')
+        self.assertEqual(model_cache.stats(), {'hits': 2, 'misses': 2, 'size': 2})
+
+        self.assert_same_model(r2.p_model, fresh.p_model)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import time
+import unittest
+
+from pyomo.common.tempfiles import TempfileManager
+
+from kipet.common.parallel import (
+    get_worker_state,
+    resolve_workers,
+    WorkerPool,
+    )
+
+
+def _worker_info(task):
+    """Returns the task with the working directory of the worker"""
+
+    # Later tasks finish first so that the order must come from the pool
+    time.sleep(0.01*(5 - task % 5))
+    return task, os.getpid(), os.getcwd(), TempfileManager.tempdir, get_worker_state().get('offset')
+
+
+class TestParallel(unittest.TestCase):
+
+
+    """Tests the WorkerPool and the worker helpers"""
+
+    def test_resolve_workers(self):
+
+        self.assertEqual(resolve_workers(None), os.cpu_count() or 1)
+        self.assertEqual(resolve_workers(4), 4)
+        self.assertEqual(resolve_workers(0), 1)
+        self.assertEqual(resolve_workers(-3), 1)
+        self.assertEqual(resolve_workers('3'), 3)
+        self.assertEqual(resolve_workers(8, n_tasks=3), 3)
+        self.assertEqual(resolve_workers(2, n_tasks=0), 1)
+
+    def test_map_order_and_isolation(self):
+
+        tasks = list(range(20))
+        cwd = os.getcwd()
+        with WorkerPool(3, shared={'offset': 7}) as pool:
+            base_dir = pool._base_dir
+            results = pool.map(_worker_info, tasks)
+
+        self.assertEqual([r[0] for r in results], tasks)
+        self.assertEqual({r[4] for r in results}, {7})
+
+        directories = {}
+        for task, pid, work_dir, temp_dir, offset in results:
+            self.assertEqual(work_dir, temp_dir)
+            self.assertEqual(os.path.dirname(work_dir), base_dir)
+            self.assertEqual(os.path.basename(work_dir), f'worker_{pid}')
+            directories.setdefault(pid, set()).add(work_dir)
+
+        self.assertTrue(all(len(d) == 1 for d in directories.values()))
+        self.assertEqual(len(set.union(*directories.values())), len(directories))
+
+        self.assertEqual(os.getcwd(), cwd)
+        self.assertFalse(os.path.exists(base_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
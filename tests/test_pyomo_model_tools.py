@@ -0,0 +1,66 @@
+import unittest
+
+from pyomo.environ import ConcreteModel, Constraint, Param, Set, Suffix, Var
+
+from kipet.post_model_build.pyomo_model_tools import ModelState
+
+
+def _model_state(model):
+    """Components, variable values, bounds, fixed flags and suffix entries"""
+
+    variables = {(var.local_name, index): (v.value, v.lb, v.ub, v.fixed)
+                 for var in model.component_objects(Var) for index, v in var.items()}
+    suffixes = {name: {c.name: val for c, val in suffix.items()}
+                for name, suffix in model.component_map(Suffix).items()}
+
+    return list(model.component_map().keys()), variables, suffixes
+
+
+class TestModelState(unittest.TestCase):
+
+
+    """Tests snapshots of the model state"""
+
+    def make_model(self):
+
+        model = ConcreteModel()
+        model.parameter_names = Set(initialize=['k1', 'k2'], ordered=True)
+        model.P = Var(model.parameter_names, initialize=1.0, bounds=(0, 10))
+        model.x = Var(initialize=2.0)
+        model.con = Constraint(expr=model.x == model.P['k1'] + model.P['k2'])
+        model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+        model.dual[model.con] = 0.5
+        model.P['k2'].fix()
+
+        return model
+
+    def test_restore(self):
+
+        model = self.make_model()
+        snapshot = _model_state(model)
+        model_state = ModelState(model)
+
+        model.P['k1'].value = 4.0
+        model.P['k1'].setlb(3.9)
+        model.P['k1'].setub(None)
+        model.P['k1'].fix()
+        model.P['k2'].unfix()
+        model.x.value = None
+        model.dual[model.con] = 2.0
+        model.dual[model.P['k1']] = 1.0
+        model.d = Param(model.parameter_names, initialize=1.0, mutable=True)
+        model.fix_params = Constraint(model.parameter_names, rule=lambda m, k: m.P[k] == m.d[k])
+        model.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
+        self.assertNotEqual(_model_state(model), snapshot)
+
+        model_state.restore()
+        self.assertEqual(_model_state(model), snapshot)
+
+        # The snapshot can be restored again
+        model.x.value = 1.0
+        model_state.restore()
+        self.assertEqual(_model_state(model), snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -267,5 +267,106 @@ class TestTemplateBuilder(unittest.TestCase):
         
 
 
+class TestReuseVEModel(unittest.TestCase):
+    
+    
+    """Tests making the PE model from the VE model of the same run_opt call"""
+    
+    def make_pyomo_model(self, k1=2.0):
+        
+        from pyomo.environ import ConcreteModel, Constraint, Param, Set, Var
+        
+        model = ConcreteModel()
+        model.parameter_names = Set(initialize=['k1', 'k2'], ordered=True)
+        model.P = Var(model.parameter_names, initialize=k1, bounds=(0.0, 10.0))
+        model.Z = Var([0.0, 1.0], ['A'], initialize=1.0)
+        model.D = Param([0.0, 1.0], initialize={0.0: 1.0, 1.0: 0.5})
+        model.con = Constraint(expr=model.Z[1.0, 'A'] <= 2)
+        model.Z[0.0, 'A'].fix()
+        model.P['k2'].fix()
+        return model
+    
+    def make_reaction_model(self):
+        
+        kipet_model = kipet.KipetModel()
+        r1 = kipet_model.new_reaction('r1')
+        r1.component('A', value=1.0)
+        r1.settings.general.reuse_ve_model = True
+        r1.settings.parameter_estimator.sim_init = False
+        r1.spectra = object()
+        r1.allow_optimization = True
+        r1.model = self.make_pyomo_model()
+        return r1
+    
+    def run_opt(self, r1):
+        
+        from kipet.core_methods.ResultsObject import ResultsObject
+        from kipet.top_level.reaction_model import ReactionModel
+        
+        def run_ve_opt(model):
+            # Stands in for the VE solve: values, duals and fixed variables change
+            from pyomo.environ import Suffix
+            v_model = model.v_model
+            v_model.P['k1'].value = 3.0
+            v_model.Z[1.0, 'A'].value = 0.4
+            v_model.P['k1'].fix()
+            v_model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+            v_model.dual[v_model.con] = 5.0
+            model.results_dict['v_estimator'] = ResultsObject()
+            model.results_dict['v_estimator'].sigma_sq = {'A': 1e-3, 'device': 1e-6}
+            
+        def run_pe_opt(model):
+            model.results_dict['p_estimator'] = ResultsObject()
+        
+        with mock.patch('kipet.top_level.reaction_model.VarianceEstimator'), \
+             mock.patch('kipet.top_level.reaction_model.ParameterEstimator'), \
+             mock.patch.object(ReactionModel, 'run_ve_opt', autospec=True, side_effect=run_ve_opt) as ve, \
+             mock.patch.object(ReactionModel, 'run_pe_opt', run_pe_opt), \
+             mock.patch.object(ReactionModel, '_update_related_settings'), \
+             mock.patch.object(ReactionModel, 'initialize_from_variance_trajectory'), \
+             mock.patch.object(ReactionModel, 'scale_variables_from_variance_trajectory'):
+            r1.run_opt()
+        
+        return ve.call_count
+    
+    @staticmethod
+    def fixed_flags(model):
+        
+        from pyomo.environ import Var
+        
+        return {(var.local_name, index): var_data.fixed for var in model.component_objects(Var)
+                for index, var_data in var.items()}
+    
+    def test_pe_model_from_ve_model(self):
+        
+        r1 = self.make_reaction_model()
+        self.assertEqual(self.run_opt(r1), 1)
+        
+        p_model = r1.p_model
+        self.assertIsNot(p_model, r1.v_model)
+        self.assertEqual(p_model.P['k1'].value, 3.0)
+        self.assertEqual(p_model.Z[1.0, 'A'].value, 0.4)
+        self.assertEqual(p_model.dual[p_model.con], 5.0)
+        self.assertEqual(self.fixed_flags(p_model), self.fixed_flags(r1.model.clone()))
+        self.assertIsNone(r1._v_model_fixed)
+    
+    def test_refit_without_ve_uses_new_model(self):
+        
+        r1 = self.make_reaction_model()
+        self.run_opt(r1)
+        
+        # All variances are now given and the model is rebuilt
+        r1.components['A'].variance = 1e-3
+        r1.model = self.make_pyomo_model(k1=1.5)
+        r1.model.P['k1'].fix()
+        self.assertEqual(self.run_opt(r1), 0)
+        
+        p_model = r1.p_model
+        self.assertEqual(p_model.P['k1'].value, 1.5)
+        self.assertEqual(p_model.Z[1.0, 'A'].value, 1.0)
+        self.assertFalse(hasattr(p_model, 'dual'))
+        self.assertEqual(self.fixed_flags(p_model), self.fixed_flags(r1.model))
+        
+        
 if __name__ == '__main__':
     unittest.main()
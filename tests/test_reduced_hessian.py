@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from kipet.common.ReducedHessian import ReducedHessian, SparseLUCache, lu_factor_cache
+from kipet.dev_tools.benchmarks import _make_kkt_system
+from kipet.dev_tools.reference_implementations import _reduced_hessian_dense_Z
+
+
+class TestReducedHessian(unittest.TestCase):
+
+
+    """Tests the reduced Hessian linear algebra and the LU cache"""
+
+    def setUp(self):
+
+        lu_factor_cache.clear()
+
+    def tearDown(self):
+
+        lu_factor_cache.max_size = 8
+        lu_factor_cache.clear()
+
+    def test_matches_dense_Z(self):
+
+        for n_params in [1, 4]:
+            F, L, H, col_ind = _make_kkt_system(60, n_params, bandwidth=3, seed=n_params)
+            ref_hessian, ref_Z = _reduced_hessian_dense_Z(F, L, H, col_ind)
+
+            for use_lu_cache in [True, False]:
+                reduced_hessian, Z = ReducedHessian._reduced_hessian_matrix(F, L, H, col_ind, return_Z=True,
+                                                                            use_lu_cache=use_lu_cache)
+                np.testing.assert_allclose(reduced_hessian.toarray(), ref_hessian.toarray(), rtol=1e-10, atol=1e-12)
+                np.testing.assert_allclose(Z.toarray(), ref_Z.toarray(), rtol=1e-10, atol=1e-12)
+
+            self.assertIsNone(ReducedHessian._reduced_hessian_matrix(F, L, H, col_ind)[1])
+
+    def test_lu_cache_reuse(self):
+
+        F, L, H, col_ind = _make_kkt_system(60, 3, bandwidth=3)
+        L_new = L.copy()
+        L_new.data = L_new.data*1.01
+        b = np.arange(L.shape[0], dtype=float)
+
+        cache = SparseLUCache(max_size=1)
+        np.testing.assert_allclose(L @ cache.factorize(L).solve(b), b, atol=1e-10)
+        lu = cache.factorize(L)
+        np.testing.assert_allclose(L_new @ cache.factorize(L_new).solve(b), b, atol=1e-10)
+        self.assertEqual(cache.stats(), {'hits': 1, 'pattern_hits': 1, 'misses': 1, 'size': 1})
+
+        # The entry keeps the last values seen for the pattern
+        self.assertIsNot(cache.factorize(L), lu)
+        self.assertEqual(cache.pattern_hits, 2)
+
+        cache.factorize(L[:-1, :-1])
+        self.assertEqual((cache.misses, len(cache)), (2, 1))
+
+    def test_lu_cache_off(self):
+
+        F, L, H, col_ind = _make_kkt_system(60, 3, bandwidth=3)
+
+        ReducedHessian._reduced_hessian_matrix(F, L, H, col_ind, use_lu_cache=False)
+        self.assertEqual(lu_factor_cache.stats(), {'hits': 0, 'pattern_hits': 0, 'misses': 0, 'size': 0})
+
+        lu_factor_cache.max_size = 0
+        for i in range(2):
+            ReducedHessian._reduced_hessian_matrix(F, L, H, col_ind)
+        self.assertEqual(lu_factor_cache.stats(), {'hits': 0, 'pattern_hits': 0, 'misses': 2, 'size': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
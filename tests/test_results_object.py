@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from pyomo.environ import ConcreteModel, Set, Var
+
+from kipet.core_methods.ResultsObject import ResultsObject
+
+
+class TestResultsObject(unittest.TestCase):
+
+
+    """Tests loading and storing results"""
+
+    def make_model(self):
+
+        model = ConcreteModel()
+        model.alltime = Set(initialize=[0.0, 0.5, 1.0], ordered=True)
+        model.mixture_components = Set(initialize=['A', 'B'], ordered=True)
+        model.parameter_names = Set(initialize=['k1', 'k2'], ordered=True)
+
+        model.Z = Var(model.alltime, model.mixture_components, initialize=1.0)
+        model.Cm = Var(model.alltime, model.mixture_components, initialize=2.0)
+        model.P = Var(model.parameter_names, initialize=0.5)
+        model.U = Var(model.alltime, ['T'], initialize=300.0)
+        model.sigma = Var(initialize=3.0)
+
+        for i, t in enumerate(model.alltime):
+            model.Z[t, 'A'].value = float(i)
+
+        return model
+
+    def test_load_all_variables(self):
+
+        results = ResultsObject()
+        results.load_from_pyomo_model(self.make_model())
+
+        for name in ['Z', 'Cm', 'P', 'U', 'sigma']:
+            self.assertTrue(hasattr(results, name))
+
+    def test_load_requested_variables(self):
+
+        results = ResultsObject()
+        results.load_from_pyomo_model(self.make_model(), to_load=['Z', 'P', 'missing'])
+
+        loaded = {name for name in vars(results) if name in ['Z', 'Cm', 'P', 'U', 'sigma', 'missing']}
+        self.assertEqual(loaded, {'Z', 'P'})
+
+        self.assertIsInstance(results.Z, pd.DataFrame)
+        np.testing.assert_array_equal(results.Z['A'].values, [0.0, 1.0, 2.0])
+        self.assertEqual(list(results.Z.columns), ['A', 'B'])
+        self.assertEqual(results.P.to_dict(), {'k1': 0.5, 'k2': 0.5})
+
+    def test_pickle_and_copy_lazy_results(self):
+
+        import copy
+        import pickle
+        import tempfile
+
+        results = ResultsObject()
+        results.load_from_pyomo_model(self.make_model())
+        results.solver_statistics['fit_time'] = 1.5
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = results.save(f'{directory}/results')
+
+            for duplicate in [lambda r: pickle.loads(pickle.dumps(r)), copy.deepcopy]:
+                loaded = ResultsObject.load(filename, lazy=True)
+                self.assertIsNotNone(loaded._store)
+                loaded_copy = duplicate(loaded)
+
+                self.assertIsNone(loaded_copy.__dict__.get('_store'))
+                self.assertEqual(loaded_copy.solver_statistics, {'fit_time': 1.5})
+                for name in ['Z', 'Cm', 'P', 'U']:
+                    self.assertIn(name, loaded_copy.__dict__)
+                    pd.testing.assert_frame_equal(pd.DataFrame(getattr(loaded_copy, name)),
+                                                  pd.DataFrame(getattr(results, name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
 import unittest
 from unittest import mock
 
+import numpy as np
+import pandas as pd
 import pint
 from pyomo.core.base.var import _GeneralVarData
 
 import kipet
+from kipet.top_level.spectral_handler import SpectralData
 
 
 class TestSpectraHandling(unittest.TestCase):
@@ -57,6 +60,162 @@ class TestSpectraHandling(unittest.TestCase):
         num_of_new_wavelengths = r1.spectra.data.shape[1]
         self.assertEqual(num_of_new_wavelengths*2, num_of_orig_wavelengths)
         
+    def make_spectral_data(self):
+        
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame(rng.normal(size=(50, 40)),
+                            index=np.linspace(0, 10, 50),
+                            columns=np.linspace(1600, 2200, 40))
+        return SpectralData('spectra', data)
+        
+    def test_baseline_shift(self):
+        """
+        Test the automatic baseline shift moves the minimum to zero
+        """
+        spectra = self.make_spectral_data()
+        spectra.baseline_shift()
+        self.assertAlmostEqual(spectra.data.values.min(), 0)
+        
+    def test_pipeline_chunks(self):
+        """
+        Test that processing the spectra in chunks of times gives the same
+        result as processing all times at once
+        """
+        spectra = self.make_spectral_data()
+        original = spectra.data.copy()
+        
+        def pipeline():
+            return spectra.pipeline().baseline_shift().msc().savitzky_golay(window_size=7, orderPoly=2)
+        
+        full = pipeline().apply(in_place=False)
+        chunked = pipeline().apply(chunk_size=7, in_place=False)
+        
+        np.testing.assert_allclose(full.values, chunked.values, atol=1e-8)
+        pd.testing.assert_frame_equal(spectra.data, original)
+        
+    def test_filters_match_row_implementations(self):
+        """
+        Test the vectorized filters against the row by row implementations
+        """
+        from kipet.dev_tools.reference_implementations import _msc_loop, _savitzky_golay_loop, _snv_loop
+        
+        spectra = self.make_spectral_data()
+        D = spectra.data.values + 5
+        data = pd.DataFrame(D, index=spectra.data.index, columns=spectra.data.columns)
+        
+        for orderDeriv in range(3):
+            spectra.data = data.copy()
+            spectra.savitzky_golay(window_size=9, orderPoly=3, orderDeriv=orderDeriv)
+            np.testing.assert_allclose(spectra.data.values, _savitzky_golay_loop(D, 9, 3, orderDeriv), atol=1e-10)
+        
+        spectra.data = data.copy()
+        spectra.snv(offset=2)
+        np.testing.assert_allclose(spectra.data.values, _snv_loop(D, offset=2), atol=1e-10)
+        
+        spectra.data = data.copy()
+        spectra.msc()
+        np.testing.assert_allclose(spectra.data.values, _msc_loop(D, D.mean(axis=0)), atol=1e-8)
+        
+    def test_columnar_readers(self):
+        """
+        Test the columnar readers against the line by line readers
+        """
+        import tempfile
+        from kipet.common.read_write_tools import read_file, read_spectral_data_from_csv
+        from kipet.dev_tools.benchmarks import write_synthetic_spectral_files
+        from kipet.dev_tools.reference_implementations import _read_instrument_loop, _read_triplets_loop
+        
+        with tempfile.TemporaryDirectory() as directory:
+            txt_file, csv_file = write_synthetic_spectral_files(directory, nt=30, nl=20)
+            
+            pd.testing.assert_frame_equal(read_file(txt_file, chunk_size=100), _read_triplets_loop(txt_file))
+            pd.testing.assert_frame_equal(read_spectral_data_from_csv(csv_file, instrument=True),
+                                          _read_instrument_loop(csv_file))
+            self.assertEqual(read_file(txt_file, dtype=np.float32).values.dtype, np.float32)
+        
+    def test_binary_round_trip(self):
+        """
+        Test saving and loading spectral data in the binary format
+        """
+        import tempfile
+        
+        spectra = self.make_spectral_data()
+        spectra.snv()
+        
+        with tempfile.TemporaryDirectory() as directory:
+            filename = spectra.save(f'{directory}/spectra')
+            loaded = SpectralData.load(filename)
+            
+        pd.testing.assert_frame_equal(loaded.data, spectra.data)
+        pd.testing.assert_frame_equal(loaded.data_orig, spectra.data_orig)
+
+    def test_truncated_svd(self):
+        """
+        Test that the truncated SVD methods find the leading singular values
+        and the rank of the spectra
+        """
+        from kipet.common.diagnostic_tools import rank, truncated_svd
+        
+        rng = np.random.default_rng(0)
+        D = rng.uniform(size=(50, 3)) @ rng.uniform(size=(3, 40))
+        s_full = np.linalg.svd(D, compute_uv=False)
+        
+        for method in ['economy', 'randomized', 'streaming']:
+            U, s, Vh = truncated_svd(D, k=3, method=method, oversampling=2, chunk_size=4, seed=0)
+            self.assertEqual(U.shape, (D.shape[0], 3))
+            self.assertEqual(Vh.shape, (3, D.shape[1]))
+            np.testing.assert_allclose(s, s_full[:3], rtol=1e-6)
+            
+        self.assertEqual(rank(pd.DataFrame(D), eps=1e-6), 3)
+        self.assertEqual(rank(D, eps=1e-6, method='streaming', chunk_size=4), 3)
+        
+        # Default eps: the streaming method resolves the small singular values
+        D = rng.uniform(size=(200, 3)) @ rng.uniform(size=(3, 100))
+        for method in ['economy', 'randomized', 'streaming']:
+            self.assertEqual(rank(D, method=method, k=10, seed=0), 3)
+        self.assertEqual(rank(D, method='streaming'), 3)
+        self.assertEqual(rank(D, method='streaming', chunk_size=7), 3)
+
+    def test_plot_decimation(self):
+        """
+        Test that the decimated plot data keeps the extremes within the point
+        budget and that the binary encoding keeps the values
+        """
+        import base64
+        import warnings
+        from kipet.visuals.decimation import decimate_frame, decimate_series, encode_figure
+        
+        rng = np.random.default_rng(0)
+        data = pd.DataFrame(rng.uniform(size=(400, 300)),
+                            index=np.linspace(0, 10, 400),
+                            columns=np.linspace(1600, 2200, 300))
+        data.iloc[123, 45] = 10
+        data.iloc[321, 210] = -10
+        
+        decimated = decimate_frame(data, max_points=2000)
+        self.assertLessEqual(decimated.size, 2000)
+        self.assertEqual(decimated.values.max(), 10)
+        self.assertEqual(decimated.values.min(), -10)
+        
+        x, y = decimate_series(data.index, data.iloc[:, 45], max_points=50)
+        self.assertLessEqual(len(x), 50)
+        self.assertIn(10, y)
+        self.assertEqual((x[0], x[-1]), (data.index[0], data.index[-1]))
+        
+        fig = {'data': [{'type': 'surface', 'z': decimated.values}]}
+        with mock.patch('plotly.offline.get_plotlyjs_version', return_value='2.28.0'):
+            z = encode_figure(fig, dtype='f8')['data'][0]['z']
+        z = np.frombuffer(base64.b64decode(z['bdata'])).reshape(decimated.shape)
+        np.testing.assert_array_equal(z, decimated.values)
+        
+        # plotly.js before 2.28 cannot read typed arrays
+        with mock.patch('plotly.offline.get_plotlyjs_version', return_value='1.58.4'), \
+             warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            z = encode_figure(fig)['data'][0]['z']
+        self.assertIs(z, fig['data'][0]['z'])
+        self.assertEqual(len(caught), 1)
+        
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+from kipet.common.spectral_covariance import SpectralBlock, SpectralCovariance
+
+
+def _dense_B_Vd(blocks, ntheta):
+    """Builds the dense B and Vd element by element"""
+
+    nd = sum(block.nt*block.nw for block in blocks)
+    B = np.zeros((ntheta, nd))
+    Vd = np.zeros((nd, nd))
+
+    for block in blocks:
+        nt, nw, nc = block.nt, block.nw, block.nc
+        for i in range(nt):
+            for j in range(nw):
+                col = block.d_offset + i*nw + j
+                for k in range(nc):
+                    B[block.c_offset + i*nc + k, col] = -2*block.S[j, k]/block.device_variance
+                    B[block.s_offset + j*nc + k, col] = -2*block.C[i, k]/block.device_variance
+
+        for i in range(nt):
+            for j in range(nw):
+                for l in range(nw):
+                    value = sum(block.S[j, k]*block.component_variances[k]*block.S[l, k] for k in range(nc))
+                    if j == l:
+                        value += block.device_variance
+                    Vd[block.d_offset + i*nw + j, block.d_offset + i*nw + l] = value
+
+    return B, Vd
+
+
+class TestSpectralCovariance(unittest.TestCase):
+
+
+    """Tests the structured B and Vd products against the dense matrices"""
+
+    def make_covariance(self):
+
+        rng = np.random.default_rng(0)
+        blocks = []
+        c_offset = 0
+        d_offset = 0
+        for nt, nw, nc in [(6, 5, 2), (4, 7, 3)]:
+            s_offset = c_offset + nt*nc
+            blocks.append(SpectralBlock(C=rng.uniform(size=(nt, nc)),
+                                        S=rng.uniform(size=(nw, nc)),
+                                        component_variances=rng.uniform(0.1, 1, size=nc),
+                                        device_variance=0.3,
+                                        c_offset=c_offset,
+                                        s_offset=s_offset,
+                                        d_offset=d_offset,
+                                        ))
+            c_offset = s_offset + nw*nc
+            d_offset += nt*nw
+
+        ntheta = c_offset + 2
+        return SpectralCovariance(blocks, ntheta), rng.normal(size=(3, ntheta))
+
+    def test_operators_match_dense_matrices(self):
+
+        covariance, H = self.make_covariance()
+        B, Vd = _dense_B_Vd(covariance.blocks, covariance.ntheta)
+
+        np.testing.assert_allclose(covariance.B_matrix().toarray(), B, rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(covariance.Vd_matrix().toarray(), Vd, rtol=1e-12, atol=1e-12)
+
+    def test_covariance_matches_dense_formula(self):
+
+        covariance, H = self.make_covariance()
+        B, Vd = _dense_B_Vd(covariance.blocks, covariance.ntheta)
+        V_dense = (H @ B) @ Vd @ (H @ B).T
+
+        for chunk_size in [None, 1, 4]:
+            np.testing.assert_allclose(covariance.covariance(H, chunk_size), V_dense, rtol=1e-12, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
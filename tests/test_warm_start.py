@@ -0,0 +1,141 @@
+import unittest
+
+from pyomo.environ import ConcreteModel, Constraint, Objective, Set, Suffix, Var
+
+from kipet.common.warm_start import (
+    update_warm_start_in_place,
+    WarmStartStore,
+    )
+from kipet.core_methods.Optimizer import Optimizer
+from kipet.mixins.PEMixins import PEMixins
+
+
+def _make_model(with_constraint=True):
+    """Small model with bounded variables, a constraint and the output
+    suffixes filled as if IPOPT had returned them"""
+
+    model = ConcreteModel()
+    model.parameter_names = Set(initialize=['k1', 'k2'], ordered=True)
+    model.P = Var(model.parameter_names, bounds=(0, 10), initialize=1.0)
+    model.x = Var(initialize=0.0)
+    if with_constraint:
+        model.con = Constraint(expr=model.x == model.P['k1'] + model.P['k2'])
+    model.objective = Objective(expr=model.x**2)
+
+    model.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
+    model.ipopt_zU_out = Suffix(direction=Suffix.IMPORT)
+    model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+
+    return model
+
+
+class TestWarmStart(unittest.TestCase):
+
+
+    """Tests capturing and replaying warm starts"""
+
+    def make_solved_model(self):
+
+        model = _make_model()
+        model.P['k1'].value = 2.0
+        model.P['k2'].value = 3.0
+        model.x.value = 5.0
+        model.ipopt_zL_out[model.P['k1']] = 0.1
+        model.ipopt_zL_out[model.P['k2']] = 0.2
+        model.ipopt_zU_out[model.P['k2']] = -0.3
+        model.dual[model.con] = 4.0
+
+        return model
+
+    def test_capture(self):
+
+        store = WarmStartStore().capture(self.make_solved_model())
+
+        self.assertEqual(store.primals, {('P', 'k1'): 2.0, ('P', 'k2'): 3.0, ('x', None): 5.0})
+        self.assertEqual(store.zL, {('P', 'k1'): 0.1, ('P', 'k2'): 0.2})
+        self.assertEqual(store.zU, {('P', 'k2'): -0.3})
+        self.assertEqual(store.duals, {('con', None): 4.0})
+        self.assertTrue(store.has_multipliers)
+        self.assertEqual(store.captures, 1)
+
+    def test_apply_by_name(self):
+
+        store = WarmStartStore.from_model(self.make_solved_model())
+        model = _make_model()
+        model.P['k2'].fix(7.0)
+        solver_opts = {'warm_start_bound_push': 1e-3}
+
+        store.apply(model, solver_opts)
+
+        self.assertEqual(model.P['k1'].value, 2.0)
+        self.assertEqual(model.x.value, 5.0)
+        self.assertEqual(model.ipopt_zL_in[model.P['k1']], 0.1)
+        self.assertEqual(model.dual[model.con], 4.0)
+
+        # Fixed variables keep their values and get no multipliers
+        self.assertEqual(model.P['k2'].value, 7.0)
+        self.assertNotIn(model.P['k2'], model.ipopt_zL_in)
+        self.assertNotIn(model.P['k2'], model.ipopt_zU_in)
+
+        # User options are not overwritten
+        self.assertEqual(solver_opts['warm_start_init_point'], 'yes')
+        self.assertEqual(solver_opts['warm_start_bound_push'], 1e-3)
+        self.assertEqual(store.applications, 1)
+
+    def test_apply_skips_missing_components(self):
+
+        store = WarmStartStore.from_model(self.make_solved_model())
+        store.primals['missing', 1] = 1.0
+        store.zL['missing', 1] = 1.0
+        store.duals['P', 'k1'] = 1.0
+        model = _make_model(with_constraint=False)
+
+        store.apply(model)
+
+        self.assertEqual(model.P['k1'].value, 2.0)
+        self.assertEqual(len(model.dual), 0)
+        self.assertIsNone(model.find_component('missing'))
+
+    def test_options_only_with_multipliers(self):
+
+        model = _make_model()
+        model.x.value = 5.0
+        store = WarmStartStore.from_model(model)
+        solver_opts = {}
+        store.apply(_make_model(), solver_opts)
+
+        self.assertFalse(store.has_multipliers)
+        self.assertEqual(solver_opts, {})
+
+        solver_opts = {}
+        WarmStartStore().apply(_make_model(), solver_opts)
+        self.assertEqual(solver_opts, {})
+
+    def test_update_in_place(self):
+
+        solver_opts = {}
+        self.assertFalse(update_warm_start_in_place(_make_model(), solver_opts))
+
+        model = self.make_solved_model()
+        Optimizer.add_warm_start_suffixes(model)
+        self.assertTrue(update_warm_start_in_place(model, solver_opts))
+        self.assertEqual(model.ipopt_zU_in[model.P['k2']], -0.3)
+        self.assertEqual(solver_opts['warm_start_init_point'], 'yes')
+
+    def test_add_suffixes_keeps_values(self):
+
+        for add_warm_start_suffixes in [Optimizer.add_warm_start_suffixes, PEMixins.add_warm_start_suffixes]:
+            model = self.make_solved_model()
+            WarmStartStore.from_model(model).apply(model)
+            add_warm_start_suffixes(model, use_k_aug=True)
+            model.dof_v[model.P['k1']] = 1
+
+            add_warm_start_suffixes(model, use_k_aug=True)
+
+            self.assertEqual(model.ipopt_zL_in[model.P['k1']], 0.1)
+            self.assertEqual(model.dual[model.con], 4.0)
+            self.assertEqual(model.dof_v[model.P['k1']], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()